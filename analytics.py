@@ -0,0 +1,131 @@
+import argparse
+import sys
+import time
+from collections import OrderedDict
+import pyarrow.dataset as ds
+from archive import ARCHIVE_DIR, archive_version, build_filter, open_archive
+from features import DIFF_MINUTES
+
+# --- CONSULTAS LOCAIS SOBRE O ARQUIVO PARQUET ---
+# Para cada pergunta ("Ahri x Azir no 16.1", "evolução do jogador X") alguém abria os
+# CSVs de dados/ ou consultava o Supabase. Aqui as consultas rodam no próprio processo
+# sobre o arquivo Parquet (archive.py) com o motor de datasets do pyarrow:
+#   - Region/Date/Patch podam pastas inteiras (partições Hive)
+#   - Champion/PUUID viram filtro do scan (estatísticas dos row groups)
+#   - só as colunas usadas são lidas
+# O resultado fica num cache LRU em memória, limpo quando a versão do arquivo muda
+# (quantidade, mtime mais novo e tamanho dos .parquet: vale para lote gravado aqui e
+# para git pull). Consulta repetida do painel sai do cache sem ler nenhum Parquet.
+#
+#   python analytics.py confronto Ahri Azir --patch 16.1 --region kr
+#   python analytics.py campeao Ahri --patch 16.1
+#   python analytics.py jogador <PUUID> --de 2026-01-01
+
+CACHE_SIZE = 256
+MINUTE = 14 if 14 in DIFF_MINUTES else DIFF_MINUTES[-1]
+MATCHUP_METRICS = ['Win Rate %', 'KDA', 'Kill Participation', 'Farm/Min', 'Damage/Min', 'Gold/Min',
+                   f"Gold Diff {MINUTE}'", f"CS Diff {MINUTE}'", f"XP Diff {MINUTE}'"]
+PLAYER_METRICS = ['Win Rate %', 'KDA', 'Kills', 'Deaths', 'Assists', 'Farm/Min', 'Damage/Min', 'Gold/Min',
+                  'Vision Score/Min', f"Gold Diff {MINUTE}'", f"CS Diff {MINUTE}'"]
+
+
+class ArchiveQuery:
+    def __init__(self, root=ARCHIVE_DIR, cache_size=CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, compute):
+        # LRU por (consulta, parâmetros); lote novo no arquivo = cache inteiro descartado
+        version = archive_version(self.root)
+        if version != self.version:
+            self.cache.clear()
+            self.version = version
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        else:
+            self.misses += 1
+            self.cache[key] = compute()
+            if len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+        result = self.cache[key]
+        return None if result is None else result.copy()
+
+    def _scan(self, columns, where, region=None, date_from=None, date_to=None, patch=None):
+        # Tabela Arrow só com as colunas existentes; None se nada passar no filtro de partição
+        partition = build_filter(region, date_from, date_to, patch)
+        dataset = open_archive(self.root, partition)
+        if dataset is None: return None
+        filt = where if partition is None else partition & where
+        return dataset.to_table(columns=[c for c in columns if c in dataset.schema.names], filter=filt)
+
+    def _grouped(self, where, keys, metrics, sort, **partition):
+        table = self._scan(keys + metrics + ['Match ID'], where, **partition)
+        if table is None or table.num_rows == 0: return None
+        present = [m for m in metrics if m in table.column_names]
+        out = table.group_by(keys).aggregate([('Match ID', 'count')] + [(m, 'mean') for m in present]).to_pandas()
+        df = out.rename(columns={'Match ID_count': 'Partidas', **{f'{m}_mean': m for m in present}})
+        df = df[keys + ['Partidas'] + present]
+        return df.sort_values(sort, ascending=False).reset_index(drop=True).round(3)
+
+    def matchup(self, champion, enemy, patch=None, region=None, date_from=None, date_to=None):
+        # Médias de um confronto por patch e rota
+        def compute():
+            where = (ds.field('Champion') == champion) & (ds.field('Enemy Champion') == enemy)
+            return self._grouped(where, ['Patch', 'Role'], MATCHUP_METRICS, 'Partidas', region=region,
+                                 date_from=date_from, date_to=date_to, patch=patch)
+        return self._cached(('matchup', champion, enemy, patch, region, date_from, date_to), compute)
+
+    def champion_matchups(self, champion, patch=None, region=None, date_from=None, date_to=None, role=None):
+        # Todos os oponentes de rota de um campeão
+        def compute():
+            where = ds.field('Champion') == champion
+            if role: where = where & (ds.field('Role') == role)
+            return self._grouped(where, ['Enemy Champion'], MATCHUP_METRICS, 'Partidas', region=region,
+                                 date_from=date_from, date_to=date_to, patch=patch)
+        return self._cached(('champion', champion, patch, region, date_from, date_to, role), compute)
+
+    def player_trend(self, puuid, region=None, date_from=None, date_to=None, by='Date'):
+        # Evolução de um jogador (partidas_br) por dia ou por patch
+        def compute():
+            df = self._grouped(ds.field('PUUID') == puuid, [by], PLAYER_METRICS, by, region=region,
+                               date_from=date_from, date_to=date_to)
+            return None if df is None else df.sort_values(by).reset_index(drop=True)
+        return self._cached(('player', puuid, region, date_from, date_to, by), compute)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Consultas locais no arquivo Parquet (dados/archive).')
+    parser.add_argument('consulta', choices=['confronto', 'campeao', 'jogador'])
+    parser.add_argument('alvo', nargs='+', help='campeão [inimigo] ou PUUID')
+    parser.add_argument('--patch')
+    parser.add_argument('--region')
+    parser.add_argument('--de', dest='date_from', help='AAAA-MM-DD')
+    parser.add_argument('--ate', dest='date_to', help='AAAA-MM-DD')
+    parser.add_argument('--root', default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    q = ArchiveQuery(args.root)
+    start = time.perf_counter()
+    if args.consulta == 'confronto':
+        if len(args.alvo) < 2:
+            print("Uso: python analytics.py confronto <campeão> <inimigo>")
+            sys.exit(1)
+        df = q.matchup(args.alvo[0], args.alvo[1], args.patch, args.region, args.date_from, args.date_to)
+    elif args.consulta == 'campeao':
+        df = q.champion_matchups(args.alvo[0], args.patch, args.region, args.date_from, args.date_to)
+    else:
+        df = q.player_trend(args.alvo[0], args.region, args.date_from, args.date_to)
+    elapsed = time.perf_counter() - start
+    if df is None:
+        print("Sem dados para esse filtro.")
+        sys.exit(1)
+    print(df.to_string(index=False))
+    print(f"({len(df)} linhas em {elapsed * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
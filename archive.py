@@ -0,0 +1,200 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from row_batch import RowBatch, as_float, as_int, column_kind
+
+# --- ARQUIVO COLUNAR (PARQUET PARTICIONADO) ---
+# Substitui o backup em CSV (sep=';' e decimal=',') por Parquet com tipos corretos e
+# compressão zstd, particionado em pastas Hive:
+#   dados/archive/Region=kr/Date=2026-01-09/Patch=16.1/part-....parquet
+# (Date = dia UTC do início da partida). A leitura poda partições pelo filtro
+# (região, intervalo de datas, patch) e lê só as colunas pedidas.
+# Cada lote gera um arquivo por partição; no fim da execução compact_archive junta os
+# arquivos de cada partição tocada num só, antes de o workflow commitar.
+
+ARCHIVE_DIR = os.path.join('dados', 'archive')
+PARTITION_COLS = ['Region', 'Date', 'Patch']
+PARTITIONING = ds.partitioning(pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor='hive')
+
+# Tipo pelo nome da coluna (row_batch.column_kind), o mesmo em todos os arquivos; int64
+# com nulo quando a coluna não existe na linha.
+ARROW_TYPES = {'str': pa.string(), 'float': pa.float64(), 'int': pa.int64()}
+
+
+def column_type(name):
+    return ARROW_TYPES[column_kind(name)]
+
+
+def to_arrow_array(values, type):
+    if pa.types.is_integer(type):
+        values = [as_int(v) for v in values]
+    elif pa.types.is_floating(type):
+        values = [as_float(v) for v in values]
+    else:
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values, type=type)
+
+
+def to_arrow(batch):
+    # Colunas do RowBatch direto para arrays Arrow (sem DataFrame)
+    fields = [pa.field(c, column_type(c)) for c in batch.columns]
+    arrays = []
+    for f in fields:
+        try:
+            arrays.append(to_arrow_array(batch.column(f.name), f.type))
+        except ValueError as e:
+            raise ValueError(f"coluna '{f.name}' é inteira: {e}") from None
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def utc_date(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def write_archive(batch, region, root=ARCHIVE_DIR):
+    # Acrescenta um lote de linhas ao arquivo; cada chamada gera arquivos novos.
+    # Idempotente por partida: o lote regravado na retomada da fila (ou um CSV importado
+    # duas vezes) só acrescenta as partidas que ainda não estão no arquivo.
+    if batch.empty: return 0
+    done = archived_match_ids(region, set(map(utc_date, batch.column('Game Start Time'))), root)
+    if done:
+        batch = RowBatch(batch.columns, [r for r, m in zip(batch.rows, batch.column('Match ID')) if str(m) not in done])
+        if batch.empty: return 0
+    table = to_arrow(batch)
+    table = table.append_column(pa.field('Region', pa.string()), pa.array([region] * len(batch), type=pa.string()))
+    table = table.append_column(pa.field('Date', pa.string()),
+                                pa.array([utc_date(ms) for ms in batch.column('Game Start Time')], type=pa.string()))
+    pq.write_to_dataset(
+        table, root, partition_cols=PARTITION_COLS, compression='zstd',
+        basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore',
+    )
+    return len(batch)
+
+
+def archived_match_ids(region, dates, root=ARCHIVE_DIR):
+    # Match IDs já gravados nas partições (Region, Date) do lote: a partida sempre cai
+    # na mesma partição, então não precisa olhar o resto do arquivo
+    if not os.path.isdir(root): return set()
+    filt = build_filter(region) & ds.field('Date').isin(sorted(dates))
+    dataset = open_archive(root, filt)
+    if dataset is None: return set()
+    return set(dataset.to_table(columns=['Match ID'], filter=filt).column('Match ID').to_pylist())
+
+
+def compact_partition(path):
+    # Junta os .parquet de uma pasta de partição num arquivo só. Devolve quantos juntou.
+    # O novo entra antes de os antigos saírem: se cair no meio, a próxima compactação
+    # descarta as partidas repetidas (uma partida sempre está inteira num arquivo).
+    files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.parquet'))
+    if len(files) < 2: return 0
+    tables, seen = [], set()
+    for f in files:
+        table = pq.read_table(f)
+        if seen:
+            table = table.filter(pc.invert(pc.is_in(table.column('Match ID'), value_set=pa.array(sorted(seen)))))
+        seen.update(table.column('Match ID').to_pylist())
+        tables.append(table)
+    schema = pa.unify_schemas([t.schema for t in tables])
+    for i, t in enumerate(tables):
+        # Colunas novas (ex: minuto alvo novo) ficam nulas nos arquivos antigos
+        for field in schema:
+            if field.name not in t.column_names: t = t.append_column(field, pa.nulls(len(t), field.type))
+        tables[i] = t.select(schema.names)
+    tmp = os.path.join(path, f'_compact-{uuid.uuid4().hex}.tmp')
+    pq.write_table(pa.concat_tables(tables), tmp, compression='zstd')
+    os.replace(tmp, os.path.join(path, f'part-{uuid.uuid4().hex}-0.parquet'))
+    for f in files: os.remove(f)
+    return len(files)
+
+
+def compact_archive(region=None, dates=None, root=ARCHIVE_DIR):
+    # Compacta as partições (Region, Date) pedidas, ou o arquivo todo. Devolve quantas mudaram.
+    compacted = 0
+    for region_dir in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if region is not None and region_dir != f'Region={region}': continue
+        for date_dir in sorted(os.listdir(os.path.join(root, region_dir))):
+            if dates is not None and date_dir[len('Date='):] not in dates: continue
+            for patch_dir in sorted(os.listdir(os.path.join(root, region_dir, date_dir))):
+                path = os.path.join(root, region_dir, date_dir, patch_dir)
+                if os.path.isdir(path) and compact_partition(path): compacted += 1
+    return compacted
+
+
+def archive_version(root=ARCHIVE_DIR):
+    # Muda sempre que um arquivo Parquet entra, sai ou é regravado, venha ele do
+    # write_archive ou de um git pull (o workflow só commita os .parquet).
+    # (0, 0, 0) = arquivo ainda vazio
+    count = newest = size = 0
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for e in entries:
+            if e.is_dir():
+                stack.append(e.path)
+            elif e.name.endswith('.parquet'):
+                st = e.stat()
+                count += 1
+                newest = max(newest, st.st_mtime_ns)
+                size += st.st_size
+    return count, newest, size
+
+
+def build_filter(region=None, date_from=None, date_to=None, patch=None):
+    expr = None
+    conds = []
+    if region: conds.append(ds.field('Region') == region)
+    if date_from: conds.append(ds.field('Date') >= date_from)
+    if date_to: conds.append(ds.field('Date') <= date_to)
+    if patch:
+        patches = [patch] if isinstance(patch, str) else list(patch)
+        conds.append(ds.field('Patch').isin(patches))
+    for c in conds:
+        expr = c if expr is None else expr & c
+    return expr
+
+
+def open_archive(root=ARCHIVE_DIR, filter=None):
+    # Dataset com o schema unificado só dos arquivos que passam no filtro de partição
+    # (colunas novas, ex: um minuto alvo novo, aparecem como nulo nos arquivos antigos)
+    base = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    fragments = list(base.get_fragments(filter=filter))
+    if not fragments: return None
+    schema = pa.unify_schemas([f.physical_schema for f in fragments] + [PARTITIONING.schema])
+    return ds.dataset([f.path for f in fragments], schema=schema, format='parquet',
+                      partitioning=PARTITIONING, partition_base_dir=root)
+
+
+def read_archive(columns=None, region=None, date_from=None, date_to=None, patch=None, root=ARCHIVE_DIR):
+    # Ex: read_archive(['Champion', 'Gold Diff 14\''], region='kr', patch='16.1')
+    filt = build_filter(region, date_from, date_to, patch)
+    dataset = open_archive(root, filt)
+    if dataset is None: return pd.DataFrame(columns=columns or [])
+    return dataset.to_table(columns=columns, filter=filt).to_pandas()
+
+
+def import_csv(path, region='kr', root=ARCHIVE_DIR):
+    # Converte um backup antigo (dados/AAAA-MM-DD.csv) para o arquivo Parquet
+    df = pd.read_csv(path, sep=';', decimal=',')
+    return write_archive(RowBatch.from_frame(df), region, root)
+
+
+if __name__ == "__main__":
+    # python archive.py importar dados/*.csv
+    # python archive.py compactar            (um arquivo por partição no arquivo todo)
+    if len(sys.argv) == 2 and sys.argv[1] == 'compactar':
+        print(f" > {compact_archive()} partições compactadas")
+        sys.exit(0)
+    if len(sys.argv) < 3 or sys.argv[1] != 'importar':
+        print("Uso: python archive.py importar dados/AAAA-MM-DD.csv [...] | python archive.py compactar")
+        sys.exit(1)
+    for p in sys.argv[2:]:
+        print(f" > {p}: {import_csv(p)} linhas")
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_sink import copy_upsert
+from row_batch import RowBatch
+
+# --- BENCHMARK: to_sql x COPY + upsert ---
+# Grava o mesmo CSV de backup diário (dados/*.csv) nas duas formas num Postgres LOCAL
+# e compara o tempo por lote. Depois regrava o último lote com COPY para mostrar que
+# repetir é idempotente (a contagem de linhas não muda).
+#
+#   BENCH_DB_URL=postgresql://postgres@localhost/bench python benchmarks/bench_db_sink.py [dados/2026-01-09.csv]
+
+BATCH_ROWS = 1000  # ~100 partidas x 10 jogadores, como no salvar_lote
+
+
+def load_sample(path):
+    df = pd.read_csv(path, sep=';', decimal=',')
+    # O backup pode ter partidas repetidas (execuções que caíram no meio)
+    return df.drop_duplicates(subset=['Match ID', 'Champion']).reset_index(drop=True)
+
+
+def run(engine, df):
+    batches = [df.iloc[i:i + BATCH_ROWS] for i in range(0, len(df), BATCH_ROWS)]
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS bench_to_sql'))
+        conn.execute(text('DROP TABLE IF EXISTS bench_copy'))
+
+    start = time.perf_counter()
+    for b in batches:
+        b.to_sql('bench_to_sql', engine, if_exists='append', index=False, chunksize=500)
+    t_to_sql = time.perf_counter() - start
+
+    rows = [RowBatch.from_frame(b) for b in batches]
+    start = time.perf_counter()
+    for b in rows:
+        with engine.begin() as conn:
+            copy_upsert(conn, b, 'bench_copy', keys=('Match ID', 'Champion'))
+    t_copy = time.perf_counter() - start
+
+    # Reenvio do último lote: tem que continuar com o mesmo número de linhas
+    with engine.begin() as conn:
+        copy_upsert(conn, rows[-1], 'bench_copy', keys=('Match ID', 'Champion'))
+        n_copy = conn.execute(text('SELECT COUNT(*) FROM bench_copy')).scalar()
+        n_to_sql = conn.execute(text('SELECT COUNT(*) FROM bench_to_sql')).scalar()
+
+    print(f"Linhas: {len(df)} x {len(df.columns)} colunas em {len(batches)} lotes")
+    print(f"to_sql(chunksize=500): {t_to_sql:.2f}s  ({len(df) / t_to_sql:.0f} linhas/s)")
+    print(f"COPY + upsert:         {t_copy:.2f}s  ({len(df) / t_copy:.0f} linhas/s)  -> {t_to_sql / t_copy:.1f}x")
+    print(f"Linhas finais: to_sql={n_to_sql}  copy={n_copy} (após reenviar o último lote)")
+
+
+if __name__ == "__main__":
+    db_url = os.environ.get("BENCH_DB_URL")
+    if not db_url:
+        print("ERRO: BENCH_DB_URL ausente (use um Postgres local, nunca o de produção).")
+        sys.exit(1)
+    path = sys.argv[1] if len(sys.argv) > 1 else 'dados/2026-01-09.csv'
+    run(create_engine(db_url), load_sample(path))
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from features import BR_COLUMNS, DIFF_MINUTES, KR_COLUMNS, TARGET_MINUTES, process_match_br, process_match_kr
+from synthetic import synthetic_match
+from timeline_decode import slim_timeline
+
+# --- BENCHMARK: extração de features (app.py x app_br.py) ---
+# Mede process_match_kr e process_match_br sobre partidas sintéticas (synthetic.py): partidas por segundo, CPU por
+# partida e pico de memória alocada durante a extração. A timeline passa pelo
+# slim_timeline antes, igual ao que chega do RiotClient.
+#
+# Antes de medir, confere a saída contra as linhas gravadas em golden/features.jsonl
+# (timeline completa e enxuta). Qualquer diferença numa célula = código de saída 1,
+# então uma otimização que muda o resultado não passa despercebida. Se a mudança for
+# intencional, regrave com --gravar-golden e revise o diff do arquivo.
+#
+#   python benchmarks/bench_features.py [--partidas 300] [--minutos 30] [--densidade 1.0]
+#   python benchmarks/bench_features.py --so-conferir
+#   python benchmarks/bench_features.py --gravar-golden
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'features.jsonl')
+EXTRACTORS = {'kr': (process_match_kr, KR_COLUMNS), 'br': (process_match_br, BR_COLUMNS)}
+# (semente, minutos, densidade de eventos, peculiaridade)
+GOLDEN_CASES = [
+    (1, 32, 1.0, None),
+    (2, 24, 2.5, None),              # muitas lutas
+    (3, 41, 0.5, None),              # partida longa, poucas lutas
+    (4, 15, 1.0, None),              # logo acima do corte de 15 min do app.py
+    (5, 12, 1.0, None),              # app.py descarta; app_br.py deixa os minutos 14+ vazios
+    (6, 28, 1.0, 'sem_rota'),        # jogador sem teamPosition (e o oponente sem par)
+    (7, 27, 1.0, 'frame_faltando'),  # participante ausente num frame (desconexão)
+]
+MEMORY_SAMPLE = 20
+
+
+def golden_case(seed, minutes, density, quirk):
+    match, timeline = synthetic_match(seed, minutes, density)
+    if quirk == 'sem_rota':
+        match['info']['participants'][3]['teamPosition'] = ''
+    if quirk == 'frame_faltando':
+        for frame in timeline['info']['frames'][10:13]:
+            del frame['participantFrames']['7']
+    return match['metadata']['matchId'], match, timeline
+
+
+def extract_golden(slim):
+    # {(extrator, match_id): linhas}
+    out = {}
+    for case in GOLDEN_CASES:
+        match_id, match, timeline = golden_case(*case)
+        if slim: timeline = slim_timeline(timeline)
+        for name, (extract, _) in EXTRACTORS.items():
+            out[(name, match_id)] = [list(r) for r in extract(match_id, match, timeline)]
+    return out
+
+
+def write_golden(path=GOLDEN_PATH):
+    # Uma linha JSON por linha extraída: o diff do arquivo mostra exatamente o que mudou
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'target_minutes': TARGET_MINUTES, 'diff_minutes': DIFF_MINUTES,
+                            'columns': {k: c for k, (_, c) in EXTRACTORS.items()}}, ensure_ascii=False) + '\n')
+        for (name, match_id), rows in extract_golden(slim=False).items():
+            for row in rows:
+                f.write(json.dumps({'extractor': name, 'match': match_id, 'row': row}, ensure_ascii=False) + '\n')
+
+
+def read_golden(path=GOLDEN_PATH):
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        expected = {}
+        for line in f:
+            item = json.loads(line)
+            expected.setdefault((item['extractor'], item['match']), []).append(item['row'])
+    return header, expected
+
+
+def compare(expected, got):
+    # Lista de diferenças legíveis (vazia = igual)
+    problems = []
+    for key in sorted(set(expected) | set(got)):
+        name, match_id = key
+        # Caso sem linhas (partida descartada) não aparece no arquivo
+        e_rows, g_rows = expected.get(key, []), got.get(key, [])
+        columns = EXTRACTORS[name][1]
+        if len(e_rows) != len(g_rows):
+            problems.append(f"{name} {match_id}: {len(g_rows)} linhas (esperado {len(e_rows)})")
+        for i, (e_row, g_row) in enumerate(zip(e_rows, g_rows)):
+            for col, e_val, g_val in zip(columns, e_row, g_row):
+                if e_val != g_val or type(e_val) is float and type(g_val) is not float:
+                    problems.append(f"{name} {match_id} linha {i} '{col}': {g_val!r} (esperado {e_val!r})")
+    return problems
+
+
+def check_golden(path=GOLDEN_PATH):
+    # True se bateu (ou se não dá para comparar); imprime as diferenças
+    if not os.path.exists(path):
+        print(f"Golden ausente ({path}): rode com --gravar-golden.")
+        return True
+    header, expected = read_golden(path)
+    if header['target_minutes'] != TARGET_MINUTES or header['diff_minutes'] != DIFF_MINUTES:
+        print("Golden gravado com outra grade de minutos (TARGET_MINUTES/DIFF_MINUTES): conferência pulada.")
+        return True
+    ok = True
+    for slim in (False, True):
+        problems = compare(expected, extract_golden(slim))
+        label = 'timeline enxuta' if slim else 'timeline completa'
+        if problems:
+            ok = False
+            print(f"Golden DIVERGENTE ({label}): {len(problems)} diferenças")
+            for p in problems[:20]: print(f"  {p}")
+        else:
+            print(f"Golden ok ({label}): {len(expected)} casos idênticos.")
+    return ok
+
+
+def build_sample(n, minutes, density):
+    # Durações espalhadas em torno de --minutos (±6), como numa noite de coleta
+    sample = []
+    for i in range(n):
+        match, timeline = synthetic_match(1000 + i, max(16, minutes - 6 + i % 13), density)
+        sample.append((match['metadata']['matchId'], match, slim_timeline(timeline)))
+    return sample
+
+
+def run(extract, sample):
+    wall, cpu = time.perf_counter(), time.process_time()
+    rows = 0
+    for match_id, match, timeline in sample:
+        rows += len(extract(match_id, match, timeline))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    # Pico de memória separado (o tracemalloc deixa a extração bem mais lenta)
+    tracemalloc.start()
+    for match_id, match, timeline in sample[:MEMORY_SAMPLE]:
+        extract(match_id, match, timeline)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'matches_s': len(sample) / wall, 'cpu_ms': 1000 * cpu / len(sample), 'rows': rows, 'peak_kb': peak / 1024}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark da extração de features com partidas sintéticas.')
+    parser.add_argument('--partidas', type=int, default=300)
+    parser.add_argument('--minutos', type=int, default=30)
+    parser.add_argument('--densidade', type=float, default=1.0, help='multiplicador de eventos da timeline')
+    parser.add_argument('--so-conferir', action='store_true', help='só a conferência contra o golden')
+    parser.add_argument('--gravar-golden', action='store_true', help='regrava golden/features.jsonl')
+    args = parser.parse_args()
+
+    if args.gravar_golden:
+        write_golden()
+        print(f"Golden regravado em {GOLDEN_PATH}. Revise o diff antes de commitar.")
+        sys.exit(0)
+    ok = check_golden()
+    if args.so_conferir or not ok: sys.exit(0 if ok else 1)
+
+    sample = build_sample(args.partidas, args.minutos, args.densidade)
+    frames = sum(len(t['info']['frames']) for _, _, t in sample) / len(sample)
+    print(f"{len(sample)} partidas sintéticas, {frames:.0f} frames em média, densidade {args.densidade}")
+    for name, (extract, _) in EXTRACTORS.items():
+        r = run(extract, sample)
+        print(f"process_match_{name}  {r['matches_s']:7.0f} partidas/s  CPU {r['cpu_ms']:6.2f} ms/partida  "
+              f"pico {r['peak_kb']:6.0f} KB  ({r['rows']} linhas)")
@@ -0,0 +1,82 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from raw_cache import CACHE_DIR, RawCache, read_payload
+from timeline_decode import decode_timeline, loads
+
+# --- BENCHMARK: timeline completa x enxuta ---
+# Decodifica as timelines do cache bruto de três formas e compara tempo por partida,
+# memória retida por timeline decodificada e pico durante o parse (tracemalloc) e pico
+# de RSS do processo segurando CONCURRENCY timelines ao mesmo tempo (como os downloads
+# em voo do pipeline). O modo enxuto faz o parse completo antes de reduzir: o pico do
+# parse não cai, o que cai é a memória retida.
+# Cada modo roda num processo separado para o pico de RSS de um não contaminar o outro.
+#
+#   python benchmarks/bench_timeline_decode.py [cache_raw] [n_partidas]
+
+CONCURRENCY = 16
+MODES = {
+    'json completo': json.loads,
+    'orjson completo': loads,  # = json.loads se o orjson não estiver instalado
+    'enxuto': decode_timeline,
+}
+
+
+def load_sample(root, n):
+    # Corpo bruto (bytes) das timelines, como chegam da API
+    sample = []
+    for path in RawCache(root).paths():
+        payload = read_payload(path)
+        if payload: sample.append(json.dumps(payload['timeline'], separators=(',', ':')).encode('utf-8'))
+        if len(sample) >= n: break
+    return sample
+
+
+def run_mode(mode, sample):
+    decode = MODES[mode]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    in_flight = []
+    start = time.perf_counter()
+    for raw in sample:
+        in_flight.append(decode(raw))
+        if len(in_flight) > CONCURRENCY: in_flight.pop(0)
+    elapsed = time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    in_flight.clear()
+
+    tracemalloc.start()
+    timeline = decode(sample[0])
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del timeline
+    return {'ms': 1000 * elapsed / len(sample), 'retained_kb': retained / 1024, 'peak_kb': peak / 1024,
+            'rss_mb': rss_peak / 1024}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        # Processo filho: python bench_timeline_decode.py --mode <modo> <cache> <n>
+        print(json.dumps(run_mode(sys.argv[2], load_sample(sys.argv[3], int(sys.argv[4])))))
+        sys.exit(0)
+
+    root = sys.argv[1] if len(sys.argv) > 1 else CACHE_DIR
+    n = sys.argv[2] if len(sys.argv) > 2 else '200'
+    sample = load_sample(root, int(n))
+    if not sample:
+        print(f"ERRO: nenhuma partida no cache '{root}'.")
+        sys.exit(1)
+    print(f"{len(sample)} timelines, {sum(map(len, sample)) / len(sample) / 1024:.0f} KB de JSON em média, "
+          f"{CONCURRENCY} em memória ao mesmo tempo")
+    if loads is json.loads: print("(orjson não instalado: 'orjson completo' usa o json da stdlib)")
+    for mode in MODES:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode, root, n],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout)
+        print(f"{mode:<16} {r['ms']:7.2f} ms/partida  retida {r['retained_kb']:8.0f} KB  "
+              f"pico parse {r['peak_kb']:8.0f} KB  RSS +{r['rss_mb']:.0f} MB")
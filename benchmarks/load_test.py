@@ -0,0 +1,165 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from sqlalchemy import create_engine, text
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+from collector import region_config
+from dedupe import INDEX_TABLE
+from discovery import PLAYERS_TABLE
+from mock_riot import add_arguments
+from rollups import ROLLUP_TABLE
+from sketches import SKETCH_TABLE
+
+# --- TESTE DE CARGA: coleta completa contra o simulador ---
+# Sobe o simulador (mock_riot.py) num processo, roda o collector.py de verdade em
+# outro (mesmo main() do workflow, com RIOT_API_BASE apontando para o simulador) e
+# grava num Postgres LOCAL. No fim cruza três fontes:
+#   - relatório da execução de cada job (metrics/run_*.json, ver metrics.py)
+#   - contagens do simulador (GET /_stats: requisições, 429 de limite, erros injetados)
+#   - partidas distintas que chegaram no banco
+# e mostra partidas por minuto de ponta a ponta. As tabelas da coleta no banco de
+# teste são apagadas antes (--manter-banco para medir uma execução incremental).
+#
+#   BENCH_DB_URL=postgresql://postgres@localhost/bench python benchmarks/load_test.py kr br --target 300 \
+#       [--latencia 80] [--erro-429 0.01] [--erro-5xx 0.01] [--limite-app 20:1,100:120]
+
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args, port):
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'mock_riot.py'), '--porta', str(port),
+           '--jogadores', str(args.jogadores), '--partidas', str(args.partidas), '--latencia', str(args.latencia),
+           '--limite-app', args.limite_app, '--erro-429', str(args.erro_429), '--erro-5xx', str(args.erro_5xx),
+           '--semente', str(args.semente), '--sem-puuid', str(args.sem_puuid),
+           '--plataformas', ','.join(region_config(r)['platform'] for r in args.regions)]
+    if args.fixtures: cmd += ['--fixtures', args.fixtures]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        try:
+            mock_stats(port)
+            return proc
+        except OSError:
+            if proc.poll() is not None: break
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('simulador não respondeu')
+
+
+def mock_stats(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stats', timeout=2) as resp:
+        return json.loads(resp.read())
+
+
+def reset_db(engine, regions):
+    tables = [region_config(r)['table'] for r in regions] + [INDEX_TABLE, PLAYERS_TABLE, ROLLUP_TABLE, SKETCH_TABLE]
+    with engine.begin() as conn:
+        for t in tables: conn.execute(text(f'DROP TABLE IF EXISTS "{t}" CASCADE'))
+
+
+def db_matches(engine, regions):
+    out = {}
+    with engine.begin() as conn:
+        for r in regions:
+            table = region_config(r)['table']
+            try:
+                out[r] = conn.execute(text(f'SELECT COUNT(DISTINCT "Match ID") FROM "{table}"')).scalar()
+            except Exception:
+                out[r] = 0
+    return out
+
+
+def run(args, db_url):
+    engine = create_engine(db_url)
+    if not args.manter_banco: reset_db(engine, args.regions)
+    before = db_matches(engine, args.regions)
+
+    port = free_port()
+    mock = start_mock(args, port)
+    workdir = tempfile.mkdtemp(prefix='riftanalysis_carga_')
+    env = dict(os.environ, RIOT_API_BASE=f'http://127.0.0.1:{port}/{{routing}}', RIOT_API_KEY='mock',
+               RIOT_API_KEY_BR='mock-br', DB_URL=db_url, PYTHONUNBUFFERED='1')
+    log_path = os.path.join(workdir, 'coleta.log')
+    try:
+        start = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            result = subprocess.run([sys.executable, os.path.join(ROOT, 'collector.py'), *args.regions,
+                                     '--target', str(args.target)], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        elapsed = time.perf_counter() - start
+        server = mock_stats(port)
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    if result.returncode != 0:
+        print(f"ERRO: a coleta terminou com código {result.returncode} (log em {log_path})")
+        with open(log_path, encoding='utf-8') as f: print(''.join(f.readlines()[-20:]))
+        sys.exit(1)
+    after = db_matches(engine, args.regions)
+    reports = {}
+    for path in sorted(glob.glob(os.path.join(workdir, 'metrics', 'run_*.json'))):
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        reports[report['job']] = report
+
+    print(f"Simulador: latência {args.latencia:.0f} ms, limite app {args.limite_app}, "
+          f"429 {args.erro_429:.1%}, 5xx {args.erro_5xx:.1%}")
+    print(f"Coleta {' '.join(args.regions)} (alvo {args.target}): {elapsed:.1f} s de ponta a ponta (log em {log_path})")
+    total = 0
+    for r in args.regions:
+        rep = reports.get(r, {})
+        c = rep.get('counters', {})
+        written = c.get('matches_written', 0)
+        in_db = after.get(r, 0) - before.get(r, 0)
+        total += written
+        print(f"  {r}: {written} partidas gravadas ({in_db} novas no banco), {c.get('remakes', 0)} remakes, "
+              f"{c.get('short', 0)} curtas, {c.get('no_role', 0)} sem rota, "
+              f"{c.get('fetch_failed', 0) + c.get('fetch_deferred', 0)} falhas de download, "
+              f"{written / rep['duration_s'] * 60 if rep.get('duration_s') else 0:.0f} partidas/min no job")
+    print(f"  Total: {total} partidas -> {total / elapsed * 60:.0f} partidas/min")
+
+    # Jobs que dividem a chave de API dividem o cliente (e o relatório dele): um por chave
+    clients = {region_config(job)['key_env']: rep['api']['counters'] for job, rep in reports.items()}
+    api = {}
+    for counters in clients.values():
+        for k, v in counters.items(): api[k] = api.get(k, 0) + v
+    requests_total = sum(server['requests'].values())
+    print(f"Servidor: {requests_total} requisições "
+          f"({', '.join(f'{k} {v}' for k, v in sorted(server['requests'].items()))})")
+    print(f"  429 de limite: app {server['limited'].get('application', 0)}, método {server['limited'].get('method', 0)}; "
+          f"injetados: 429 {server['injected'].get('429', 0)}, 5xx {server['injected'].get('5xx', 0)}")
+    print(f"Cliente: {api.get('retries', 0)} retries, {api.get('circuit_open', 0)} recusas de circuito aberto, "
+          f"{api.get('network_errors', 0)} erros de rede")
+    return total / elapsed * 60
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Teste de carga da coleta contra o simulador da API.')
+    parser.add_argument('regions', nargs='+', help='kr, br ou plataformas (euw1, na1, ...)')
+    parser.add_argument('--target', type=int, default=300, help='partidas por região (Liga Master)')
+    parser.add_argument('--manter-banco', action='store_true', help='não apaga as tabelas da coleta antes')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    db_url = os.environ.get("BENCH_DB_URL")
+    if not db_url:
+        print("ERRO: BENCH_DB_URL ausente (use um Postgres local, nunca o de produção).")
+        sys.exit(1)
+    run(args, db_url)
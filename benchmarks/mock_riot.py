@@ -0,0 +1,390 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from raw_cache import RawCache, read_payload
+from riot_client import parse_rate_limits
+from synthetic import synthetic_match
+
+# --- SIMULADOR LOCAL DA API DA RIOT ---
+# Responde os endpoints que a coleta usa (Liga Master, summoner, account, lista de
+# partidas, partida e timeline) sem chave nem internet, para testar concorrência,
+# rate limit e lotes com segurança. O primeiro segmento do caminho faz o papel do host:
+#   RIOT_API_BASE=http://127.0.0.1:8765/{routing}  ->  /kr/lol/league/v4/...
+# Cada plataforma (kr, br1...) é um "mundo" com jogadores e histórico de partidas
+# (10 jogadores por partida, alguns bem mais ativos que outros, alguns inativos).
+# As partidas saem de TEMPLATES partidas-modelo do gerador sintético (synthetic.py),
+# com Match ID, jogadores e horários de cada partida, ou, com --fixtures, de um cache
+# bruto já baixado (cache_raw/).
+#
+# Simula:
+#   - latência por requisição (lognormal com a média pedida)
+#   - rate limit de app (por roteamento) e de método em janelas fixas, com os
+#     headers X-App-Rate-Limit(-Count) / X-Method-Rate-Limit(-Count) e 429 + Retry-After
+#   - 429 de serviço e 5xx injetados com a probabilidade pedida
+#   - gzip quando o cliente pede
+# GET /_stats devolve as contagens do servidor (usado pelo load_test.py).
+#
+#   python benchmarks/mock_riot.py [--porta 8765] [--latencia 80] [--erro-429 0.01] [--erro-5xx 0.01]
+
+APP_LIMITS = '500:10,30000:600'  # chave de produção; a de desenvolvimento é 20:1,100:120
+METHOD_LIMITS = {
+    'league.masters': '30:10',
+    'summoner.by_id': '1600:60',
+    'account.by_riot_id': '1000:60',
+    'match.ids_by_puuid': '2000:10',
+    'match.by_id': '2000:10',
+    'match.timeline': '2000:10',
+}
+ROUTES = [
+    ('league.masters', re.compile(r'/lol/league/v4/masterleagues/by-queue/(?P<queue>[^/]+)$')),
+    ('summoner.by_id', re.compile(r'/lol/summoner/v4/summoners/(?P<summoner_id>[^/]+)$')),
+    ('account.by_riot_id', re.compile(r'/riot/account/v1/accounts/by-riot-id/(?P<name>[^/]+)/(?P<tag>[^/]+)$')),
+    ('match.ids_by_puuid', re.compile(r'/lol/match/v5/matches/by-puuid/(?P<puuid>[^/]+)/ids$')),
+    ('match.timeline', re.compile(r'/lol/match/v5/matches/(?P<match_id>[^/]+)/timeline$')),
+    ('match.by_id', re.compile(r'/lol/match/v5/matches/(?P<match_id>[^/]+)$')),
+]
+# Roteamento regional -> plataforma usada para Riot IDs (account-v1 não diz a plataforma)
+REGION_PLATFORM = {'asia': 'kr', 'americas': 'br1', 'europe': 'euw1', 'sea': 'oc1'}
+MATCH_SPACING_MS = 45 * 1000  # uma partida nova a cada 45 s no mundo
+INACTIVE = 0.1                # fração de jogadores da liga sem partida nenhuma
+TEMPLATES = 48  # partidas-modelo por plataforma
+
+
+class World:
+    # Jogadores e histórico de partidas de uma plataforma
+    def __init__(self, platform):
+        self.platform = platform
+        self.players = []
+        self.history = {}  # puuid -> [(criação ms, match_id)] da mais nova para a mais antiga
+        self.matches = {}  # match_id -> {'creation', 'puuids', 'seed' ou 'path'}
+
+    def add_match(self, match_id, creation, puuids, **source):
+        self.matches[match_id] = dict(source, creation=creation, puuids=puuids)
+        for puuid in puuids:
+            self.history.setdefault(puuid, []).append((creation, match_id))
+
+    def finish(self):
+        for games in self.history.values(): games.sort(reverse=True)
+
+    @classmethod
+    def synthetic(cls, platform, players, matches, seed):
+        world = cls(platform)
+        r = random.Random(f'{seed}-{platform}')
+        world.players = [f'mock-{platform}-{i:06d}' for i in range(players)]
+        # Atividade com cauda longa (poucos jogadores em muitas partidas); inativos com peso 0
+        weights = [0 if r.random() < INACTIVE else r.paretovariate(1.2) for _ in world.players]
+        cum, acc = [], 0.0
+        for w in weights:
+            acc += w
+            cum.append(acc)
+        now = int(time.time() * 1000)
+        for i in range(matches):
+            puuids = []
+            while len(puuids) < 10:
+                p = r.choices(world.players, cum_weights=cum)[0]
+                if p not in puuids: puuids.append(p)
+            match_id = f'{platform.upper()}_{7000000000 + i}'
+            world.add_match(match_id, now - (matches - i) * MATCH_SPACING_MS, puuids,
+                            seed=zlib.crc32(match_id.encode('utf-8')))
+        world.finish()
+        return world
+
+    @classmethod
+    def from_fixtures(cls, root):
+        # Um mundo por plataforma encontrada no cache bruto (pelo prefixo do Match ID)
+        worlds = {}
+        for path in RawCache(root).paths():
+            payload = read_payload(path)
+            if not payload: continue
+            match = payload['match']
+            match_id = match['metadata']['matchId']
+            platform = match_id.split('_')[0].lower()
+            world = worlds.setdefault(platform, cls(platform))
+            puuids = [p['puuid'] for p in match['info']['participants']]
+            world.add_match(match_id, match['info']['gameCreation'], puuids, path=path)
+        for world in worlds.values():
+            world.players = sorted(world.history)
+            world.finish()
+        return worlds
+
+
+class FixedWindows:
+    # Contagem por chave em janelas fixas, como o rate limit da Riot: cada janela abre
+    # na primeira requisição e zera inteira quando o período acaba
+    def __init__(self, spec):
+        self.spec = parse_rate_limits(spec)
+        self.windows = {}  # (chave, período) -> [início, contagem]
+        self.lock = threading.Lock()
+
+    def hit(self, key, now):
+        # (header de contagem, Retry-After em s ou None se passou)
+        with self.lock:
+            current = []
+            for limit, period in self.spec:
+                w = self.windows.get((key, period))
+                if w is None or now >= w[0] + period:
+                    w = self.windows[(key, period)] = [now, 0]
+                current.append((limit, period, w))
+            retry = max((w[0] + period - now for limit, period, w in current if w[1] >= limit), default=0.0)
+            if not retry:
+                for _, _, w in current: w[1] += 1
+            counts = ','.join(f'{w[1]}:{period}' for _, period, w in current)
+        return counts, (max(1, math.ceil(retry)) if retry else None)
+
+
+class Chunks(list):
+    # Corpo em pedaços (bytes, gzip pronto ou None) que o Handler concatena
+    pass
+
+
+class MockRiot:
+    def __init__(self, players=400, matches=4000, latency_ms=80, app_limits=APP_LIMITS, method_limits=None,
+                 p429=0.0, p5xx=0.0, seed=0, fixtures=None, summoner_only=0.0, platforms=()):
+        self.players = players
+        self.n_matches = matches
+        self.latency = latency_ms / 1000
+        self.app_spec = app_limits
+        self.method_specs = dict(METHOD_LIMITS, **(method_limits or {}))
+        self.app = FixedWindows(app_limits)
+        self.methods = {m: FixedWindows(spec) for m, spec in self.method_specs.items()}
+        self.p429 = p429
+        self.p5xx = p5xx
+        self.seed = seed
+        self.summoner_only = summoner_only
+        self.worlds = World.from_fixtures(fixtures) if fixtures else {}
+        self.fixed = bool(fixtures)
+        self.templates = {}
+        self.lock = threading.Lock()
+        for platform in platforms: self.world(platform)
+        self.stats = {'requests': {}, 'status': {}, 'injected': {'429': 0, '5xx': 0}, 'limited': {'application': 0, 'method': 0}}
+
+    def world(self, platform):
+        with self.lock:
+            created = platform not in self.worlds and not self.fixed
+            if created: self.worlds[platform] = World.synthetic(platform, self.players, self.n_matches, self.seed)
+            world = self.worlds.get(platform)
+        if created:
+            # Modelos prontos antes da primeira partida (~2 s por plataforma)
+            for k in range(TEMPLATES): self.template(platform, k)
+        return world
+
+    def _count(self, group, key):
+        with self.lock:
+            self.stats[group][key] = self.stats[group].get(key, 0) + 1
+
+    # --- RESPOSTAS ---
+    def league(self, platform, queue):
+        world = self.world(platform)
+        if world is None: return None
+        entries = []
+        for i, p in enumerate(world.players):
+            entry = {'puuid': p, 'summonerId': f'sid-{p}', 'leaguePoints': 100 + i % 500, 'wins': 100, 'losses': 90,
+                     'rank': 'I', 'veteran': False, 'inactive': False}
+            # Formato antigo da liga (só summonerId): a coleta resolve pelo summoner-v4
+            if zlib.crc32(p.encode('utf-8')) % 1000 < self.summoner_only * 1000: del entry['puuid']
+            entries.append(entry)
+        return {'tier': 'MASTER', 'queue': queue, 'name': 'Mock League', 'entries': entries}
+
+    def summoner(self, platform, summoner_id):
+        # summonerId sintético = 'sid-' + PUUID
+        return {'id': summoner_id, 'puuid': summoner_id[4:], 'summonerLevel': 300} if summoner_id.startswith('sid-') else None
+
+    def account(self, region, name, tag):
+        world = self.world(REGION_PLATFORM.get(region, region))
+        if world is None: return None
+        active = [p for p in world.players if world.history.get(p)] or world.players
+        return {'puuid': active[zlib.crc32(f'{name}#{tag}'.lower().encode('utf-8')) % len(active)],
+                'gameName': name, 'tagLine': tag}
+
+    def match_ids(self, puuid, query):
+        world = self.world(puuid.split('-')[1]) if puuid.startswith('mock-') else next(
+            (w for w in self.worlds.values() if puuid in w.history), None)
+        if world is None: return []
+        games = world.history.get(puuid, [])
+        start_time = int(query.get('startTime', 0)) * 1000
+        end_time = int(query['endTime']) * 1000 if 'endTime' in query else None
+        games = [m for c, m in games if c >= start_time and (end_time is None or c <= end_time)]
+        start, count = int(query.get('start', 0)), min(100, int(query.get('count', 20)))
+        return games[start:start + count]
+
+    def template(self, platform, k):
+        # Partida-modelo serializada uma vez, com marcadores no lugar do Match ID, dos
+        # PUUIDs e dos horários (gerar, serializar e comprimir cada partida custa ~40 ms
+        # de CPU e o simulador viraria o gargalo do teste). Os frames da timeline (quase
+        # todo o corpo) não têm marcador: ficam prontos, inclusive já em gzip.
+        with self.lock:
+            cached = self.templates.get((platform, k))
+        if cached: return cached
+        # Modelos 0 e 40 são remake (menos de 4 min)
+        minutes = 3 if k % 40 == 0 else 15 + k % 26
+        match, timeline = synthetic_match(k, minutes, 0.6 + (k % 9) / 10, platform.upper(), '__MATCH_ID__')
+        info = match['info']
+        fake_puuids = [p['puuid'].encode('utf-8') for p in info['participants']]
+        offsets = {name: info[name] - info['gameCreation'] for name in ('gameCreation', 'gameStartTimestamp', 'gameEndTimestamp')}
+        for name in offsets: info[name] = f'__{name}__'
+
+        def dump(obj): return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        t_info = timeline['info']
+        frames = dump(t_info['frames'])
+        # {"metadata":...,"info":{"frames": | [...] | ,"frameInterval":...}}
+        timeline_parts = (b'{"metadata":' + dump(timeline['metadata']) + b',"info":{"frames":',
+                          (frames, gzip.compress(frames, compresslevel=5)),
+                          b',' + dump({k: v for k, v in t_info.items() if k != 'frames'})[1:] + b'}')
+        cached = (dump(match), timeline_parts, fake_puuids, offsets)
+        with self.lock:
+            self.templates[(platform, k)] = cached
+        return cached
+
+    def match_body(self, match_id, kind):
+        # bytes ou Chunks
+        world = self.world(match_id.split('_')[0].lower())
+        info = world.matches.get(match_id) if world else None
+        if info is None: return None
+        if 'path' in info:
+            payload = read_payload(info['path'])
+            return json.dumps(payload[kind], separators=(',', ':')).encode('utf-8')
+
+        match_raw, (prefix, frames, suffix), fake_puuids, offsets = self.template(world.platform, info['seed'] % TEMPLATES)
+
+        def fill(body):
+            body = body.replace(b'__MATCH_ID__', match_id.encode('utf-8'))
+            for fake, puuid in zip(fake_puuids, info['puuids']): body = body.replace(fake, puuid.encode('utf-8'))
+            for name, offset in offsets.items():
+                body = body.replace(f'"__{name}__"'.encode('utf-8'), str(info['creation'] + offset).encode('utf-8'))
+            return body
+        if kind == 'match': return fill(match_raw)
+        return Chunks([(fill(prefix), None), frames, (fill(suffix), None)])
+
+    def handle(self, path, query, headers):
+        # (status, headers, corpo em bytes ou objeto JSON)
+        if path == '/_stats':
+            with self.lock: return 200, {}, json.loads(json.dumps(self.stats))
+        parts = path.split('/', 2)
+        if len(parts) < 3: return 404, {}, {'status': {'status_code': 404, 'message': 'Not found'}}
+        routing, rest = parts[1], '/' + parts[2]
+        for method, rx in ROUTES:
+            match = rx.match(rest)
+            if match: break
+        if not match: return 404, {}, {'status': {'status_code': 404, 'message': 'Not found'}}
+        self._count('requests', method)
+        if not headers.get('X-Riot-Token'): return 401, {}, {'status': {'status_code': 401, 'message': 'Unauthorized'}}
+
+        now = time.monotonic()
+        app_counts, app_retry = self.app.hit(routing, now)
+        out = {'X-App-Rate-Limit': self.app_spec, 'X-App-Rate-Limit-Count': app_counts}
+        if app_retry is None and method in self.methods:
+            meth_counts, meth_retry = self.methods[method].hit((routing, method), now)
+            out.update({'X-Method-Rate-Limit': self.method_specs[method], 'X-Method-Rate-Limit-Count': meth_counts})
+        else:
+            meth_retry = None
+        if app_retry or meth_retry:
+            limit_type = 'application' if app_retry else 'method'
+            self._count('limited', limit_type)
+            out.update({'Retry-After': str(app_retry or meth_retry), 'X-Rate-Limit-Type': limit_type})
+            return 429, out, {'status': {'status_code': 429, 'message': 'Rate limit exceeded'}}
+
+        # Latência da "rede + serviço" (a média fica em --latencia)
+        sigma = 0.5
+        time.sleep(random.lognormvariate(math.log(self.latency) - sigma ** 2 / 2, sigma) if self.latency > 0 else 0)
+        roll = random.random()
+        if roll < self.p429:
+            self._count('injected', '429')
+            out['X-Rate-Limit-Type'] = 'service'
+            return 429, out, {'status': {'status_code': 429, 'message': 'Rate limit exceeded'}}
+        if roll < self.p429 + self.p5xx:
+            self._count('injected', '5xx')
+            return random.choice((500, 502, 503, 504)), out, {'status': {'status_code': 503, 'message': 'Service unavailable'}}
+
+        args = {k: unquote(v) for k, v in match.groupdict().items()}
+        if method == 'league.masters': body = self.league(routing, args['queue'])
+        elif method == 'summoner.by_id': body = self.summoner(routing, args['summoner_id'])
+        elif method == 'account.by_riot_id': body = self.account(routing, args['name'], args['tag'])
+        elif method == 'match.ids_by_puuid': body = self.match_ids(args['puuid'], query)
+        else: body = self.match_body(args['match_id'], 'timeline' if method == 'match.timeline' else 'match')
+        if body is None: return 404, out, {'status': {'status_code': 404, 'message': 'Data not found'}}
+        return 200, out, body
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como a API real
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        status, headers, body = self.server.mock.handle(url.path, query, self.headers)
+        self.server.mock._count('status', str(status))
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if isinstance(body, Chunks):
+            # gzip com vários membros (um por pedaço) é válido e o urllib3 decodifica
+            if accepts_gzip:
+                body = b''.join(gz or gzip.compress(raw, compresslevel=1) for raw, gz in body)
+                headers['Content-Encoding'] = 'gzip'
+            else:
+                body = b''.join(raw for raw, _ in body)
+        else:
+            if not isinstance(body, bytes): body = json.dumps(body).encode('utf-8')
+            if accepts_gzip and len(body) > 1024:
+                body = gzip.compress(body, compresslevel=1)
+                headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in headers.items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(mock, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.mock = mock
+    return server
+
+
+def add_arguments(parser):
+    # Também usados pelo load_test.py, que repassa tudo para este script
+    parser.add_argument('--jogadores', type=int, default=400, help='jogadores por plataforma')
+    parser.add_argument('--partidas', type=int, default=4000, help='partidas no histórico de cada plataforma')
+    parser.add_argument('--latencia', type=float, default=80, help='latência média em ms')
+    parser.add_argument('--limite-app', default=APP_LIMITS, help='ex: 20:1,100:120 (chave de desenvolvimento)')
+    parser.add_argument('--erro-429', type=float, default=0.0, help='probabilidade de 429 de serviço')
+    parser.add_argument('--erro-5xx', type=float, default=0.0, help='probabilidade de 5xx')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--fixtures', help='cache bruto (cache_raw/) para servir partidas reais')
+    parser.add_argument('--sem-puuid', type=float, default=0.0, help='fração da liga só com summonerId')
+    parser.add_argument('--plataformas', default='kr,br1', help='mundos montados antes de abrir a porta')
+
+
+def from_args(args):
+    return MockRiot(players=args.jogadores, matches=args.partidas, latency_ms=args.latencia, app_limits=args.limite_app,
+                    p429=args.erro_429, p5xx=args.erro_5xx, seed=args.semente, fixtures=args.fixtures,
+                    summoner_only=args.sem_puuid, platforms=[p for p in args.plataformas.split(',') if p])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Simulador local da API da Riot.')
+    parser.add_argument('--porta', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = serve(from_args(args), port=args.porta)
+    print(f"Simulador em http://127.0.0.1:{args.porta}  (RIOT_API_BASE=http://127.0.0.1:{args.porta}/{{routing}})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
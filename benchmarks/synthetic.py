@@ -0,0 +1,227 @@
+import math
+import random
+
+# --- GERADOR DE PARTIDAS SINTÉTICAS (MATCH-V5 + TIMELINE-V5) ---
+# Partida e timeline com a mesma forma do que a API devolve, geradas a partir de uma
+# semente (mesma semente = mesmo JSON). Serve para medir e conferir a extração sem
+# chave de API nem cache bruto. Coerência que a extração enxerga:
+#   - kills/deaths/assists e plates de cada jogador batem com os eventos da timeline
+#   - kills do time em teams[].objectives.champion = soma dos jogadores
+#   - frames de minuto em minuto (com o atraso de alguns ms da API) + frame final
+#   - ouro, xp, cs e dano crescem a cada frame conforme a rota
+# Os campos que a extração não lê (championStats, posição, itens, eventos de ward/item/
+# skill...) também são gerados, para o tamanho do JSON ficar perto do real.
+#
+#   match, timeline = synthetic_match(42, minutes=32, event_density=1.5)
+
+ROLES = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+CHAMPIONS = {
+    'TOP': ['Aatrox', 'Renekton', 'KSante', 'Jax', 'Gnar', 'Rumble', 'Ornn', 'Camille'],
+    'JUNGLE': ['LeeSin', 'Viego', 'Vi', 'Sejuani', 'Maokai', 'XinZhao', 'Nidalee', 'Wukong'],
+    'MIDDLE': ['Ahri', 'Azir', 'Orianna', 'Syndra', 'Taliyah', 'Yone', 'Sylas', 'Corki'],
+    'BOTTOM': ['Jinx', 'Kaisa', 'Varus', 'Ezreal', 'Xayah', 'Zeri', 'Aphelios', 'Kalista'],
+    'UTILITY': ['Thresh', 'Nautilus', 'Rell', 'Rakan', 'Alistar', 'Leona', 'Braum', 'Renata'],
+}
+CHAMPION_IDS = {c: i for i, c in enumerate(sorted(c for cs in CHAMPIONS.values() for c in cs), start=1)}
+# Por minuto: (cs de tropa, cs da selva, ouro, xp, dano em campeões)
+ROLE_PACE = {
+    'TOP': (7.5, 0.3, 390, 480, 480),
+    'JUNGLE': (0.6, 5.2, 370, 430, 380),
+    'MIDDLE': (8.0, 0.4, 410, 500, 620),
+    'BOTTOM': (8.6, 0.2, 420, 400, 650),
+    'UTILITY': (1.2, 0.0, 250, 330, 260),
+}
+KILLS_PER_MINUTE = 0.9   # média da partida com event_density = 1
+FILLER_PER_MINUTE = 22   # ITEM_PURCHASED, SKILL_LEVEL_UP, WARD_PLACED...
+FILLER_TYPES = ['ITEM_PURCHASED', 'SKILL_LEVEL_UP', 'WARD_PLACED', 'WARD_KILL', 'LEVEL_UP', 'ITEM_DESTROYED', 'ITEM_SOLD']
+PLATE_WINDOW = (5, 14)   # placas caem aos 14 min
+GAME_VERSION = '16.1.715.3001'
+CREATION_BASE = 1767926353850
+TIMELINE_STAT_KEYS = ['abilityHaste', 'abilityPower', 'armor', 'armorPen', 'armorPenPercent', 'attackDamage',
+                      'attackSpeed', 'bonusArmorPenPercent', 'bonusMagicPenPercent', 'ccReduction',
+                      'cooldownReduction', 'health', 'healthMax', 'healthRegen', 'lifesteal', 'magicPen',
+                      'magicPenPercent', 'magicResist', 'movementSpeed', 'omnivamp', 'physicalVamp', 'power',
+                      'powerMax', 'powerRegen', 'spellVamp']
+DAMAGE_STAT_KEYS = ['magicDamageDone', 'magicDamageDoneToChampions', 'magicDamageTaken', 'physicalDamageDone',
+                    'physicalDamageDoneToChampions', 'physicalDamageTaken', 'totalDamageDone',
+                    'totalDamageTaken', 'trueDamageDone', 'trueDamageDoneToChampions', 'trueDamageTaken']
+
+
+def _poisson(r, lam):
+    # Knuth: suficiente para as médias pequenas por minuto
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= r.random()
+        if p <= limit: return k
+        k += 1
+
+
+def _kill_events(r, minutes, duration_ms, event_density):
+    # Lutas ficam mais frequentes com o tempo (0.5x no início, 1.5x no fim)
+    events = []
+    for minute in range(minutes + 1):
+        start = minute * 60000
+        end = min(start + 60000, duration_ms)
+        if end <= start: break
+        rate = KILLS_PER_MINUTE * event_density * (0.5 + minute / max(minutes, 1))
+        for _ in range(_poisson(r, rate * (end - start) / 60000)):
+            team = r.choice((100, 200))
+            allies = list(range(1, 6)) if team == 100 else list(range(6, 11))
+            enemies = list(range(6, 11)) if team == 100 else list(range(1, 6))
+            killer = r.choice(allies)
+            event = {'type': 'CHAMPION_KILL', 'timestamp': r.randint(start, end - 1), 'killerId': killer,
+                     'victimId': r.choice(enemies), 'bounty': 300, 'shutdownBounty': 0, 'killStreakLength': 0,
+                     'position': {'x': r.randint(0, 14800), 'y': r.randint(0, 14800)},
+                     'victimDamageDealt': [], 'victimDamageReceived': []}
+            assists = r.sample([a for a in allies if a != killer], r.randint(0, 3))
+            if assists: event['assistingParticipantIds'] = assists
+            # Execução pela torre/minion: killerId 0
+            if r.random() < 0.03: event['killerId'] = 0
+            events.append(event)
+        if PLATE_WINDOW[0] <= minute < PLATE_WINDOW[1]:
+            for _ in range(_poisson(r, 0.8 * event_density)):
+                team = r.choice((100, 200))
+                allies = list(range(1, 6)) if team == 100 else list(range(6, 11))
+                event = {'type': 'TURRET_PLATE_DESTROYED', 'timestamp': r.randint(start, end - 1),
+                         'killerId': r.choice(allies + [0]), 'laneType': r.choice(['TOP_LANE', 'MID_LANE', 'BOT_LANE']),
+                         'teamId': 300 - team, 'position': {'x': r.randint(0, 14800), 'y': r.randint(0, 14800)}}
+                if r.random() < 0.4: event['assistingParticipantIds'] = r.sample(allies, r.randint(1, 2))
+                events.append(event)
+    return events
+
+
+def _filler_events(r, start, end, event_density):
+    events = []
+    for _ in range(_poisson(r, FILLER_PER_MINUTE * event_density * (end - start) / 60000)):
+        etype = r.choice(FILLER_TYPES)
+        event = {'type': etype, 'timestamp': r.randint(start, end - 1), 'participantId': r.randint(1, 10)}
+        if etype.startswith('ITEM'): event['itemId'] = r.choice((1055, 2003, 3006, 3031, 3157, 6672))
+        if etype == 'SKILL_LEVEL_UP': event.update(skillSlot=r.randint(1, 4), levelUpType='NORMAL')
+        if etype.startswith('WARD'): event['wardType'] = r.choice(('YELLOW_TRINKET', 'CONTROL_WARD', 'SIGHT_WARD'))
+        events.append(event)
+    return events
+
+
+def _participant_frame(r, pid, totals, role, minute):
+    cs_lane, cs_jungle, gold, xp, dmg = ROLE_PACE[role]
+    s = totals[pid]
+    if minute:
+        s['minions'] += max(0, round(r.gauss(cs_lane, 1.5)))
+        s['jungle'] += max(0, round(r.gauss(cs_jungle, 1.0)))
+        s['gold'] += max(0, round(r.gauss(gold, 60)))
+        s['xp'] += max(0, round(r.gauss(xp, 70)))
+        s['damage'] += max(0, round(r.gauss(dmg * min(1.0, minute / 10), 120)))
+    level = min(18, 1 + s['xp'] // 900)
+    return {
+        'participantId': pid, 'level': level, 'xp': s['xp'], 'totalGold': s['gold'],
+        'currentGold': r.randint(0, 1500), 'goldPerSecond': 0,
+        'minionsKilled': s['minions'], 'jungleMinionsKilled': s['jungle'],
+        'timeEnemySpentControlled': r.randint(0, 20000),
+        'position': {'x': r.randint(0, 14800), 'y': r.randint(0, 14800)},
+        'championStats': {k: r.randint(0, 2000) for k in TIMELINE_STAT_KEYS},
+        'damageStats': dict({k: r.randint(0, s['damage'] * 2 + 1) for k in DAMAGE_STAT_KEYS},
+                            totalDamageDoneToChampions=s['damage']),
+    }
+
+
+def synthetic_match(seed, minutes=30, event_density=1.0, platform='KR', match_id=None):
+    # minutes: duração (a partida termina entre minutes:00 e minutes:59)
+    # event_density: multiplica abates, placas e eventos que a extração ignora
+    r = random.Random(seed)
+    match_id = match_id or f'{platform}_{7000000000 + seed}'
+    duration = minutes * 60 + r.randint(0, 59)
+    duration_ms = duration * 1000
+    winner = r.choice((100, 200))
+
+    # Campeões distintos no mesmo papel; participantes 1-5 = time 100, 6-10 = time 200
+    pairs = {role: r.sample(CHAMPIONS[role], 2) for role in ROLES}
+    picks = [(team, role, pairs[role][side]) for side, team in enumerate((100, 200)) for role in ROLES]
+
+    kill_events = _kill_events(r, minutes, duration_ms, event_density)
+    kda = {pid: [0, 0, 0, 0] for pid in range(1, 11)}
+    first_blood = None
+    for event in sorted(kill_events, key=lambda e: e['timestamp']):
+        assisting = event.get('assistingParticipantIds', [])
+        killer = event['killerId']
+        if event['type'] == 'CHAMPION_KILL':
+            if killer: kda[killer][0] += 1
+            kda[event['victimId']][1] += 1
+            for a in assisting: kda[a][2] += 1
+            if first_blood is None and killer: first_blood = (killer, assisting)
+        else:
+            for pid in set(assisting) | ({killer} if killer else set()): kda[pid][3] += 1
+
+    # Frames: 0, ~60000, ~120000... e o frame final no fim da partida
+    totals = {pid: {'minions': 0, 'jungle': 0, 'gold': 500, 'xp': 0, 'damage': 0} for pid in range(1, 11)}
+    stamps = [0] + [k * 60000 + r.randint(5, 60) for k in range(1, minutes + 1) if k * 60000 < duration_ms] + [duration_ms + r.randint(0, 500)]
+    by_frame = [[] for _ in stamps]
+    for event in kill_events:
+        # Evento vai para o primeiro frame com timestamp >= o dele
+        i = next(i for i, ts in enumerate(stamps) if ts >= event['timestamp'])
+        by_frame[i].append(event)
+
+    frames = []
+    for i, ts in enumerate(stamps):
+        events = by_frame[i] + (_filler_events(r, stamps[i - 1], ts, event_density) if i else [])
+        events.sort(key=lambda e: e['timestamp'])
+        if i == len(stamps) - 1:
+            events.append({'type': 'GAME_END', 'timestamp': ts, 'gameId': 7000000000 + seed, 'winningTeam': winner})
+        frames.append({'timestamp': ts, 'events': events,
+                       'participantFrames': {str(pid): _participant_frame(r, pid, totals, picks[pid - 1][1], i)
+                                             for pid in range(1, 11)}})
+
+    duration_min = duration / 60
+    participants = []
+    for pid, (team, role, champion) in enumerate(picks, start=1):
+        s = totals[pid]
+        kills, deaths, assists, plates = kda[pid]
+        participants.append({
+            'participantId': pid, 'teamId': team, 'teamPosition': role, 'individualPosition': role, 'lane': role,
+            'championName': champion, 'championId': CHAMPION_IDS[champion],
+            'champLevel': min(18, 1 + s['xp'] // 900), 'win': team == winner,
+            'puuid': f'synthetic-{seed}-{pid:02d}'.ljust(78, '0'), 'summonerName': f'Jogador{seed % 1000}x{pid}',
+            'riotIdGameName': f'Jogador{seed % 1000}x{pid}', 'riotIdTagline': platform[:3],
+            'kills': kills, 'deaths': deaths, 'assists': assists,
+            'totalDamageDealtToChampions': s['damage'], 'totalDamageDealt': s['damage'] * 6 + r.randint(0, 5000),
+            'totalDamageTaken': r.randint(8000, 40000) + 300 * deaths, 'damageSelfMitigated': r.randint(3000, 45000),
+            'goldEarned': s['gold'], 'goldSpent': s['gold'] - r.randint(0, 800),
+            'totalMinionsKilled': s['minions'], 'neutralMinionsKilled': s['jungle'],
+            'visionScore': round(ROLE_PACE[role][2] / 200 * duration_min * r.uniform(0.6, 1.6)),
+            'wardsPlaced': r.randint(3, 12) + (round(duration_min) if role == 'UTILITY' else 0),
+            'wardsKilled': r.randint(0, 10), 'detectorWardsPlaced': r.randint(0, 6),
+            'damageDealtToBuildings': r.randint(0, 9000), 'damageDealtToObjectives': r.randint(0, 25000),
+            'turretPlatesTaken': plates,
+            'firstBloodKill': bool(first_blood and first_blood[0] == pid),
+            'firstBloodAssist': bool(first_blood and pid in first_blood[1]),
+            'firstTowerKill': False, 'firstTowerAssist': False,
+            'timeCCingOthers': r.randint(0, 70),
+            'summoner1Id': 4, 'summoner2Id': 11 if role == 'JUNGLE' else r.choice((7, 12, 14)),
+            **{f'item{k}': r.choice((0, 1055, 3006, 3031, 3157, 6672)) for k in range(7)},
+        })
+    # Primeira torre: alguém do time vencedor, na maioria das vezes
+    tower_team = winner if r.random() < 0.7 else 300 - winner
+    tower_pid = r.choice([p for p in participants if p['teamId'] == tower_team])
+    tower_pid['firstTowerKill'] = True
+
+    teams = []
+    for team in (100, 200):
+        teams.append({'teamId': team, 'win': team == winner, 'bans': [],
+                      'objectives': {'champion': {'first': bool(first_blood) and (first_blood[0] <= 5) == (team == 100),
+                                                  'kills': sum(p['kills'] for p in participants if p['teamId'] == team)},
+                                     'tower': {'first': team == tower_team, 'kills': r.randint(2, 11)}}})
+
+    creation = CREATION_BASE + seed * 1000
+    match = {
+        'metadata': {'dataVersion': '2', 'matchId': match_id, 'participants': [p['puuid'] for p in participants]},
+        'info': {'gameCreation': creation, 'gameStartTimestamp': creation + 30000,
+                 'gameEndTimestamp': creation + 30000 + duration_ms, 'gameDuration': duration,
+                 'gameId': 7000000000 + seed, 'gameMode': 'CLASSIC', 'gameType': 'MATCHED_GAME',
+                 'gameVersion': GAME_VERSION, 'mapId': 11, 'platformId': platform,
+                 'queueId': 420, 'participants': participants, 'teams': teams},
+    }
+    timeline = {
+        'metadata': {'dataVersion': '2', 'matchId': match_id, 'participants': [p['puuid'] for p in participants]},
+        'info': {'frameInterval': 60000, 'gameId': 7000000000 + seed, 'frames': frames,
+                 'participants': [{'participantId': p['participantId'], 'puuid': p['puuid']} for p in participants]},
+    }
+    return match, timeline
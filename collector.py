@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import os
+import sys
+from sqlalchemy import create_engine
+from archive import compact_archive, utc_date, write_archive
+from db_sink import write_batch
+from dedupe import ProcessedIndex
+from discovery import Discovery, PlayerQueue
+from features import BR_COLUMNS, KR_COLUMNS, process_match_kr, process_match_br
+from metrics import Metrics, write_run_report
+from pipeline import log, run_pipeline
+from raw_cache import RawCache
+from riot_client import PLATFORM_TO_REGION, RiotClient
+from rollups import MatchupRollup
+from sketches import QuantileSketches
+from work_queue import WorkQueue
+
+# --- COLETOR MULTI-REGIÃO ---
+# app.py e app_br.py eram a mesma pipeline copiada, mudando só a fonte dos jogadores,
+# a região, o extrator e a tabela. Aqui a pipeline é uma só (Job) com:
+#   - fonte plugável: LadderSource (Liga Master) ou RiotIdSource (lista de Riot IDs)
+#   - sinks plugáveis: DbSink (COPY + upsert) e ArchiveSink (Parquet)
+#   - estágios descoberta -> download -> extração -> gravação em streaming (pipeline.py)
+# Vários jobs rodam no mesmo processo/event loop. Cada chave de API tem um RiotClient
+# próprio, com limitadores por roteamento (kr, asia, br1, americas...), então cada
+# região gasta o próprio orçamento de rate limit e a execução leva o tempo da região
+# mais lenta, não a soma de todas.
+#
+#   python collector.py kr br          (ou qualquer plataforma: euw1, na1, ...)
+
+# --- 🎯 JOGADORES ALVO (BR) ---
+ALVOS = [
+    "Zekas#2002",
+    "han dao#EGC",
+    "Pilot#br11",
+    "Celo#br2",
+    "Gatovisck#愛憎の影"
+]
+
+
+# --- FONTES ---
+class LadderSource:
+    # Jogadores da Liga Master da plataforma (e coparticipantes colhidos das partidas
+    # baixadas), na ordem da PlayerQueue, até juntar 'target' partidas.
+    # Cada grupo de jogadores já vai para o download enquanto o próximo é consultado.
+    def __init__(self, queue='RANKED_SOLO_5x5', target=1440):
+        self.queue = queue
+        self.target = target
+
+    def harvest(self, job, match):
+        job.discovery.harvest(match)
+
+    async def discover(self, job):
+        found = set()
+        log(job, "Conectando à Liga Master...")
+        try:
+            league = await job.client.masters_by_queue(job.platform, self.queue)
+            # Só as linhas de discovery_players destes jogadores (a tabela é bem maior que a liga)
+            await asyncio.to_thread(job.discovery.load,
+                                    puuids=[e.get('puuid') for e in league['entries']],
+                                    summoner_ids=[e.get('summonerId') for e in league['entries'] if not e.get('puuid')])
+            players = PlayerQueue(job.discovery)
+            for entry in league['entries']: players.push(entry)
+
+            async def matches_of(entry):
+                try:
+                    puuid = entry.get('puuid')
+                    if not puuid:
+                        summ_id = entry.get('summonerId')
+                        if not summ_id: return None, []
+                        puuid = await job.discovery.puuid_by_summoner(summ_id)
+                        if not puuid: return None, []
+                    # Só o que entrou desde a última consulta deste jogador
+                    return puuid, await job.discovery.match_ids(puuid)
+                except Exception:
+                    return None, []
+
+            # Consulta os jogadores em grupos (o limitador segura o ritmo, sem sleep fixo)
+            queried = 0
+            while len(found) < self.target:
+                # Coparticipantes das partidas baixadas até aqui entram na disputa
+                harvested = job.discovery.take_harvested()
+                if harvested: await asyncio.to_thread(job.discovery.load, puuids=harvested)
+                before = len(players)
+                for puuid in harvested: players.push({'puuid': puuid})
+                job.metrics.count('players_harvested', len(players) - before)
+                chunk = players.pop(job.concurrency)
+                if not chunk: break
+                queried += len(chunk)
+                job.metrics.count('players_queried', len(chunk))
+                results = await asyncio.gather(*(matches_of(e) for e in chunk))
+                candidates = []
+                for _, matches in results:
+                    candidates.extend(m for m in matches if m not in found)
+                # Checagem em lote no servidor só dos candidatos deste grupo
+                candidates = list(dict.fromkeys(candidates))
+                if job.processed and candidates:
+                    new = await asyncio.to_thread(job.processed.filter_new, candidates)
+                    job.metrics.count('skipped_processed', len(candidates) - len(new))
+                    candidates = new
+                # Rendimento de cada consulta (partida repetida no grupo conta para o primeiro)
+                fresh = set(candidates)
+                for puuid, matches in results:
+                    if not puuid: continue
+                    matches = set(matches)
+                    job.discovery.observe(puuid, len(matches), len(matches & fresh))
+                    fresh -= matches
+                # O corte no alvo só atinge este último grupo de jogadores
+                remaining = self.target - len(found)
+                job.metrics.count('skipped_target', len(candidates[remaining:]))
+                job.dropped.update(candidates[remaining:])
+                candidates = candidates[:remaining]
+                found.update(candidates)
+                log(job, f" > {queried} jogadores OK. Novas na fila: {len(found)}")
+                yield candidates
+        except Exception as e:
+            log(job, f"Erro ao buscar a Liga Master: {e}")
+
+
+class RiotIdSource:
+    # Lista fixa de Riot IDs ("Nome#TAG"), resolvidos pelo cache de contas
+    def __init__(self, riot_ids, account_region):
+        self.riot_ids = riot_ids
+        self.account_region = account_region
+
+    def harvest(self, job, match):
+        pass  # Lista fixa: coparticipantes não entram
+
+    async def discover(self, job):
+        async def lookup(riot_id):
+            try:
+                puuid = await job.discovery.puuid_by_riot_id(self.account_region, riot_id)
+                if not puuid: log(job, f"Não encontrado: {riot_id}")
+                return puuid
+            except Exception as e:
+                log(job, f"Erro ao buscar {riot_id}: {e}")
+                return None
+
+        async def matches_of(puuid):
+            try:
+                return await job.discovery.match_ids(puuid)
+            except Exception as e:
+                log(job, f"Erro lista {puuid}: {e}")
+                return []
+
+        await asyncio.to_thread(job.discovery.load, riot_ids=self.riot_ids)
+        puuids = [p for p in await asyncio.gather(*(lookup(r) for r in self.riot_ids if '#' in r)) if p]
+        log(job, f" > {len(puuids)}/{len(self.riot_ids)} jogadores encontrados.")
+        found = set()
+        for matches in await asyncio.gather(*(matches_of(p) for p in puuids)):
+            found.update(matches)
+        # Uma única checagem em lote no servidor para todos os candidatos
+        new = await asyncio.to_thread(job.processed.filter_new, found) if job.processed else list(found)
+        job.metrics.count('skipped_processed', len(found) - len(new))
+        yield new
+
+
+# --- SINKS ---
+class DbSink:
+    # Falha aqui = lote perdido: as partidas voltam na próxima execução
+    required = True
+
+    def __init__(self, engine, table, processed_index=None, keys=None, aggregates=()):
+        self.engine = engine
+        self.table = table
+        self.processed_index = processed_index
+        self.keys = keys
+        self.aggregates = aggregates  # Atualizados na mesma transação (ex: MatchupRollup)
+
+    def prepare(self):
+        # Tabelas (e view) dos agregados uma vez por execução, fora das transações dos lotes
+        if not self.aggregates: return
+        with self.engine.begin() as conn:
+            for agg in self.aggregates: agg.ensure(conn)
+
+    def write(self, batch):
+        write_batch(self.engine, batch, self.table, self.processed_index, keys=self.keys, aggregates=self.aggregates)
+
+    def finish(self):
+        pass
+
+
+class ArchiveSink:
+    # Backup Parquet: erro só é registrado no log
+    required = False
+
+    def __init__(self, region):
+        self.region = region
+        self.dates = set()  # Partições (Date) tocadas nesta execução
+
+    def prepare(self):
+        self.dates = set()
+
+    def write(self, batch):
+        write_archive(batch, self.region)
+        self.dates.update(map(utc_date, batch.column('Game Start Time')))
+
+    def finish(self):
+        # Um arquivo por partição por execução (não um por lote) antes do commit diário
+        if self.dates: compact_archive(self.region, self.dates)
+
+
+# --- JOB (UMA REGIÃO) ---
+class Job:
+    def __init__(self, name, platform, client, source, extract, columns, sinks, discovery, processed_index,
+                 batch_size=100, concurrency=8, strict=False, queue=None):
+        self.name = name
+        self.platform = platform
+        self.client = client
+        self.source = source
+        self.extract = extract
+        self.columns = columns  # Ordem das tuplas que o extrator devolve
+        self.sinks = sinks
+        self.discovery = discovery
+        self.processed_index = processed_index
+        self.processed = None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.strict = strict  # Sem índice de processadas: True = não roda, False = roda sem dedupe
+        self.dropped = set()  # Descobertas que ficaram de fora (corte do alvo)
+        self.queue = queue    # WorkQueue: estado durável de cada partida (retomada)
+        self.metrics = Metrics()
+
+
+def prepare_job(job):
+    # Devolve False se o job não deve rodar
+    try:
+        # Índice compacto no banco + Bloom filter local (ver dedupe.py)
+        job.processed = job.processed_index.ensure()
+        log(job, "Índice de partidas processadas pronto.")
+    except Exception as e:
+        log(job, f"Índice indisponível ({e}).")
+        # Se não conseguir ler o histórico, é melhor PARAR do que duplicar tudo
+        if job.strict: return False
+    try:
+        # Cache de PUUIDs + marca d'água por jogador (ver discovery.py)
+        job.discovery.ensure()
+    except Exception as e:
+        log(job, f"Descoberta incremental indisponível ({e}). Usando as últimas partidas.")
+    for sink in job.sinks:
+        try:
+            sink.prepare()
+        except Exception as e:
+            log(job, f"{sink.__class__.__name__} indisponível ({e}).")
+            # Sink obrigatório sem as tabelas: todo lote falharia
+            if sink.required: return False
+    return True
+
+
+async def run_job(job):
+    job.dropped = set()
+    job.metrics = Metrics()
+    log(job, "Iniciando descoberta e processamento em streaming...")
+    discovered, failed = await run_pipeline(job)
+    log(job, f"Descoberta: {job.discovery.calls} chamadas à API para {len(discovered)} partidas novas.")
+    if not discovered: log(job, "Sem partidas novas.")
+    if job.queue is not None:
+        log(job, f"Fila: {job.queue.counts(job.name)}")
+        failed = []  # Continuam na fila e são retomadas na próxima execução
+    for sink in job.sinks:
+        try:
+            await asyncio.to_thread(sink.finish)
+        except Exception as e:
+            log(job, f"{sink.__class__.__name__}: finalização falhou ({e}).")
+
+    # Marca d'água só avança para quem teve todas as partidas novas processadas
+    try:
+        await asyncio.to_thread(job.discovery.commit, job.dropped | set(failed))
+    except Exception as e:
+        log(job, f"Marcas d'água não gravadas ({e}).")
+    try:
+        log(job, f"Relatório da execução: {write_run_report(job)}")
+    except Exception as e:
+        log(job, f"Relatório não gravado ({e}).")
+    log(job, "Processamento finalizado.")
+
+
+async def run_jobs(jobs):
+    # Preparação em sequência (CREATE TABLE IF NOT EXISTS concorrente falha no Postgres),
+    # depois as regiões em paralelo; o erro de uma não derruba as outras
+    jobs = [j for j in jobs if await asyncio.to_thread(prepare_job, j)]
+    results = await asyncio.gather(*(run_job(j) for j in jobs), return_exceptions=True)
+    for job, res in zip(jobs, results):
+        if isinstance(res, Exception): log(job, f"ERRO FATAL: {res!r}")
+
+
+# --- CONFIGURAÇÃO DAS REGIÕES ---
+# kr e br mantêm o comportamento de app.py / app_br.py. Qualquer outra plataforma
+# (euw1, na1...) vira uma coleta da Liga Master com o extrator KR em partidas_<plataforma>.
+REGIONS = {
+    'kr': {'platform': 'kr', 'table': 'partidas', 'key_env': 'RIOT_API_KEY', 'queue_id': 420, 'first_count': 20,
+           'concurrency': 8, 'extract': process_match_kr, 'columns': KR_COLUMNS},
+    'br': {'platform': 'br1', 'table': 'partidas_br', 'key_env': 'RIOT_API_KEY_BR', 'queue_id': None, 'first_count': 10,
+           'concurrency': 4, 'extract': process_match_br, 'columns': BR_COLUMNS, 'riot_ids': ALVOS, 'strict': True},
+}
+MATCH_TARGET = 1440
+BATCH_SIZE = 100
+
+
+def region_config(name):
+    if name in REGIONS: return dict(REGIONS[name])
+    if name not in PLATFORM_TO_REGION: raise ValueError(f"Região desconhecida: {name}")
+    return {'platform': name, 'table': f'partidas_{name}', 'key_env': 'RIOT_API_KEY', 'queue_id': 420,
+            'first_count': 20, 'concurrency': 8, 'extract': process_match_kr, 'columns': KR_COLUMNS,
+            'keys': ('Match ID', 'Champion')}
+
+
+def build_jobs(names, engine, raw_cache=None, match_target=MATCH_TARGET, batch_size=BATCH_SIZE):
+    raw_cache = raw_cache or RawCache()
+    # Fila durável ao lado do cache bruto (os dois são salvos juntos pelo workflow)
+    work_queue = WorkQueue(os.path.join(raw_cache.root, 'work_queue.sqlite'))
+    configs = []
+    for name in names:
+        cfg = region_config(name)
+        cfg['api_key'] = os.environ.get(cfg['key_env']) or os.environ.get('RIOT_API_KEY')
+        if not cfg['api_key']: raise ValueError(f"{cfg['key_env']} ausente para a região {name}.")
+        configs.append((name, cfg))
+
+    # Uma sessão + limitadores por chave de API (o limite da Riot é por chave e roteamento)
+    clients = {}
+    for name, cfg in configs:
+        pool = sum(c['concurrency'] for _, c in configs if c['api_key'] == cfg['api_key'])
+        if cfg['api_key'] not in clients:
+            clients[cfg['api_key']] = RiotClient(cfg['api_key'], concurrency=pool, cache=raw_cache)
+
+    aggregates = [MatchupRollup(), QuantileSketches()]
+    jobs = []
+    for name, cfg in configs:
+        client = clients[cfg['api_key']]
+
+        processed_index = ProcessedIndex(engine, cfg['table'])
+        if cfg.get('riot_ids'):
+            source = RiotIdSource(cfg['riot_ids'], PLATFORM_TO_REGION[cfg['platform']])
+        else:
+            source = LadderSource(target=match_target)
+        sinks = [DbSink(engine, cfg['table'], processed_index, cfg.get('keys'), aggregates), ArchiveSink(cfg['platform'])]
+        discovery = Discovery(engine, client, cfg['table'], cfg['platform'], queue=cfg['queue_id'],
+                              first_count=cfg['first_count'])
+        jobs.append(Job(name, cfg['platform'], client, source, cfg['extract'], cfg['columns'], sinks, discovery, processed_index,
+                        batch_size=batch_size, concurrency=cfg['concurrency'], strict=cfg.get('strict', False),
+                        queue=work_queue))
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Coleta várias regiões ao mesmo tempo.')
+    parser.add_argument('regions', nargs='+', help='kr, br ou plataformas da Riot (euw1, na1, ...)')
+    parser.add_argument('--target', type=int, default=MATCH_TARGET, help='partidas por região (Liga Master)')
+    args = parser.parse_args(argv)
+
+    db_url = os.environ.get("DB_URL")
+    if not db_url:
+        print("ERRO: DB_URL ausente.")
+        sys.exit(1)
+    try:
+        jobs = build_jobs(args.regions, create_engine(db_url), match_target=args.target)
+    except ValueError as e:
+        print(f"ERRO: {e}")
+        sys.exit(1)
+    asyncio.run(run_jobs(jobs))
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(line_buffering=True)
+    main()
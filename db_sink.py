@@ -0,0 +1,173 @@
+import io
+from sqlalchemy import inspect, text
+from row_batch import as_float, column_kind
+
+# --- GRAVAÇÃO EM LOTE (COPY + UPSERT) ---
+# DataFrame.to_sql manda INSERTs em blocos de ~120 colunas pela conexão remota, e um
+# lote que falha no meio deixa buracos ou duplicatas. Aqui:
+#   1. o lote vai inteiro por COPY para uma tabela temporária (staging, tudo TEXT)
+#   2. um único INSERT ... SELECT faz o merge na tabela final com ON CONFLICT na chave
+#      natural (Match ID + Champion / PUUID)
+# Tudo na mesma transação: ou o lote entra inteiro ou não entra, e repetir é seguro.
+# Os lotes chegam como RowBatch (row_batch.py): as tuplas vão direto para o CSV do
+# COPY, sem DataFrame no meio.
+
+NATURAL_KEYS = {
+    'partidas': ('Match ID', 'Champion'),
+    'partidas_br': ('Match ID', 'PUUID'),
+}
+
+INT_TYPES = ('smallint', 'integer', 'bigint')
+PG_TYPES = {'str': 'TEXT', 'float': 'DOUBLE PRECISION', 'int': 'BIGINT'}
+# (banco, tabela) em que o índice único não subiu (histórico com duplicatas): não tenta
+# de novo a cada lote, cada tentativa ordena a tabela inteira sob lock SHARE
+_NO_UNIQUE_INDEX = set()
+
+
+def qi(name):
+    # Identificador entre aspas (as colunas têm espaço, %, ' etc.)
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _pg_type(name, values):
+    # Tipo de uma coluna nova pelo nome (row_batch.column_kind, a mesma regra do Parquet),
+    # não pelos valores do primeiro lote: "KDA" só com valores inteiros virava BIGINT e
+    # os lotes seguintes eram arredondados. Coluna fora da regra com texto no lote: TEXT.
+    kind = column_kind(name)
+    if kind != 'str' and any(isinstance(v, str) and as_float(v) is None for v in values): return 'TEXT'
+    return PG_TYPES[kind]
+
+
+def _column_types(conn, table):
+    rows = conn.execute(text(
+        'SELECT column_name, data_type FROM information_schema.columns '
+        'WHERE table_schema = current_schema() AND table_name = :t'), {'t': table})
+    return {name: dtype for name, dtype in rows}
+
+
+def _ensure_table(conn, batch, table, keys):
+    # Cria a tabela (ou só as colunas novas) e o índice único da chave natural.
+    # O lock (até o fim da transação) serializa o DDL quando dois processos gravam na
+    # mesma tabela ao mesmo tempo.
+    conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:t))'), {'t': table})
+    types = _column_types(conn, table)
+    if not types:
+        cols = ', '.join(f'{qi(c)} {_pg_type(c, batch.column(c))}' for c in batch.columns)
+        conn.execute(text(f'CREATE TABLE {qi(table)} ({cols})'))
+    else:
+        for c in batch.columns:
+            if c not in types:
+                conn.execute(text(f'ALTER TABLE {qi(table)} ADD COLUMN IF NOT EXISTS {qi(c)} {_pg_type(c, batch.column(c))}'))
+            elif types[c] in INT_TYPES and column_kind(c) == 'float':
+                # Criada como inteiro pela regra antiga (tipo do primeiro lote): alarga, sem perda
+                print(f" > {table}: coluna {c} passa de {types[c]} para double precision.")
+                conn.execute(text(f'ALTER TABLE {qi(table)} ALTER COLUMN {qi(c)} TYPE DOUBLE PRECISION'))
+
+    index = f'ux_{table}_natural_key'
+    key_cols = ", ".join(qi(k) for k in keys)
+    failed_key = (str(conn.engine.url), table)
+    has_index = conn.execute(text('SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = :i'),
+                             {'i': index}).first() is not None
+    if not has_index and failed_key not in _NO_UNIQUE_INDEX:
+        # Se a tabela antiga já tiver duplicatas o índice não sobe: segue com o merge
+        # por NOT EXISTS (também idempotente) até alguém limpar o histórico
+        try:
+            with conn.begin_nested():
+                conn.execute(text(f'CREATE UNIQUE INDEX {qi(index)} ON {qi(table)} ({key_cols})'))
+            has_index = True
+        except Exception as e:
+            _NO_UNIQUE_INDEX.add(failed_key)
+            print(f" > Aviso: índice único em {table} não criado ({e.__class__.__name__}). Usando merge sem ON CONFLICT.")
+            # Índice comum na chave: o NOT EXISTS do merge vira busca no índice, não varredura
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {qi(f"ix_{table}_natural_key")} ON {qi(table)} ({key_cols})'))
+    return _column_types(conn, table), has_index
+
+
+def copy_to_staging(conn, batch, staging):
+    # Tabela temporária (tudo TEXT, some no fim da transação) carregada por COPY
+    cols = batch.columns
+    conn.execute(text(f'CREATE TEMP TABLE IF NOT EXISTS {qi(staging)} ({", ".join(f"{qi(c)} TEXT" for c in cols)}) ON COMMIT DROP'))
+    buf = io.StringIO()
+    batch.write_csv(buf)
+    buf.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {qi(staging)} ({", ".join(qi(c) for c in cols)}) FROM STDIN WITH (FORMAT csv)', buf)
+    finally:
+        cursor.close()
+
+
+def copy_upsert(conn, batch, table, keys=None):
+    # conn = conexão SQLAlchemy já dentro de uma transação (engine.begin()).
+    # Devolve quantas linhas vieram no lote.
+    if batch.empty: return 0
+    keys = keys or NATURAL_KEYS[table]
+    types, has_index = _ensure_table(conn, batch, table, keys)
+
+    cols = batch.columns
+    for c in cols:
+        # O CAST para inteiro arredondaria calado: valor com fração em coluna inteira é erro
+        if types.get(c) in INT_TYPES and any(isinstance(v, float) and not v.is_integer() for v in batch.column(c)):
+            raise ValueError(f"{table}: coluna '{c}' é {types[c]} e o lote tem valor com fração")
+    staging = f'_stage_{table}'
+    copy_to_staging(conn, batch, staging)
+
+    def cast(c):
+        t = types.get(c, 'text')
+        # "5.0" não converte direto para inteiro: passa por NUMERIC antes
+        if t in INT_TYPES: return f'CAST(CAST(s.{qi(c)} AS NUMERIC) AS {t.upper()})'
+        return f'CAST(s.{qi(c)} AS {t.upper()})'
+
+    col_list = ', '.join(qi(c) for c in cols)
+    key_list = ', '.join(qi(k) for k in keys)
+    select = f'SELECT DISTINCT ON ({", ".join(f"s.{qi(k)}" for k in keys)}) {", ".join(cast(c) for c in cols)} FROM {qi(staging)} s'
+    if has_index:
+        updates = ', '.join(f'{qi(c)} = EXCLUDED.{qi(c)}' for c in cols if c not in keys)
+        action = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        conn.execute(text(f'INSERT INTO {qi(table)} ({col_list}) {select} ON CONFLICT ({key_list}) {action}'))
+    else:
+        match = ' AND '.join(f't.{qi(k)} = {cast(k)}' for k in keys)
+        conn.execute(text(f'INSERT INTO {qi(table)} ({col_list}) {select} '
+                          f'WHERE NOT EXISTS (SELECT 1 FROM {qi(table)} t WHERE {match})'))
+    conn.execute(text(f'DROP TABLE IF EXISTS {qi(staging)}'))
+    return len(batch)
+
+
+def insert_rows(conn, batch, table):
+    # Fora do Postgres (SQLite local): cria a tabela ou as colunas novas e INSERT em lote
+    insp = inspect(conn)
+    if not insp.has_table(table):
+        cols = ', '.join(f'{qi(c)} {_pg_type(c, batch.column(c))}' for c in batch.columns)
+        conn.execute(text(f'CREATE TABLE {qi(table)} ({cols})'))
+    else:
+        existing = {c['name'] for c in insp.get_columns(table)}
+        for c in batch.columns:
+            if c not in existing:
+                conn.execute(text(f'ALTER TABLE {qi(table)} ADD COLUMN {qi(c)} {_pg_type(c, batch.column(c))}'))
+    # Colunas com espaço/aspas não servem de nome de parâmetro: :p0, :p1...
+    params = ', '.join(f':p{i}' for i in range(len(batch.columns)))
+    conn.execute(text(f'INSERT INTO {qi(table)} ({", ".join(qi(c) for c in batch.columns)}) VALUES ({params})'),
+                 [{f'p{i}': v for i, v in enumerate(r)} for r in batch.rows])
+    return len(batch)
+
+
+def write_batch(engine, batch, table, processed_index=None, keys=None, aggregates=()):
+    # Lote inteiro numa transação: dados + registro no índice de processadas (dedupe.py) +
+    # agregados incrementais (aggregates: objetos com update(conn, batch, table), ex: rollups.py).
+    # keys = chave natural da tabela quando ela não está em NATURAL_KEYS.
+    # Em bancos que não são Postgres (ex: SQLite local) grava com INSERT simples.
+    with engine.begin() as conn:
+        new_ids = None
+        if processed_index is not None:
+            new_ids = processed_index.mark(batch.column('Match ID'), conn=conn)
+        if not batch.empty:
+            if engine.dialect.name == 'postgresql':
+                copy_upsert(conn, batch, table, keys)
+            else:
+                insert_rows(conn, batch, table)
+        if aggregates:
+            # Só partidas que entraram agora: regravar um lote não soma duas vezes
+            new = batch if new_ids is None else batch.where('Match ID', new_ids)
+            if not new.empty:
+                for agg in aggregates: agg.update(conn, new, table)
+    return len(batch)
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, inspect, text
+from raw_cache import CACHE_DIR
+
+# --- ÍNDICE DE PARTIDAS JÁ PROCESSADAS ---
+# Antes, cada execução fazia SELECT "Match ID" da tabela inteira (10 linhas por partida)
+# e montava um set em memória: custo crescia com todo o histórico. Agora:
+#   1. tabela compacta processed_matches (source, match_id) com PK -> 1 linha por partida
+#   2. checagem em lote: os IDs candidatos vão para o servidor (WHERE match_id IN (...))
+#   3. Bloom filter opcional em disco: IDs que ele garante serem novos nem vão ao banco.
+#      Ele é atualizado de forma incremental pela marca d'água processed_at.
+#      processed_at é a hora do INSERT (clock_timestamp() no Postgres, não o início da
+#      transação), mas uma transação pode confirmar depois de outra que inseriu mais
+#      tarde: cada sincronização relê SYNC_OVERLAP antes da marca. Releitura não conta
+#      duas vezes (add só conta chave que mudou algum bit).
+# O custo passa a depender do tamanho do lote de candidatos, não do tamanho da tabela.
+
+INDEX_TABLE = 'processed_matches'
+QUERY_CHUNK = 1000
+SYNC_OVERLAP = timedelta(minutes=10)  # Bem mais que a transação de gravação de um lote
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.n_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key):
+        # True se a chave é nova (algum bit mudou); só então conta
+        added = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        if added: self.count += 1
+        return added
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def save(self, path, watermark):
+        header = {'capacity': self.capacity, 'error_rate': self.error_rate, 'count': self.count, 'watermark': watermark}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        # (filtro, marca d'água) ou (None, None) se não existir / estiver corrompido
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                bits = f.read()
+        except (OSError, ValueError):
+            return None, None
+        bloom = cls(header['capacity'], header['error_rate'])
+        if len(bits) != len(bloom.bits): return None, None
+        bloom.bits = bytearray(bits)
+        bloom.count = header['count']
+        return bloom, header['watermark']
+
+
+class ProcessedIndex:
+    # source = nome da tabela de dados ('partidas', 'partidas_br')
+    def __init__(self, engine, source, use_bloom=True, bloom_path=None):
+        self.engine = engine
+        self.source = source
+        self.bloom = None
+        self.use_bloom = use_bloom
+        self.bloom_path = bloom_path or os.path.join(CACHE_DIR, f'processed_{source}.bloom')
+
+    def ensure(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(f'''
+                CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+                    source TEXT NOT NULL,
+                    match_id TEXT NOT NULL,
+                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (source, match_id)
+                )'''))
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{INDEX_TABLE}_at ON {INDEX_TABLE} (source, processed_at)'))
+            if conn.dialect.name == 'postgresql':
+                # CURRENT_TIMESTAMP é o início da transação: um lote longo gravaria horas
+                # anteriores à marca d'água de quem sincronizou no meio dele
+                conn.execute(text(f'ALTER TABLE {INDEX_TABLE} ALTER COLUMN processed_at SET DEFAULT clock_timestamp()'))
+
+            # Primeira execução: popula o índice uma única vez a partir da tabela de dados
+            empty = conn.execute(text(f'SELECT 1 FROM {INDEX_TABLE} WHERE source = :s LIMIT 1'), {'s': self.source}).first() is None
+            if empty and inspect(conn).has_table(self.source):
+                conn.execute(text(f'''
+                    INSERT INTO {INDEX_TABLE} (source, match_id)
+                    SELECT DISTINCT CAST(:s AS TEXT), CAST("Match ID" AS TEXT) FROM {self.source} WHERE TRUE
+                    ON CONFLICT DO NOTHING'''), {'s': self.source})
+
+        if self.use_bloom: self._sync_bloom()
+        return self
+
+    def _sync_bloom(self):
+        bloom, watermark = BloomFilter.load(self.bloom_path)
+        with self.engine.connect() as conn:
+            # Sem marca d'água (filtro salvo com o índice ainda vazio) também recarrega tudo
+            if bloom is None or watermark is None:
+                total = conn.execute(text(f'SELECT COUNT(*) FROM {INDEX_TABLE} WHERE source = :s'), {'s': self.source}).scalar()
+                bloom = BloomFilter(max(10_000, total * 2))
+                query, params = f'SELECT match_id, processed_at FROM {INDEX_TABLE} WHERE source = :s', {'s': self.source}
+            else:
+                # Incremental: o que entrou depois da última sincronização, com sobreposição
+                since = datetime.fromisoformat(watermark) - SYNC_OVERLAP
+                query = f'SELECT match_id, processed_at FROM {INDEX_TABLE} WHERE source = :s AND processed_at >= :w'
+                params = {'s': self.source, 'w': since.isoformat(' ')}
+            for m_id, at in conn.execution_options(stream_results=True).execute(text(query), params):
+                bloom.add(m_id)
+                at = str(at)
+                if watermark is None or at > watermark: watermark = at
+
+        if bloom.count > bloom.capacity:
+            # Passou da capacidade: taxa de falso positivo sobe, reconstrói maior na próxima
+            if os.path.exists(self.bloom_path): os.remove(self.bloom_path)
+            self.bloom = bloom
+            return
+        bloom.save(self.bloom_path, watermark)
+        self.bloom = bloom
+
+    def filter_new(self, candidate_ids):
+        # Devolve os candidatos que ainda NÃO foram processados (ordem preservada)
+        candidates = list(dict.fromkeys(str(m) for m in candidate_ids))
+        maybe = candidates if self.bloom is None else [m for m in candidates if m in self.bloom]
+
+        known = set()
+        query = text(f'SELECT match_id FROM {INDEX_TABLE} WHERE source = :s AND match_id IN :ids').bindparams(
+            bindparam('ids', expanding=True))
+        with self.engine.connect() as conn:
+            for i in range(0, len(maybe), QUERY_CHUNK):
+                chunk = maybe[i:i + QUERY_CHUNK]
+                known.update(r[0] for r in conn.execute(query, {'s': self.source, 'ids': chunk}))
+        return [m for m in candidates if m not in known]
+
+    def mark(self, match_ids, conn=None):
+        # Registra as partidas gravadas. Aceita uma conexão para entrar na mesma transação.
+        # Devolve os IDs que ainda não estavam registrados (usado pelos agregados incrementais).
+        ids = [str(m) for m in dict.fromkeys(match_ids)]
+        if not ids: return set()
+        if conn is None:
+            with self.engine.begin() as c:
+                return self.mark(ids, conn=c)
+
+        query = text(f'SELECT match_id FROM {INDEX_TABLE} WHERE source = :s AND match_id IN :ids').bindparams(
+            bindparam('ids', expanding=True))
+        known = set()
+        for i in range(0, len(ids), QUERY_CHUNK):
+            known.update(r[0] for r in conn.execute(query, {'s': self.source, 'ids': ids[i:i + QUERY_CHUNK]}))
+        new = [m for m in ids if m not in known]
+        if new:
+            conn.execute(text(f'INSERT INTO {INDEX_TABLE} (source, match_id) VALUES (:s, :m) ON CONFLICT DO NOTHING'),
+                         [{'s': self.source, 'm': m} for m in new])
+        if self.bloom is not None:
+            for m in new: self.bloom.add(m)
+        return set(new)
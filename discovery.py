@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from sqlalchemy import bindparam, inspect, text
+
+# --- DESCOBERTA INCREMENTAL DE PARTIDAS ---
+# Antes, toda execução pedia as últimas N partidas de cada jogador (e resolvia de novo
+# cada Riot ID / summonerId) para só depois jogar fora o que já estava no banco. Aqui
+# cada jogador tem uma linha em discovery_players com:
+#   - o cache de conta (Riot ID / summonerId -> PUUID), revalidado só depois de ACCOUNT_TTL
+#   - a marca d'água last_checked (epoch em segundos) da última consulta da lista
+# Com a marca d'água, a lista é pedida com startTime (+ filtro de fila) e só pagina
+# quando a janela enche uma página inteira. Jogador novo recebe as últimas first_count.
+# A marca d'água só é gravada em commit(), depois que as partidas foram processadas.
+#
+# --- PRIORIDADE POR RENDIMENTO ---
+# A Liga Master era consultada em ordem aleatória: parte das consultas voltava vazia
+# (jogador parado) ou só com partidas já conhecidas (duo, mesmos lobbies). Cada
+# consulta agora atualiza, por jogador, duas médias móveis gravadas na mesma linha:
+#   - activity: partidas por dia na janela consultada
+#   - overlap: fração dos IDs devolvidos que já era conhecida (banco ou esta execução)
+# Os participantes das partidas baixadas são colhidos (harvest): cada partida conta
+# como já conhecida para os 10 e quem não está na liga vira candidato. A PlayerQueue
+# entrega os jogadores pela estimativa de partidas novas por chamada (expected_yield).
+#
+# --- TAMANHO DA TABELA ---
+# A colheita faz a tabela crescer a cada execução (todo coparticipante consultado ganha
+# linha). Por isso ensure() não carrega a tabela: as fontes pedem só as linhas dos
+# candidatos da vez com load() (entradas da liga, colhidos, Riot IDs), e a linha que
+# não foi gravada (consulta, conta resolvida, rendimento) em PLAYER_TTL sai da tabela.
+# Jogador removido que volta é tratado como novo (últimas first_count; o índice de
+# processadas descarta o que já estava no banco).
+
+PLAYERS_TABLE = 'discovery_players'
+ACCOUNT_TTL = 7 * 86400
+OVERLAP = 3 * 3600  # Partida em andamento na última consulta só entra na lista quando termina
+PAGE_SIZE = 100     # Máximo aceito pelo endpoint
+MAX_PAGES = 5
+YIELD_ALPHA = 0.5          # Peso da consulta mais recente nas médias móveis
+MIN_ACTIVITY = 0.2         # Partidas/dia: piso para quem parecia parado voltar aos poucos
+FIRST_WINDOW = 7 * 86400   # Janela assumida para as últimas first_count de um jogador novo
+PLAYER_TTL = 30 * 86400    # Linha não gravada há mais que isso sai da tabela
+LOAD_CHUNK = 500
+
+
+def ewma(old, sample):
+    return sample if old is None else old + YIELD_ALPHA * (sample - old)
+
+
+class Discovery:
+    # source = nome da tabela de dados ('partidas', 'partidas_br'); platform = 'kr', 'br1'...
+    def __init__(self, engine, client, source, platform, queue=None, first_count=20):
+        self.engine = engine
+        self.client = client
+        self.source = source
+        self.platform = platform
+        self.queue = queue
+        self.first_count = first_count
+        self.players = {}   # puuid -> linha (dict) como está no banco
+        self.pending = {}   # puuid -> (consultado_em, ids devolvidos pela lista)
+        self.dirty = set()
+        self.calls = 0
+        self.seen = {}        # puuid -> partidas baixadas nesta execução em que ele jogou
+        self.harvested = []   # PUUIDs colhidos ainda não entregues à fonte
+        # Primeira consulta de jogador novo nesta execução: IDs devolvidos e fração conhecida
+        self.first_returned = float(first_count)
+        self.first_overlap = 0.0
+
+    def ensure(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(f'''
+                CREATE TABLE IF NOT EXISTS {PLAYERS_TABLE} (
+                    source TEXT NOT NULL,
+                    puuid TEXT NOT NULL,
+                    riot_id TEXT,
+                    summoner_id TEXT,
+                    account_checked_at BIGINT,
+                    last_checked BIGINT,
+                    activity DOUBLE PRECISION,
+                    overlap DOUBLE PRECISION,
+                    updated_at BIGINT,
+                    PRIMARY KEY (source, puuid)
+                )'''))
+            # Tabelas criadas antes das colunas de rendimento
+            existing = {c['name'] for c in inspect(conn).get_columns(PLAYERS_TABLE)}
+            for col, kind in (('activity', 'DOUBLE PRECISION'), ('overlap', 'DOUBLE PRECISION'), ('updated_at', 'BIGINT')):
+                if col not in existing:
+                    conn.execute(text(f'ALTER TABLE {PLAYERS_TABLE} ADD COLUMN {col} {kind}'))
+            # Linhas de antes de updated_at: vale a marca mais recente que tiverem
+            pruned = conn.execute(text(f'''
+                DELETE FROM {PLAYERS_TABLE}
+                WHERE source = :s AND COALESCE(updated_at, last_checked, account_checked_at, 0) < :cutoff'''),
+                {'s': self.source, 'cutoff': int(time.time()) - PLAYER_TTL}).rowcount
+            known = conn.execute(text(f'SELECT COUNT(*) FROM {PLAYERS_TABLE} WHERE source = :s'),
+                                 {'s': self.source}).scalar()
+        print(f" > Descoberta: {known} jogadores conhecidos ({pruned} removidos sem atividade).")
+        return self
+
+    def load(self, puuids=(), summoner_ids=(), riot_ids=()):
+        # Traz do banco as linhas destes jogadores (as já carregadas não são relidas:
+        # podem ter mudanças ainda não gravadas). Devolve quantas linhas vieram.
+        loaded_ids = {'puuid': set(self.players),
+                      'summoner_id': {r['summoner_id'] for r in self.players.values() if r['summoner_id']},
+                      'riot_id': {r['riot_id'] for r in self.players.values() if r['riot_id']}}
+        loaded = 0
+        with self.engine.connect() as conn:
+            for col, values in (('puuid', puuids), ('summoner_id', summoner_ids), ('riot_id', riot_ids)):
+                values = [v for v in dict.fromkeys(values) if v and v not in loaded_ids[col]]
+                query = text(f'SELECT * FROM {PLAYERS_TABLE} WHERE source = :s AND {col} IN :v').bindparams(
+                    bindparam('v', expanding=True))
+                for i in range(0, len(values), LOAD_CHUNK):
+                    for r in conn.execute(query, {'s': self.source, 'v': values[i:i + LOAD_CHUNK]}).mappings():
+                        if r['puuid'] in self.players: continue
+                        self.players[r['puuid']] = dict(r)
+                        loaded += 1
+        return loaded
+
+    async def _load_puuid(self, puuid):
+        # PUUID vindo da API que pode ter linha no banco ainda não carregada
+        if puuid not in self.players: await asyncio.to_thread(self.load, puuids=[puuid])
+
+    def _row(self, puuid):
+        if puuid not in self.players:
+            self.players[puuid] = {'source': self.source, 'puuid': puuid, 'riot_id': None, 'summoner_id': None,
+                                   'account_checked_at': None, 'last_checked': None, 'activity': None, 'overlap': None,
+                                   'updated_at': None}
+        return self.players[puuid]
+
+    async def puuid_by_riot_id(self, region, riot_id):
+        now = int(time.time())
+        for row in self.players.values():
+            if row['riot_id'] == riot_id and (row['account_checked_at'] or 0) > now - ACCOUNT_TTL:
+                return row['puuid']
+        name, tag = riot_id.split('#')
+        self.calls += 1
+        account = await self.client.account_by_riot_id(region, name, tag)
+        if not account: return None
+        await self._load_puuid(account['puuid'])
+        # Riot ID pode ter trocado de dono: tira o nome de quem tinha antes
+        for row in self.players.values():
+            if row['riot_id'] == riot_id and row['puuid'] != account['puuid']:
+                row['riot_id'] = None
+                self.dirty.add(row['puuid'])
+        row = self._row(account['puuid'])
+        row['riot_id'], row['account_checked_at'] = riot_id, now
+        self.dirty.add(row['puuid'])
+        return row['puuid']
+
+    async def puuid_by_summoner(self, summoner_id):
+        # A liga antiga só trazia summonerId; o PUUID não muda, então não expira
+        for row in self.players.values():
+            if row['summoner_id'] == summoner_id: return row['puuid']
+        self.calls += 1
+        summoner = await self.client.summoner_by_id(self.platform, summoner_id)
+        if not summoner: return None
+        await self._load_puuid(summoner['puuid'])
+        row = self._row(summoner['puuid'])
+        row['summoner_id'] = summoner_id
+        self.dirty.add(row['puuid'])
+        return row['puuid']
+
+    async def match_ids(self, puuid):
+        # IDs desde a última consulta (com sobreposição), ou as últimas first_count
+        now = int(time.time())
+        last = self.players.get(puuid, {}).get('last_checked')
+        params = {'queue': self.queue} if self.queue else {}
+        if last is None:
+            self.calls += 1
+            ids = await self.client.matchlist_by_puuid(self.platform, puuid, count=self.first_count, **params) or []
+        else:
+            ids = []
+            for page in range(MAX_PAGES):
+                self.calls += 1
+                chunk = await self.client.matchlist_by_puuid(
+                    self.platform, puuid, startTime=last - OVERLAP, start=page * PAGE_SIZE, count=PAGE_SIZE, **params) or []
+                ids.extend(chunk)
+                if len(chunk) < PAGE_SIZE: break
+        self.pending[puuid] = (now, [str(m) for m in ids])
+        return self.pending[puuid][1]
+
+    def observe(self, puuid, returned, new):
+        # Resultado de match_ids(puuid): returned IDs devolvidos, new deles ainda desconhecidos
+        row = self._row(puuid)
+        checked_at = self.pending.get(puuid, (int(time.time()),))[0]
+        first = row['last_checked'] is None
+        window = FIRST_WINDOW if first else max(checked_at - row['last_checked'] + OVERLAP, 3600)
+        row['activity'] = ewma(row['activity'], returned * 86400 / window)
+        if returned: row['overlap'] = ewma(row['overlap'], 1 - new / returned)
+        self.dirty.add(puuid)
+        if first:
+            self.first_returned = ewma(self.first_returned, returned)
+            if returned: self.first_overlap = ewma(self.first_overlap, 1 - new / returned)
+
+    def harvest(self, match):
+        # Participantes de uma partida baixada: ela já é conhecida para os 10
+        for puuid in match.get('metadata', {}).get('participants') or []:
+            n = self.seen.get(puuid, 0)
+            self.seen[puuid] = n + 1
+            if not n: self.harvested.append(puuid)
+
+    def take_harvested(self):
+        out, self.harvested = self.harvested, []
+        return out
+
+    def expected_yield(self, puuid, now=None):
+        # Partidas novas esperadas na próxima consulta da lista (puuid None = desconhecido)
+        row = self.players.get(puuid) if puuid else None
+        seen = self.seen.get(puuid, 0) if puuid else 0
+        if row is None or row['activity'] is None:
+            # Nunca consultado: quem já apareceu numa partida baixada está ativo
+            returned = self.first_count if seen else self.first_returned
+            return max(0.0, returned - max(seen, returned * self.first_overlap))
+        rate = max(row['activity'], MIN_ACTIVITY) / 86400
+        if row['last_checked'] is None:
+            returned = min(self.first_count, rate * FIRST_WINDOW)
+        else:
+            returned = min(PAGE_SIZE * MAX_PAGES, rate * ((now or time.time()) - row['last_checked'] + OVERLAP))
+        return max(0.0, returned * (1 - (row['overlap'] or 0.0)) - seen)
+
+    def commit(self, dropped=()):
+        # Grava o cache de contas e avança a marca d'água de quem foi consultado.
+        # dropped = IDs descobertos que NÃO foram processados (corte do alvo, erro de
+        # download): esses jogadores mantêm a marca antiga e são reconsultados.
+        dropped = set(dropped)
+        for puuid, (checked_at, ids) in self.pending.items():
+            if dropped.intersection(ids): continue
+            self._row(puuid)['last_checked'] = checked_at
+            self.dirty.add(puuid)
+        self.pending = {}
+
+        now = int(time.time())
+        rows = [dict(self.players[p], updated_at=now) for p in self.dirty]
+        self.dirty = set()
+        if not rows: return 0
+        with self.engine.begin() as conn:
+            conn.execute(text(f'''
+                INSERT INTO {PLAYERS_TABLE} (source, puuid, riot_id, summoner_id, account_checked_at, last_checked,
+                                             activity, overlap, updated_at)
+                VALUES (:source, :puuid, :riot_id, :summoner_id, :account_checked_at, :last_checked, :activity, :overlap,
+                        :updated_at)
+                ON CONFLICT (source, puuid) DO UPDATE SET
+                    riot_id = EXCLUDED.riot_id, summoner_id = EXCLUDED.summoner_id,
+                    account_checked_at = EXCLUDED.account_checked_at, last_checked = EXCLUDED.last_checked,
+                    activity = EXCLUDED.activity, overlap = EXCLUDED.overlap, updated_at = EXCLUDED.updated_at'''), rows)
+        return len(rows)
+
+
+class PlayerQueue:
+    # Candidatos da descoberta (dicts com 'puuid' e/ou 'summonerId', como na liga) em
+    # ordem de partidas novas esperadas por chamada. Empate (ex: todos desconhecidos no
+    # início) sai em ordem aleatória. A estimativa é refeita quando o jogador chega ao
+    # topo: se caiu (a colheita marcou partidas dele como conhecidas), ele volta à fila.
+    def __init__(self, discovery):
+        self.discovery = discovery
+        self.heap = []
+        self.keys = set()
+        self.order = itertools.count()
+        self.by_summoner = {r['summoner_id']: p for p, r in discovery.players.items() if r['summoner_id']}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def score(self, entry, now):
+        puuid = entry.get('puuid') or self.by_summoner.get(entry.get('summonerId'))
+        expected = self.discovery.expected_yield(puuid, now)
+        # Sem PUUID conhecido custa uma chamada a mais (summoner-v4)
+        return expected if puuid else expected / 2
+
+    def push(self, entry):
+        key = entry.get('puuid') or entry.get('summonerId')
+        if not key or key in self.keys: return
+        self.keys.add(key)
+        heapq.heappush(self.heap, (-self.score(entry, time.time()), random.random(), next(self.order), entry))
+
+    def pop(self, n):
+        now = time.time()
+        out = []
+        while self.heap and len(out) < n:
+            _, tie, order, entry = heapq.heappop(self.heap)
+            score = self.score(entry, now)
+            if self.heap and score < -self.heap[0][0]:
+                heapq.heappush(self.heap, (-score, tie, order, entry))
+                continue
+            out.append(entry)
+        return out
@@ -0,0 +1,317 @@
+import os
+from timeline_index import build_timeline_index, events_at, team_gold_at
+
+# --- EXTRAÇÃO DE FEATURES ---
+# Transforma o JSON bruto (partida + timeline) nas linhas das tabelas. Fica fora dos
+# scripts de coleta para poder ser importado sem credenciais (replay, recálculo em
+# lote com vários processos etc). process_match_kr -> 'partidas' (app.py),
+# process_match_br -> 'partidas_br' (app_br.py). Cada linha é uma tupla na ordem de
+# KR_COLUMNS / BR_COLUMNS.
+
+# Grade de minutos das colunas largas. TARGET_MINUTES define quais minutos são lidos;
+# DIFF_MINUTES, quais ganham o bloco completo (Kills/CS/Gold/XP/.../DMG Diff). Os campos
+# "CS aos 6/12/18 min" e "@12" só saem se o minuto estiver na grade. Minuto novo em
+# todo o histórico: recompute.py a partir do cache bruto, com a grade nova no ambiente.
+
+
+def parse_minutes(value, default):
+    # "5,10,15" -> [5, 10, 15]; ausente -> default. Grade vazia ou inválida é erro: as
+    # colunas (e quem lê "Gold Diff N'") dependem dela
+    if value is None: return list(default)
+    try:
+        minutes = sorted({int(m) for m in value.split(',') if m.strip()})
+    except ValueError:
+        raise ValueError(f"grade de minutos inválida: {value!r} (ex: 5,10,15)") from None
+    if not minutes or minutes[0] < 1:
+        raise ValueError(f"grade de minutos inválida: {value!r} (minutos inteiros >= 1, ex: 5,10,15)")
+    return minutes
+
+
+DIFF_MINUTES = parse_minutes(os.environ.get('DIFF_MINUTES'), [5, 11, 12, 14, 20])
+TARGET_MINUTES = sorted(set(parse_minutes(os.environ.get('TARGET_MINUTES'), [5, 6, 11, 12, 14, 18, 20])) | set(DIFF_MINUTES))
+KR_MIN_DURATION = 15 * 60  # app.py: partida com menos de 15 min não entra
+REMAKE_DURATION = 210      # app_br.py: remake (< 3min 30s) não entra
+
+
+class Skipped(list):
+    # Partida sem linhas: lista vazia (quem só itera as linhas não muda) com o motivo,
+    # que vira contador na execução: 'remakes', 'short' (KR < 15 min) ou 'no_role'
+    # (nenhum jogador com rota e oponente na mesma rota)
+    def __init__(self, reason):
+        super().__init__()
+        self.reason = reason
+
+# --- LAYOUT DAS LINHAS (DEFINIDO UMA VEZ) ---
+# Cada linha é uma tupla nesta ordem (ver row_batch.py). As colunas por minuto seguem
+# TARGET_MINUTES: bloco completo nos DIFF_MINUTES e os campos soltos de 6/12/18 min.
+BASE_COLUMNS = ['Qtd_Partidas', 'Match ID', 'Patch', 'Champion', 'Enemy Champion', 'Role', 'Game Start Time']
+STAT_COLUMNS = [
+    'Kills', 'Deaths', 'Assists', 'KDA', 'Kill Participation',
+    'Total Damage Dealt', 'Total Damage Taken', 'Self Mitigated Damage',
+    'Gold Earned', 'Farm/Min', 'Damage/Min', 'Gold/Min',
+    'Vision Score', 'Vision Score/Min', 'Wards Placed', 'Wards Killed', 'Control Wards Placed',
+    'Damage to Buildings', 'Damage to Objectives', 'Turret Plates Taken',
+    'Team Damage %', 'Damage Taken %',
+    'First Blood Kill', 'First Blood Assist', 'First Tower Kill', 'First Tower Assist', 'CC Score',
+]
+DIFF_METRICS = ['Kills', 'Deaths', 'Assists', 'CS', 'Gold Earned', 'XP', 'Plates', 'KDA', 'GPM', 'DPM',
+                'Gold Share', 'Gold Eff', 'CS Diff', 'Gold Diff', 'XP Diff', 'DMG Diff']
+AT_12_COLUMNS = ['CS aos 12 min', 'Gold aos 12 min', 'XP aos 12 min', 'Deaths até 12min', 'VPM @12', 'KDA @12']
+
+
+def minute_layout(t):
+    cols = [f"{m} {t}'" for m in DIFF_METRICS] if t in DIFF_MINUTES else []
+    if t == 12: cols += AT_12_COLUMNS
+    if t == 6: cols.append('CS aos 6 min')
+    if t == 18: cols.append('CS aos 18 min')
+    return cols
+
+
+MINUTE_LAYOUT = {t: minute_layout(t) for t in TARGET_MINUTES}
+MINUTE_STAT_COLUMNS = [c for t in TARGET_MINUTES for c in MINUTE_LAYOUT[t]]
+KR_COLUMNS = BASE_COLUMNS + ['Win Rate %'] + STAT_COLUMNS + MINUTE_STAT_COLUMNS
+BR_COLUMNS = BASE_COLUMNS + ['Game Duration', 'Win Rate %', 'Player Name', 'PUUID'] + STAT_COLUMNS + MINUTE_STAT_COLUMNS
+
+def get_clean_version(version_str):
+    parts = version_str.split('.')
+    return f"{parts[0]}.{parts[1]}" if len(parts) >= 2 else version_str
+
+def safe_div(a, b):
+    return round(a / b, 2) if b != 0 else 0
+
+# --- KR (app.py) ---
+def get_stats_at_minute(frames, minute, pid):
+    if minute >= len(frames): return 0, 0, 0, 0
+    frame = frames[minute]['participantFrames']
+    pid_key = str(pid)
+    if pid_key in frame:
+        p = frame[pid_key]
+        cs = p['minionsKilled'] + p['jungleMinionsKilled']
+        return cs, p['totalGold'], p['xp'], p['level']
+    return 0, 0, 0, 0
+
+def process_match_kr(match_id, match, timeline):
+    info = match['info']
+    duration_min = info['gameDuration'] / 60
+    if info['gameDuration'] < REMAKE_DURATION: return Skipped('remakes')
+    if info['gameDuration'] < KR_MIN_DURATION: return Skipped('short')
+    
+    patch = get_clean_version(info['gameVersion'])
+    frames = timeline['info']['frames']
+    start_time = info['gameCreation'] 
+
+    role_map = {100: {}, 200: {}}
+    p_info_dict = {}
+    team_totals = {100: {'kills': 0, 'dmg': 0, 'taken': 0}, 200: {'kills': 0, 'dmg': 0, 'taken': 0}}
+
+    for p in info['participants']:
+        tid = p['teamId']
+        team_totals[tid]['kills'] += p['kills']
+        team_totals[tid]['dmg'] += p['totalDamageDealtToChampions']
+        team_totals[tid]['taken'] += p['totalDamageTaken']
+        p_info_dict[p['participantId']] = p
+        if p.get('teamPosition'): role_map[tid][p['teamPosition']] = p['participantId']
+
+    # Passada única na timeline: eventos cumulativos + ouro de time por minuto
+    t_index = build_timeline_index(frames, info['participants'])
+
+    rows = []
+    for p in info['participants']:
+        pid = p['participantId']
+        tid = p['teamId']
+        pos = p['teamPosition']
+        if not pos: continue
+
+        enemy_team = 200 if tid == 100 else 100
+        enemy_pid = role_map[enemy_team].get(pos)
+        enemy_data = p_info_dict.get(enemy_pid) if enemy_pid else None
+        if not enemy_data: continue
+
+        stats = [
+            1, match_id, patch, p['championName'], enemy_data['championName'], pos, start_time,
+            1 if p['win'] else 0,
+
+            p['kills'], p['deaths'], p['assists'],
+            safe_div(p['kills'] + p['assists'], p['deaths']),
+            safe_div(p['kills'] + p['assists'], team_totals[tid]['kills']),
+            p['totalDamageDealtToChampions'], p['totalDamageTaken'], p['damageSelfMitigated'],
+
+            p['goldEarned'],
+            safe_div(p['totalMinionsKilled'] + p['neutralMinionsKilled'], duration_min),
+            safe_div(p['totalDamageDealtToChampions'], duration_min),
+            safe_div(p['goldEarned'], duration_min),
+
+            p['visionScore'], safe_div(p['visionScore'], duration_min),
+            p['wardsPlaced'], p['wardsKilled'], p['detectorWardsPlaced'],
+
+            p['damageDealtToBuildings'], p['damageDealtToObjectives'], p.get('turretPlatesTaken', 0),
+
+            safe_div(p['totalDamageDealtToChampions'], team_totals[tid]['dmg']),
+            safe_div(p['totalDamageTaken'], team_totals[tid]['taken']),
+
+            1 if p.get('firstBloodKill') else 0, 1 if p.get('firstBloodAssist') else 0,
+            1 if p.get('firstTowerKill') else 0, 1 if p.get('firstTowerAssist') else 0,
+            p['timeCCingOthers'],
+        ]
+
+        # Colunas por minuto na ordem de MINUTE_LAYOUT
+        for t in TARGET_MINUTES:
+            my_cs, my_gold, my_xp, my_lvl = get_stats_at_minute(frames, t, pid)
+            my_k, my_d, my_a, my_plates = events_at(t_index, t, pid)
+            en_cs, en_gold, en_xp, en_lvl = get_stats_at_minute(frames, t, enemy_pid)
+            team_gold_at_t = team_gold_at(t_index, t, tid) or 1
+
+            my_dmg_est = round((p['totalDamageDealtToChampions'] / duration_min) * t, 2)
+            en_dmg_est = round((enemy_data['totalDamageDealtToChampions'] / duration_min) * t, 2)
+
+            if t in DIFF_MINUTES:
+                stats.extend((
+                    my_k, my_d, my_a, my_cs, my_gold, my_xp, my_plates,
+                    safe_div(my_k + my_a, my_d), safe_div(my_gold, t), safe_div(my_dmg_est, t),
+                    safe_div(my_gold, team_gold_at_t), safe_div(my_dmg_est, my_gold),
+                    my_cs - en_cs, my_gold - en_gold, my_xp - en_xp, round(my_dmg_est - en_dmg_est, 2),
+                ))
+            if t == 12:
+                stats.extend((my_cs, my_gold, my_xp, my_d, round(safe_div(p['visionScore'], duration_min) * 12, 2),
+                              safe_div(my_k + my_a, my_d)))
+            if t == 6: stats.append(my_cs)
+            if t == 18: stats.append(my_cs)
+
+        rows.append(tuple(stats))
+    return rows or Skipped('no_role')
+
+# --- BR (app_br.py) ---
+def get_snapshot_at_minute(frames, minute, pid, team_id, t_index):
+    if minute >= len(frames): return None
+    frame = frames[minute]['participantFrames'].get(str(pid))
+    if not frame: return None
+    
+    cs = frame['minionsKilled'] + frame['jungleMinionsKilled']
+    gold = frame['totalGold']
+    xp = frame['xp']
+    damage = frame.get('damageStats', {}).get('totalDamageDoneToChampions', 0)
+    
+    # Ouro do time já vem somado do índice (passada única)
+    gold_share = safe_div(gold, team_gold_at(t_index, minute, team_id))
+    
+    return {'cs': cs, 'gold': gold, 'xp': xp, 'damage': damage, 'level': frame['level'], 'gold_share': gold_share}
+
+def get_events_at_minute(t_index, minute, pid):
+    kills, deaths, assists, plates = events_at(t_index, minute, pid)
+    return {'kills': kills, 'deaths': deaths, 'assists': assists, 'plates': plates}
+
+def process_match_br(match_id, match, timeline):
+    info = match['info']
+    duration_seconds = info['gameDuration']
+    duration_min = duration_seconds / 60
+    
+    # 🛡️ FILTRO DE REMAKE (< 3min 30s)
+    if duration_seconds < REMAKE_DURATION: 
+        print(f" ⏩ Ignorando Remake ({duration_min:.1f} min)")
+        return Skipped('remakes')
+    
+    patch = get_clean_version(info['gameVersion'])
+    frames = timeline['info']['frames']
+    start_time = info['gameCreation'] 
+    
+    role_map = {100: {}, 200: {}}
+    participants_info = info['participants']
+    team_totals = {100: {'dmg': 0, 'taken': 0}, 200: {'dmg': 0, 'taken': 0}}
+
+    for p in participants_info:
+        tid = p['teamId']
+        team_totals[tid]['dmg'] += p['totalDamageDealtToChampions']
+        team_totals[tid]['taken'] += p['totalDamageTaken']
+        if p.get('teamPosition'): role_map[tid][p['teamPosition']] = p['participantId']
+
+    # Passada única na timeline: eventos cumulativos + ouro de time por minuto
+    t_index = build_timeline_index(frames, participants_info)
+
+    rows = []
+    for p in participants_info:
+        pid = p['participantId']
+        tid = p['teamId']
+        pos = p['teamPosition']
+        if not pos: continue
+
+        enemy_team = 200 if tid == 100 else 100
+        enemy_pid = role_map[enemy_team].get(pos)
+        
+        enemy_champ = "None"
+        if enemy_pid:
+            enemy_data = next((x for x in participants_info if x['participantId'] == enemy_pid), None)
+            if enemy_data: enemy_champ = enemy_data['championName']
+
+        # --- CORREÇÃO DO NOME AQUI ---
+        # Monta o Riot ID corretamente: Nome + # + TAG
+        game_name = p.get('riotIdGameName')
+        tag_line = p.get('riotIdTagline')
+        
+        if game_name and tag_line:
+            full_name = f"{game_name}#{tag_line}"
+        else:
+            full_name = p.get('summonerName', 'Desconhecido') # Fallback
+            
+        stats = [
+            1, match_id, patch, p['championName'], enemy_champ, pos, start_time,
+            round(duration_min, 2),  # Duração em minutos
+            1 if p['win'] else 0,
+            full_name, p['puuid'],
+
+            # KDA & Combate
+            p.get('kills', 0), p.get('deaths', 0), p.get('assists', 0),
+            safe_div(p.get('kills', 0) + p.get('assists', 0), p.get('deaths', 1)),
+            safe_div(p.get('kills', 0) + p.get('assists', 0), info['teams'][0]['objectives']['champion']['kills'] if tid==100 else info['teams'][1]['objectives']['champion']['kills']),
+            p.get('totalDamageDealtToChampions', 0), p.get('totalDamageTaken', 0), p.get('damageSelfMitigated', 0),
+
+            # Economia
+            p.get('goldEarned', 0),
+            safe_div(p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0), duration_min),
+            safe_div(p.get('totalDamageDealtToChampions', 0), duration_min),
+            safe_div(p.get('goldEarned', 0), duration_min),
+
+            # Visão e Objetivos
+            p.get('visionScore', 0), safe_div(p.get('visionScore', 0), duration_min),
+            p.get('wardsPlaced', 0), p.get('wardsKilled', 0), p.get('detectorWardsPlaced', 0),
+            p.get('damageDealtToBuildings', 0), p.get('damageDealtToObjectives', 0), p.get('turretPlatesTaken', 0),
+
+            # Extras
+            safe_div(p.get('totalDamageDealtToChampions', 0), team_totals[tid]['dmg']),
+            safe_div(p.get('totalDamageTaken', 0), team_totals[tid]['taken']),
+            1 if p.get('firstBloodKill') else 0, 1 if p.get('firstBloodAssist') else 0,
+            1 if p.get('firstTowerKill') else 0, 1 if p.get('firstTowerAssist') else 0,
+            p.get('timeCCingOthers', 0),
+        ]
+
+        # Colunas por minuto na ordem de MINUTE_LAYOUT (minuto que a partida não teve = vazio)
+        for t in TARGET_MINUTES:
+            my_snap = get_snapshot_at_minute(frames, t, pid, tid, t_index)
+            if not my_snap:
+                stats.extend([None] * len(MINUTE_LAYOUT[t]))
+                continue
+            en_snap = get_snapshot_at_minute(frames, t, enemy_pid, enemy_team, t_index) if enemy_pid else None
+            my_events = get_events_at_minute(t_index, t, pid)
+
+            if t in DIFF_MINUTES:
+                stats.extend((
+                    my_events['kills'], my_events['deaths'], my_events['assists'],
+                    my_snap['cs'], my_snap['gold'], my_snap['xp'], my_events['plates'],
+                    safe_div(my_events['kills'] + my_events['assists'], my_events['deaths']),
+                    safe_div(my_snap['gold'], t), safe_div(my_snap['damage'], t),
+                    my_snap['gold_share'], safe_div(my_snap['damage'], my_snap['gold']),
+                ))
+                if en_snap:
+                    stats.extend((my_snap['cs'] - en_snap['cs'], my_snap['gold'] - en_snap['gold'],
+                                  my_snap['xp'] - en_snap['xp'], my_snap['damage'] - en_snap['damage']))
+                else:
+                    stats.extend((0, 0, 0, 0))
+
+            if t == 6: stats.append(my_snap['cs'])
+            if t == 12:
+                stats.extend((my_snap['cs'], my_snap['gold'], my_snap['xp'], my_events['deaths'],
+                              safe_div(p['visionScore'], 12),
+                              safe_div(my_events['kills'] + my_events['assists'], my_events['deaths'])))
+            if t == 18: stats.append(my_snap['cs'])
+
+        rows.append(tuple(stats))
+    return rows or Skipped('no_role')
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from features import DIFF_MINUTES, KR_MIN_DURATION, REMAKE_DURATION
+
+# --- MODO VETORIZADO (TENSOR DE FRAMES) ---
+# Carrega cada timeline num array denso [minuto, participante, campo] (ou um lote de
+# partidas em [partida, minuto, participante, campo]) e calcula as colunas por minuto
+# (CS/Gold/XP/DMG Diff, Gold Share, GPM, DPM, Gold Eff) com operações de array inteiro,
+# em vez de uma consulta Python por célula. Serve para re-derivar essas colunas para
+# milhares de partidas guardadas de uma vez (python recompute.py kr --tensor).
+# A grade de minutos é a mesma do features.py (DIFF_MINUTES, configurável).
+
+N_PARTICIPANTS = 10
+FIELDS = ('cs', 'gold', 'xp', 'level', 'damage', 'present')
+CS, GOLD, XP, LEVEL, DAMAGE, PRESENT = range(len(FIELDS))
+MIN_DURATION = {'kr': KR_MIN_DURATION, 'br': REMAKE_DURATION}  # Mesmos cortes do process_match_*
+
+
+def load_frame_tensor(frames):
+    # [minuto, participante, campo]; participante i = participantId i+1
+    tensor = np.zeros((len(frames), N_PARTICIPANTS, len(FIELDS)), dtype=np.float64)
+    for m, frame in enumerate(frames):
+        p_frames = frame['participantFrames']
+        for i in range(N_PARTICIPANTS):
+            p = p_frames.get(str(i + 1))
+            if not p: continue
+            tensor[m, i] = (
+                p['minionsKilled'] + p['jungleMinionsKilled'], p['totalGold'], p['xp'], p['level'],
+                p.get('damageStats', {}).get('totalDamageDoneToChampions', 0), 1,
+            )
+    return tensor
+
+
+def stack_frame_tensors(tensors, n_minutes=None):
+    # Empilha várias partidas em [partida, minuto, participante, campo].
+    # Partidas mais curtas ficam com present=0 nos minutos que não existem.
+    if n_minutes is None:
+        n_minutes = max((t.shape[0] for t in tensors), default=0)
+    batch = np.zeros((len(tensors), n_minutes, N_PARTICIPANTS, len(FIELDS)), dtype=np.float64)
+    n_frames = np.zeros(len(tensors), dtype=np.int64)
+    for b, t in enumerate(tensors):
+        k = min(t.shape[0], n_minutes)
+        batch[b, :k] = t[:k]
+        n_frames[b] = t.shape[0]
+    return batch, n_frames
+
+
+def lane_layout(participants_info):
+    # Time (0 = azul, 1 = vermelho), índice do oponente de rota (-1 se não houver)
+    # e se o participante tem rota definida (sem rota, process_match pula a linha)
+    team = np.zeros(N_PARTICIPANTS, dtype=np.int64)
+    opponent = np.full(N_PARTICIPANTS, -1, dtype=np.int64)
+    has_role = np.zeros(N_PARTICIPANTS, dtype=bool)
+    role_map = {100: {}, 200: {}}
+    for p in participants_info:
+        i = p['participantId'] - 1
+        team[i] = 0 if p['teamId'] == 100 else 1
+        if p.get('teamPosition'):
+            role_map[p['teamId']][p['teamPosition']] = i
+            has_role[i] = True
+    for tid, enemy in ((100, 200), (200, 100)):
+        for pos, i in role_map[tid].items():
+            opponent[i] = role_map[enemy].get(pos, -1)
+    return team, opponent, has_role
+
+
+def round2(x):
+    # np.round(x, 2) erra a 2a casa em alguns empates (x * 100 perde precisão);
+    # só esses casos de fronteira caem no round() do Python, o resto fica vetorizado
+    x = np.asarray(x, dtype=np.float64)
+    scaled = x * 100
+    out = np.round(scaled) / 100
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if tie.any():
+        out[tie] = [round(v, 2) for v in x[tie].tolist()]
+    return out
+
+
+def safe_div(a, b):
+    # Mesma regra do safe_div escalar: round(a / b, 2), ou 0 quando b == 0
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    b_ok = b != 0
+    return np.where(b_ok, round2(a / np.where(b_ok, b, 1)), 0.0)
+
+
+def minute_arrays(batch, n_frames, team, opponent, minutes, dmg_per_min=None):
+    # batch [B, F, P, C]; team/opponent [B, P]; dmg_per_min [B, P] ou None.
+    # Devolve dict métrica -> array [B, len(minutes), P].
+    # dmg_per_min=None usa o dano do frame (app_br); senão estima dano = taxa * t (app.py).
+    minutes = np.asarray(minutes, dtype=np.int64)
+    B, F, P, _ = batch.shape
+    in_range = minutes[None, :] < n_frames[:, None]                         # [B, M]
+    idx = np.clip(minutes, 0, max(F - 1, 0))
+    snap = batch[:, idx] * in_range[:, :, None, None]                       # [B, M, P, C]
+    present = snap[..., PRESENT] > 0
+
+    # Ouro por time no minuto, espalhado de volta para cada participante
+    team_mask = team[:, None, :, None] == np.arange(2)[None, None, None, :]   # [B, 1, P, 2]
+    team_gold = (snap[..., GOLD][..., None] * team_mask).sum(axis=2)          # [B, M, 2]
+    my_team_gold = np.take_along_axis(team_gold, np.broadcast_to(team[:, None, :], snap.shape[:3]), axis=2)
+
+    t = minutes[None, :, None].astype(np.float64)
+    if dmg_per_min is None:
+        damage = snap[..., DAMAGE]
+    else:
+        damage = round2(dmg_per_min[:, None, :] * t)
+
+    has_opp = opponent >= 0
+    opp = np.where(has_opp, opponent, 0)[:, None, :]
+    opp = np.broadcast_to(opp, snap.shape[:3])
+    en = {
+        'cs': np.take_along_axis(snap[..., CS], opp, axis=2),
+        'gold': np.take_along_axis(snap[..., GOLD], opp, axis=2),
+        'xp': np.take_along_axis(snap[..., XP], opp, axis=2),
+        'damage': np.take_along_axis(damage, opp, axis=2),
+        'present': np.take_along_axis(present, opp, axis=2) & has_opp[:, None, :],
+    }
+
+    gold = snap[..., GOLD]
+    return {
+        'CS': snap[..., CS], 'Gold Earned': gold, 'XP': snap[..., XP], 'Level': snap[..., LEVEL],
+        'Damage': damage, 'present': present, 'enemy_present': en['present'],
+        'Team Gold': my_team_gold,
+        'GPM': safe_div(gold, t), 'DPM': safe_div(damage, t),
+        'Gold Eff': safe_div(damage, gold),
+        'CS Diff': snap[..., CS] - en['cs'], 'Gold Diff': gold - en['gold'],
+        'XP Diff': snap[..., XP] - en['xp'], 'DMG Diff': round2(damage - en['damage']),
+    }
+
+
+def minute_columns(matches, timelines, mode='kr', minutes=DIFF_MINUTES):
+    # Re-deriva as colunas por minuto de um lote de partidas (JSONs brutos da API).
+    # Saída: um DataFrame com 'Match ID', 'Participant ID' e as colunas no mesmo
+    # formato do process_match (ex: "Gold Diff 14'").
+    # mode='kr' segue o app.py (dano estimado pela média da partida, participante sem
+    # frame vira 0); mode='br' segue o app_br.py (dano do frame, sem frame = vazio).
+    # Partidas que o process_match descarta (curtas / remake) ficam de fora.
+    kept = [(m, tl) for m, tl in zip(matches, timelines) if m['info']['gameDuration'] >= MIN_DURATION[mode]]
+    if not kept: return pd.DataFrame()
+    matches, timelines = [m for m, _ in kept], [tl for _, tl in kept]
+    infos = [m['info'] for m in matches]
+    batch, n_frames = stack_frame_tensors([load_frame_tensor(tl['info']['frames']) for tl in timelines])
+    layouts = [lane_layout(info['participants']) for info in infos]
+    team = np.stack([l[0] for l in layouts]); opponent = np.stack([l[1] for l in layouts])
+    has_role = np.stack([l[2] for l in layouts])
+
+    dmg_per_min = None
+    if mode == 'kr':
+        dmg_per_min = np.zeros((len(infos), N_PARTICIPANTS))
+        for b, info in enumerate(infos):
+            duration_min = info['gameDuration'] / 60
+            for p in info['participants']:
+                dmg_per_min[b, p['participantId'] - 1] = p['totalDamageDealtToChampions'] / duration_min
+
+    arr = minute_arrays(batch, n_frames, team, opponent, minutes, dmg_per_min)
+    if mode == 'kr':
+        # app.py: time sem ouro conta como 1 para não dividir por zero
+        arr['Gold Share'] = safe_div(arr['Gold Earned'], np.where(arr['Team Gold'] > 0, arr['Team Gold'], 1))
+    else:
+        arr['Gold Share'] = safe_div(arr['Gold Earned'], arr['Team Gold'])
+        for diff in ('CS Diff', 'Gold Diff', 'XP Diff', 'DMG Diff'):
+            arr[diff] = np.where(arr['enemy_present'], arr[diff], 0)
+
+    B = len(matches)
+    # Champion / PUUID: chave natural de partidas / partidas_br, para juntar com as tabelas
+    by_pid = [{p['participantId']: p for p in info['participants']} for info in infos]
+    data = {
+        'Match ID': np.repeat([m['metadata']['matchId'] for m in matches], N_PARTICIPANTS),
+        'Participant ID': np.tile(np.arange(1, N_PARTICIPANTS + 1), B),
+        'Champion': [ps.get(i, {}).get('championName') for ps in by_pid for i in range(1, N_PARTICIPANTS + 1)],
+        'PUUID': [ps.get(i, {}).get('puuid') for ps in by_pid for i in range(1, N_PARTICIPANTS + 1)],
+    }
+    metrics = ['CS', 'Gold Earned', 'XP', 'GPM', 'DPM', 'Gold Share', 'Gold Eff', 'CS Diff', 'Gold Diff', 'XP Diff', 'DMG Diff']
+    for j, minute in enumerate(minutes):
+        suffix = f"{minute}'"
+        keep = None if mode == 'kr' else arr['present'][:, j, :].reshape(-1)
+        for metric in metrics:
+            col = arr[metric][:, j, :].reshape(-1).astype(np.float64)
+            if keep is not None: col = np.where(keep, col, np.nan)
+            data[f'{metric} {suffix}'] = col
+
+    # Mesmas linhas que o process_match gera: app.py exige oponente de rota,
+    # app_br.py só exige rota definida
+    rows_mask = (opponent >= 0) if mode == 'kr' else has_role
+    return pd.DataFrame(data)[rows_mask.reshape(-1)].reset_index(drop=True)
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# --- INSTRUMENTAÇÃO DA COLETA ---
+# Os prints não dizem se uma noite lenta veio da latência da API, de 429, da extração
+# ou da gravação. Cada job (e cada RiotClient) tem um Metrics com:
+#   - tempo de parede e de CPU por estágio (discover, fetch, decode, extract, write e
+#     cada sink). A CPU é medida na thread que executa o estágio (time.thread_time).
+#   - histograma de latência por endpoint (roteamento + método da API)
+#   - contadores: retries, 429, 5xx, remakes/curtas/sem rota, partidas puladas, falhas...
+# No fim de cada job, write_run_report grava em METRICS_DIR:
+#   run_<job>_<AAAAmmddTHHMMSSZ>.json   relatório da execução (legível por máquina)
+#   riftanalysis_<job>.prom             textfile para o node_exporter (Prometheus)
+#
+# Nos estágios concorrentes (fetch com N workers) o tempo de parede é a soma do
+# tempo ocupado de cada worker, não a duração do estágio.
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]: i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Estimativa pelo limite superior do bucket (como o histogram_quantile do Prometheus)
+        if not self.count: return None
+        target = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target: return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': round(self.sum, 4), 'mean': round(self.sum / self.count, 4) if self.count else None,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'max': round(self.max, 4),
+                'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))}
+
+
+class Metrics:
+    def __init__(self):
+        # Atualizado pelo event loop e pelas threads do to_thread
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}   # estágio -> [parede, cpu, chamadas]
+        self.counters = {}
+        self.latency = {}  # endpoint -> Histogram
+
+    def add_stage(self, stage, wall, cpu=0.0):
+        with self.lock:
+            s = self.stages.setdefault(stage, [0.0, 0.0, 0])
+            s[0] += wall; s[1] += cpu; s[2] += 1
+
+    @contextmanager
+    def stage(self, stage):
+        # Para código síncrono (roda inteiro numa thread só)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def call(self, stage, fn, *args):
+        # Ex: await asyncio.to_thread(metrics.call, 'extract', job.extract, ...)
+        with self.stage(stage):
+            return fn(*args)
+
+    async def timed_iter(self, stage, agen):
+        # Gerador assíncrono medido só enquanto produz (não conta a espera de quem consome)
+        it = agen.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                item = await it.__anext__()
+            except StopAsyncIteration:
+                self.add_stage(stage, time.perf_counter() - start)
+                return
+            self.add_stage(stage, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, n=1):
+        if not n: return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, endpoint, seconds):
+        with self.lock:
+            h = self.latency.get(endpoint)
+            if h is None: h = self.latency[endpoint] = Histogram()
+            h.observe(seconds)
+
+
+def build_report(job):
+    m, api = job.metrics, job.client.metrics
+    duration = time.time() - m.started
+    written = m.counters.get('matches_written', 0)
+    rows = m.counters.get('rows_written', 0)
+    return {
+        'job': job.name,
+        'platform': job.platform,
+        'started_at': datetime.fromtimestamp(m.started, timezone.utc).isoformat(),
+        'duration_s': round(duration, 3),
+        'throughput': {'matches_per_s': round(written / duration, 3) if duration else 0,
+                       'rows_per_s': round(rows / duration, 3) if duration else 0},
+        'stages': {k: {'wall_s': round(w, 3), 'cpu_s': round(c, 3), 'calls': n} for k, (w, c, n) in sorted(m.stages.items())},
+        'counters': dict(sorted(m.counters.items())),
+        # Itens da fila durável por estado no fim da execução ('failed' = desistidos por ora)
+        'queue': job.queue.counts(job.name) if job.queue is not None else {},
+        # O cliente é por chave de API: se duas regiões dividem a chave, os números são dos dois jobs
+        'api': {'stages': {k: {'wall_s': round(w, 3), 'cpu_s': round(c, 3), 'calls': n} for k, (w, c, n) in sorted(api.stages.items())},
+                'counters': dict(sorted(api.counters.items())),
+                'latency': {k: h.to_dict() for k, h in sorted(api.latency.items())}},
+    }
+
+
+def prometheus_text(report):
+    job = report['job']
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP riftanalysis_{name} {help_text}')
+        lines.append(f'# TYPE riftanalysis_{name} {kind}')
+        for labels, value in samples:
+            label_str = ','.join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in [('job', job)] + labels)
+            lines.append(f'riftanalysis_{name}{{{label_str}}} {value}')
+
+    stages = dict(report['stages'], **{f'api.{k}': v for k, v in report['api']['stages'].items()})
+    metric('stage_wall_seconds', 'gauge', 'Tempo de parede por estágio na última execução',
+           [([('stage', k)], v['wall_s']) for k, v in stages.items()])
+    metric('stage_cpu_seconds', 'gauge', 'Tempo de CPU por estágio na última execução',
+           [([('stage', k)], v['cpu_s']) for k, v in stages.items()])
+    counters = dict(report['counters'], **report['api']['counters'])
+    metric('events', 'gauge', 'Contagens da última execução (retries, 429, remakes, puladas...)',
+           [([('event', k)], v) for k, v in counters.items()])
+    metric('queue_items', 'gauge', 'Itens da fila durável por estado no fim da execução',
+           [([('state', k)], v) for k, v in sorted(report['queue'].items())])
+    lines.append('# HELP riftanalysis_api_latency_seconds Latência das requisições por endpoint')
+    lines.append('# TYPE riftanalysis_api_latency_seconds histogram')
+    for endpoint, h in report['api']['latency'].items():
+        labels = f'job="{job}",endpoint="{endpoint}"'
+        acc = 0
+        for le, c in h['buckets'].items():
+            acc += c
+            lines.append(f'riftanalysis_api_latency_seconds_bucket{{{labels},le="{le}"}} {acc}')
+        lines.append(f'riftanalysis_api_latency_seconds_sum{{{labels}}} {h["sum"]}')
+        lines.append(f'riftanalysis_api_latency_seconds_count{{{labels}}} {h["count"]}')
+    metric('matches_per_second', 'gauge', 'Partidas gravadas por segundo', [([], report['throughput']['matches_per_s'])])
+    metric('rows_per_second', 'gauge', 'Linhas gravadas por segundo', [([], report['throughput']['rows_per_s'])])
+    metric('run_duration_seconds', 'gauge', 'Duração da última execução', [([], report['duration_s'])])
+    metric('last_run_timestamp_seconds', 'gauge', 'Fim da última execução', [([], round(time.time()))])
+    return '\n'.join(lines) + '\n'
+
+
+def write_run_report(job, root=METRICS_DIR):
+    # Devolve o caminho do JSON
+    report = build_report(job)
+    os.makedirs(root, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(root, f'run_{job.name}_{stamp}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    # Textfile: substituído de forma atômica (o node_exporter pode ler a qualquer momento)
+    prom = os.path.join(root, f'riftanalysis_{job.name}.prom')
+    with open(f'{prom}.tmp', 'w', encoding='utf-8') as f:
+        f.write(prometheus_text(report))
+    os.replace(f'{prom}.tmp', prom)
+    return path
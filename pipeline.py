@@ -0,0 +1,196 @@
+import asyncio
+import time
+from riot_client import CircuitOpenError
+from row_batch import RowBatch
+from work_queue import load_payload
+
+# --- PIPELINE EM ESTÁGIOS (STREAMING) ---
+# Antes: descobre TODOS os IDs, depois baixa/extrai e, a cada 100 partidas, para tudo
+# para gravar. Aqui cada estágio é uma corrotina ligada à seguinte por uma fila com
+# tamanho máximo:
+#   descoberta -> [ids] -> download (N workers) -> [JSON] -> extração -> [linhas] -> gravação
+# Fila cheia = o estágio anterior espera (backpressure). Rede, CPU e banco trabalham ao
+# mesmo tempo e a memória fica limitada pelo tamanho das filas + 1 lote, seja qual
+# for o MATCH_TARGET.
+#
+# Contrato do job (ver collector.Job): source.discover(job) é um gerador assíncrono de
+# listas de IDs novos; job.dropped recebe os IDs descobertos que não vão ser processados;
+# source.harvest(job, match) vê cada partida baixada (coparticipantes para a descoberta).
+#
+# Com job.queue (work_queue.py) cada passo fica registrado em disco: a execução começa
+# retomando o que a anterior não terminou e, como tudo que foi descoberto já está
+# salvo na fila, a marca d'água dos jogadores avança logo após cada grupo descoberto.
+
+ID_QUEUE = 4     # x concurrency: IDs esperando download
+RAW_QUEUE = 2    # x concurrency: partidas baixadas esperando extração (o JSON é o que pesa)
+BREAKER_WAITS = 2  # vezes que um download espera o circuito do endpoint fechar
+
+
+def log(job, msg):
+    print(f"[{job.name}] {msg}")
+
+
+def save_batch(job, rows):
+    # Grava em todos os sinks. Devolve False se algum sink obrigatório falhou.
+    batch = RowBatch(job.columns, rows)
+    log(job, f"--- Salvando lote de {len(batch)} linhas... ---")
+    ok = True
+    with job.metrics.stage('write'):
+        # Obrigatórios primeiro: um sink opcional (Parquet) só recebe o que já está no
+        # banco. Lote recusado volta inteiro na retomada e aí grava em todos.
+        for sink in sorted(job.sinks, key=lambda s: not s.required):
+            name = sink.__class__.__name__
+            if not ok and not sink.required:
+                log(job, f" > {name}: pulado (lote não foi para o banco)")
+                job.metrics.count(f'sink_skipped.{name}')
+                continue
+            try:
+                with job.metrics.stage(f'write.{name}'):
+                    sink.write(batch)
+                log(job, f" > {name}: Sucesso!")
+            except Exception as e:
+                log(job, f" > {name} ERRO: {e}")
+                job.metrics.count(f'sink_errors.{name}')
+                if sink.required: ok = False
+    return ok
+
+
+async def run_pipeline(job):
+    # Devolve (IDs descobertos, IDs não gravados)
+    discovered = {}
+    failed = []
+    id_q = asyncio.Queue(job.concurrency * ID_QUEUE)
+    raw_q = asyncio.Queue(job.concurrency * RAW_QUEUE)
+    row_q = asyncio.Queue(job.batch_size)
+    progress = {'fetched': 0, 'written': 0}
+
+    queue = job.queue
+    stats = job.metrics
+
+    async def discover():
+        try:
+            if queue is not None:
+                # 1. Retomada: linhas já extraídas vão direto para a gravação, o resto
+                #    para o download (que lê do cache bruto se já tiver sido baixado).
+                #    'failed' antigo ganha mais uma tentativa ou sai da fila.
+                requeued, dropped = await asyncio.to_thread(queue.recycle_failed, job.name)
+                stats.count('failed_requeued', requeued)
+                stats.count('failed_dropped', dropped)
+                pending = await asyncio.to_thread(queue.pending, job.name)
+                if pending: log(job, f"Retomando {len(pending)} partidas da execução anterior...")
+                stats.count('resumed', len(pending))
+                for m_id, state, payload in pending:
+                    discovered[m_id] = None
+                    if state == 'extracted':
+                        await row_q.put((m_id, load_payload(payload, job.columns)))
+                    else:
+                        await id_q.put(m_id)
+
+            # 2. Descoberta nova
+            async for ids in stats.timed_iter('discover', job.source.discover(job)):
+                ids = [m for m in ids if m not in discovered]
+                if queue is not None:
+                    ids = await asyncio.to_thread(queue.add, job.name, ids)
+                    # Já está salvo na fila: pode avançar a marca d'água de quem foi consultado
+                    try:
+                        await asyncio.to_thread(job.discovery.commit, job.dropped)
+                    except Exception as e:
+                        log(job, f"Marcas d'água não gravadas ({e}).")
+                stats.count('discovered', len(ids))
+                for m_id in ids:
+                    discovered[m_id] = None
+                    await id_q.put(m_id)
+        finally:
+            for _ in range(job.concurrency): await id_q.put(None)
+
+    async def fetch():
+        while (m_id := await id_q.get()) is not None:
+            start = time.perf_counter()
+            try:
+                match, timeline = await fetch_with_breaker(m_id)
+            except CircuitOpenError as e:
+                # Endpoint recusando: a partida fica pendente na fila (sem gastar tentativa)
+                log(job, f"Partida {m_id} adiada: {e}")
+                stats.count('fetch_deferred')
+                failed.append(m_id)
+                continue
+            except Exception as e:
+                log(job, f"Erro ao baixar partida {m_id}: {e}")
+                stats.count('fetch_failed')
+                failed.append(m_id)
+                if queue is not None: await asyncio.to_thread(queue.fail, job.name, m_id)
+                continue
+            finally:
+                stats.add_stage('fetch', time.perf_counter() - start)
+            stats.count('matches_fetched')
+            progress['fetched'] += 1
+            job.source.harvest(job, match)
+            if queue is not None: await asyncio.to_thread(queue.mark, job.name, [m_id], 'fetched')
+            await raw_q.put((m_id, match, timeline))
+
+    async def fetch_with_breaker(m_id):
+        # Circuito aberto: espera o resfriamento e tenta de novo (no máximo BREAKER_WAITS vezes)
+        for i in range(BREAKER_WAITS + 1):
+            try:
+                return await job.client.fetch_match(job.platform, m_id)
+            except CircuitOpenError as e:
+                if i == BREAKER_WAITS: raise
+                await asyncio.sleep(e.retry_in)
+
+    async def fetch_all():
+        try:
+            await asyncio.gather(*(fetch() for _ in range(job.concurrency)))
+        finally:
+            await raw_q.put(None)
+
+    async def extract():
+        # Numa thread para não travar o event loop (as outras regiões seguem baixando)
+        try:
+            while (item := await raw_q.get()) is not None:
+                m_id, match, timeline = item
+                try:
+                    rows = await asyncio.to_thread(stats.call, 'extract', job.extract, m_id, match, timeline)
+                except Exception as e:
+                    log(job, f"Erro ao extrair partida {m_id}: {e}")
+                    stats.count('extract_failed')
+                    failed.append(m_id)
+                    if queue is not None: await asyncio.to_thread(queue.fail, job.name, m_id)
+                    continue
+                # Sem linhas: o extrator diz o motivo (features.Skipped)
+                if not rows: stats.count(getattr(rows, 'reason', 'no_rows'))
+                if queue is not None:
+                    # Sem linhas (remake) não há o que gravar: já conta como concluída
+                    if rows: await asyncio.to_thread(queue.extracted, job.name, m_id, rows)
+                    else: await asyncio.to_thread(queue.mark, job.name, [m_id], 'written')
+                await row_q.put((m_id, rows))
+        finally:
+            await row_q.put(None)
+
+    async def write():
+        buffer, batch_ids = [], []
+
+        async def flush():
+            # Lote recusado fica como 'extracted' na fila e é regravado na próxima execução
+            if buffer and not await asyncio.to_thread(save_batch, job, buffer):
+                stats.count('batches_failed')
+                failed.extend(batch_ids)
+            elif buffer:
+                stats.count('matches_written', len(batch_ids))
+                stats.count('rows_written', len(buffer))
+                progress['written'] += len(batch_ids)
+                if queue is not None: await asyncio.to_thread(queue.mark, job.name, list(batch_ids), 'written')
+            buffer.clear(); batch_ids.clear()
+
+        while (item := await row_q.get()) is not None:
+            m_id, rows = item
+            if not rows: continue
+            buffer.extend(rows)
+            batch_ids.append(m_id)
+            if len(batch_ids) >= job.batch_size:
+                # Enquanto grava, a fila de linhas enche e segura os estágios anteriores
+                await flush()
+                log(job, f"{progress['written']} partidas gravadas / {progress['fetched']} baixadas / {len(discovered)} descobertas.")
+        await flush()
+
+    await asyncio.gather(discover(), fetch_all(), extract(), write())
+    return set(discovered), failed
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import json
+import os
+from timeline_decode import loads, slim_timeline
+
+# --- CACHE LOCAL DOS JSONS BRUTOS (partida + timeline) ---
+# process_match só usa as respostas da API uma vez; guardando o bruto comprimido em
+# disco dá para mudar features (minuto novo, fórmula de KDA...) e reconstruir as
+# linhas sem baixar tudo de novo. Cada partida vira um .json.gz endereçado pelo hash
+# do Match ID (cache_raw/ab/abcdef....json.gz). Quando passa do tamanho máximo, os
+# arquivos menos usados recentemente são apagados.
+
+CACHE_DIR = os.environ.get('RAW_CACHE_DIR', 'cache_raw')
+CACHE_MAX_MB = int(os.environ.get('RAW_CACHE_MAX_MB', '4096'))
+
+
+class RawCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = sum(os.path.getsize(p) for p in self.paths())
+
+    def paths(self):
+        if not os.path.isdir(self.root): return
+        for sub in os.scandir(self.root):
+            if not sub.is_dir(): continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith('.json.gz'): yield f.path
+
+    def path(self, match_id):
+        key = hashlib.sha256(match_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, key[:2], f'{key}.json.gz')
+
+    def __contains__(self, match_id):
+        return os.path.exists(self.path(match_id))
+
+    def get(self, match_id, slim=False):
+        # (match, timeline) ou None se não estiver no cache. slim=True devolve a timeline
+        # só com os campos que a extração usa (timeline_decode.py)
+        path = self.path(match_id)
+        try:
+            with gzip.open(path, 'rb') as f:
+                payload = loads(f.read())
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(path)  # marca como usado recentemente (para a eviction)
+        timeline = slim_timeline(payload['timeline']) if slim else payload['timeline']
+        return payload['match'], timeline
+
+    def put(self, match_id, match, timeline):
+        self.put_raw(match_id, json.dumps(match, separators=(',', ':')).encode('utf-8'),
+                     json.dumps(timeline, separators=(',', ':')).encode('utf-8'))
+
+    def put_raw(self, match_id, match_raw, timeline_raw):
+        # Corpos da API como vieram (bytes): monta o mesmo JSON {'match_id','match','timeline'}
+        # sem decodificar e recodificar a timeline inteira
+        path = self.path(match_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp, 'wb', compresslevel=6) as f:
+            f.write(b'{"match_id":' + json.dumps(match_id).encode('utf-8') + b',"match":')
+            f.write(match_raw)
+            f.write(b',"timeline":')
+            f.write(timeline_raw)
+            f.write(b'}')
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)  # escrita atômica: nunca deixa arquivo pela metade
+        self.total_bytes += os.path.getsize(path) - old
+        if self.total_bytes > self.max_bytes: self.evict()
+
+    def evict(self):
+        # Apaga os menos usados até ficar em 90% do limite
+        files = sorted(self.paths(), key=lambda p: os.stat(p).st_mtime)
+        target = self.max_bytes * 0.9
+        for p in files:
+            if self.total_bytes <= target: break
+            size = os.path.getsize(p)
+            os.remove(p)
+            self.total_bytes -= size
+
+    def iter_matches(self, prefix=''):
+        # Replay offline: (match_id, match, timeline) de tudo que está no cache,
+        # opcionalmente filtrando pelo prefixo do Match ID (ex: 'KR_', 'BR1_')
+        for p in self.paths():
+            payload = read_payload(p)
+            if payload and payload.get('match_id', '').startswith(prefix):
+                yield payload['match_id'], payload['match'], payload['timeline']
+
+
+def read_payload(path):
+    # Lê um arquivo do cache sem precisar da instância (usado pelos workers do recálculo)
+    try:
+        with gzip.open(path, 'rb') as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return None
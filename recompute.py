@@ -0,0 +1,125 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import create_engine, text
+from db_sink import NATURAL_KEYS, qi, write_batch
+from features import BR_COLUMNS, KR_COLUMNS, process_match_kr, process_match_br
+from frame_tensor import minute_columns
+from raw_cache import CACHE_DIR, RawCache, read_payload
+from row_batch import RowBatch
+
+# --- RECÁLCULO EM LOTE (BACKFILL OFFLINE) ---
+# Reconstrói as linhas a partir das partidas guardadas no cache local, espalhando a
+# extração de features por todos os núcleos (ProcessPoolExecutor). Grava numa tabela
+# NOVA (ex: partidas_v2), nunca na tabela de produção, então dá para aplicar uma
+# mudança de schema/fórmula em todo o histórico e trocar a tabela depois.
+# A gravação é a mesma da coleta (db_sink.write_batch: COPY + upsert na chave natural
+# da tabela de produção), então rodar de novo por cima não duplica linhas.
+#
+#   python recompute.py kr --table partidas_v2 [--workers 8] [--replace] [--tensor]
+#
+# Grade de minutos nova (TARGET_MINUTES / DIFF_MINUTES no ambiente, ver features.py):
+# um recálculo completo gera as colunas de todo o histórico.
+# Com --tensor recalcula só as colunas por minuto dos DIFF_MINUTES (CS/Gold/XP/DMG
+# Diff, Gold Share, GPM, DPM, Gold Eff) pelo modo vetorizado (frame_tensor.py), um
+# bloco inteiro de partidas por vez. O upsert é na chave natural: numa tabela já
+# recalculada, só essas colunas são atualizadas.
+
+SOURCES = {
+    'kr': {'prefix': 'KR_', 'extract': process_match_kr, 'columns': KR_COLUMNS, 'live_table': 'partidas'},
+    'br': {'prefix': 'BR1_', 'extract': process_match_br, 'columns': BR_COLUMNS, 'live_table': 'partidas_br'},
+}
+CHUNK_SIZE = 200  # Arquivos por tarefa (cada worker lê os próprios arquivos do disco)
+
+
+def extract_chunk(source, paths):
+    # Roda dentro do worker: lê, filtra pela região e extrai. Devolve (partidas, linhas).
+    cfg = SOURCES[source]
+    rows = []
+    n_matches = 0
+    for path in paths:
+        payload = read_payload(path)
+        if not payload or not payload.get('match_id', '').startswith(cfg['prefix']): continue
+        data = cfg['extract'](payload['match_id'], payload['match'], payload['timeline'])
+        if data:
+            rows.extend(data)
+            n_matches += 1
+    return n_matches, rows
+
+
+def tensor_chunk(source, paths):
+    # Modo vetorizado: lê o bloco todo e calcula as colunas por minuto de uma vez.
+    # Devolve (partidas, colunas, linhas), só com as colunas que existem na tabela da região.
+    cfg = SOURCES[source]
+    matches, timelines = [], []
+    for path in paths:
+        payload = read_payload(path)
+        if not payload or not payload.get('match_id', '').startswith(cfg['prefix']): continue
+        matches.append(payload['match'])
+        timelines.append(payload['timeline'])
+    df = minute_columns(matches, timelines, mode=source)
+    if df.empty: return 0, [], []
+    batch = RowBatch.from_frame(df[[c for c in df.columns if c in cfg['columns']]])
+    return df['Match ID'].nunique(), batch.columns, batch.rows
+
+
+def recompute(source, table, engine, cache_dir=CACHE_DIR, workers=None, replace=False, tensor=False):
+    if table == SOURCES[source]['live_table']:
+        raise ValueError(f"Recálculo não grava direto em '{table}'. Use uma tabela nova.")
+
+    paths = list(RawCache(cache_dir).paths())
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    print(f"Recalculando {len(paths)} arquivos do cache em {len(chunks)} blocos -> '{table}'...")
+
+    start = time.time()
+    total_matches = 0
+    total_rows = 0
+    cfg = SOURCES[source]
+    if replace:
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS {qi(table)}'))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if tensor:
+            futures = [pool.submit(tensor_chunk, source, chunk) for chunk in chunks]
+        else:
+            futures = [pool.submit(extract_chunk, source, chunk) for chunk in chunks]
+        for fut in as_completed(futures):
+            if tensor:
+                n_matches, columns, rows = fut.result()
+            else:
+                n_matches, rows = fut.result()
+                columns = cfg['columns']
+            if not rows: continue
+            write_batch(engine, RowBatch(columns, rows), table, keys=NATURAL_KEYS[cfg['live_table']])
+            total_matches += n_matches
+            total_rows += len(rows)
+            print(f" > {total_matches} partidas / {total_rows} linhas gravadas.")
+
+    print(f"Recálculo finalizado em {time.time() - start:.1f}s: {total_matches} partidas.")
+    return total_matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recalcula as linhas a partir do cache local de partidas.')
+    parser.add_argument('source', choices=sorted(SOURCES))
+    parser.add_argument('--table', help='tabela de destino (padrão: <tabela>_recalc)')
+    parser.add_argument('--workers', type=int, default=None, help='processos (padrão: todos os núcleos)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--replace', action='store_true', help='recria a tabela de destino')
+    parser.add_argument('--tensor', action='store_true',
+                        help='só as colunas por minuto dos DIFF_MINUTES, pelo modo vetorizado (frame_tensor.py)')
+    args = parser.parse_args()
+
+    db_url = os.environ.get("DB_URL")
+    if not db_url:
+        print("ERRO: DB_URL ausente.")
+        sys.exit(1)
+
+    table = args.table or f"{SOURCES[args.source]['live_table']}_recalc"
+    recompute(args.source, table, create_engine(db_url), args.cache_dir, args.workers, args.replace, args.tensor)
+
+
+if __name__ == "__main__":
+    main()
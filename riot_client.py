@@ -0,0 +1,361 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import Metrics
+from timeline_decode import decode_match
+
+# --- CLIENTE ASSÍNCRONO DA API DA RIOT ---
+# Substitui os time.sleep() fixos: várias requisições (partida + timeline) ficam em voo
+# ao mesmo tempo e o ritmo é controlado por janelas fixas, contadas como a Riot conta,
+# que seguem os headers de rate limit que ela devolve (X-App-Rate-Limit /
+# X-Method-Rate-Limit e as contagens X-*-Rate-Limit-Count).
+#
+# Transporte: sessão com keep-alive e pool de conexões por host (com threads próprias,
+# do mesmo tamanho do pool), respostas em gzip e novas tentativas para 429/5xx/erro de
+# rede. Retry-After é respeitado; sem ele, espera exponencial com jitter. Cada endpoint
+# (roteamento + método) tem um circuit breaker: falhas seguidas abrem o circuito e as
+# chamadas falham na hora (CircuitOpenError) até o tempo de resfriamento passar, em vez
+# de continuar batendo num serviço que já está recusando.
+
+# Plataforma (kr, br1, ...) -> roteamento regional usado pela match-v5
+PLATFORM_TO_REGION = {
+    'kr': 'asia', 'jp1': 'asia',
+    'br1': 'americas', 'na1': 'americas', 'la1': 'americas', 'la2': 'americas',
+    'euw1': 'europe', 'eun1': 'europe', 'tr1': 'europe', 'ru': 'europe', 'me1': 'europe',
+    'oc1': 'sea', 'sg2': 'sea', 'tw2': 'sea', 'vn2': 'sea',
+}
+
+# Host da API por roteamento. RIOT_API_BASE aponta para outro servidor, ex. o simulador
+# local dos testes de carga: http://127.0.0.1:8765/{routing} (benchmarks/mock_riot.py)
+API_BASE = os.environ.get('RIOT_API_BASE', 'https://{routing}.api.riotgames.com')
+
+# Limites da chave de desenvolvimento, usados até o primeiro header chegar
+DEFAULT_APP_LIMITS = [(20, 1), (100, 120)]
+MAX_RETRIES = 4
+RETRY_STATUS = (429, 500, 502, 503, 504)
+BACKOFF_BASE = 0.5   # s; tentativa n espera ~BASE * 2^n (metade fixa + metade aleatória)
+BACKOFF_CAP = 30
+BREAKER_THRESHOLD = 5  # falhas seguidas no mesmo endpoint
+BREAKER_COOLDOWN = 30  # s com o circuito aberto
+
+
+def backoff(attempt):
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limits(header):
+    # "20:1,100:120" -> [(20, 1), (100, 120)]
+    limits = []
+    for part in (header or '').split(','):
+        if ':' not in part: continue
+        amount, window = part.split(':', 1)
+        limits.append((int(amount), int(window)))
+    return limits
+
+
+class FixedWindow:
+    # Janela fixa, como a Riot conta: abre na primeira requisição, aceita 'capacity' e
+    # zera de uma vez depois de 'period' segundos. Cheia = espera o reset (não vai
+    # liberando aos poucos como um token bucket).
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.count = 0
+        self.reset_at = None            # None = nenhuma requisição na janela atual
+        self.closed_at = float('-inf')  # Reset da janela anterior
+
+    def _roll(self, now):
+        if self.reset_at is not None and now >= self.reset_at:
+            self.count, self.reset_at, self.closed_at = 0, None, self.reset_at
+
+    def wait_time(self, now):
+        self._roll(now)
+        if self.count < self.capacity: return 0.0
+        return self.reset_at - now
+
+    def take(self, now):
+        self._roll(now)
+        if self.reset_at is None: self.reset_at = now + self.period
+        self.count += 1
+
+    def sync_count(self, count, sent, now):
+        # Header X-*-Rate-Limit-Count da requisição enviada em 'sent': o servidor já
+        # contou 'count' requisições na janela dele
+        self._roll(now)
+        if sent < self.closed_at: return  # Resposta de uma janela que já zerou
+        if self.reset_at is None:
+            # Janela vista só pelo header (limite novo): o reset conta da resposta
+            self.reset_at = now + self.period
+        elif count == 1:
+            # O servidor abriu a janela com esta requisição, depois do nosso envio: o reset
+            # dele é mais tarde que o nosso. Conta da resposta para não mandar antes da hora.
+            self.reset_at = max(self.reset_at, now + self.period)
+        self.count = max(self.count, count)
+
+
+class RateLimiter:
+    # Um conjunto de janelas (uma por par do header) + bloqueio por Retry-After
+    def __init__(self, limits=None):
+        self.windows = {}
+        self.blocked_until = 0.0
+        if limits: self.set_limits(limits)
+
+    def set_limits(self, limits):
+        current = self.windows
+        self.windows = {}
+        for amount, period in limits:
+            window = current.get(period) or FixedWindow(amount, period)
+            window.capacity = amount
+            self.windows[period] = window
+
+    def update(self, limits_header, counts_header, sent):
+        limits = parse_rate_limits(limits_header)
+        if limits and sorted(limits) != sorted((w.capacity, p) for p, w in self.windows.items()):
+            self.set_limits(limits)
+        now = time.monotonic()
+        for count, period in parse_rate_limits(counts_header):
+            if period in self.windows: self.windows[period].sync_count(count, sent, now)
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def wait_time(self, now):
+        wait = max(0.0, self.blocked_until - now)
+        for w in self.windows.values():
+            wait = max(wait, w.wait_time(now))
+        return wait
+
+    def take(self, now):
+        for w in self.windows.values(): w.take(now)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f'circuito aberto para {endpoint} (tenta de novo em {retry_in:.0f}s)')
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    # fechado -> (BREAKER_THRESHOLD falhas seguidas) -> aberto por BREAKER_COOLDOWN ->
+    # meio-aberto: uma requisição de teste passa; sucesso fecha, falha reabre
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def wait_time(self, now):
+        # 0 = pode chamar; > 0 = segundos até o próximo teste
+        if self.opened_at is None: return 0.0
+        remaining = self.opened_at + self.cooldown - now
+        if remaining > 0: return remaining
+        if self.probing: return 1.0  # outra chamada já está testando
+        self.probing = True
+        return 0.0
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release(self):
+        # Teste sem veredito (ex: 429 do nosso próprio limite): o próximo pode testar
+        self.probing = False
+
+    def failure(self, now):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = now
+
+
+async def acquire(*limiters):
+    # Só conta a requisição quando TODOS os limitadores (app + método) liberam.
+    # Devolve o instante do envio (para casar com os headers da resposta).
+    while True:
+        now = time.monotonic()
+        wait = max(l.wait_time(now) for l in limiters)
+        if wait <= 0:
+            for l in limiters: l.take(now)
+            return now
+        await asyncio.sleep(wait)
+
+
+class RiotClient:
+    def __init__(self, api_key, concurrency=8, timeout=10, cache=None, base_url=API_BASE):
+        self.concurrency = concurrency
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache  # RawCache opcional: consultado antes de ir na API
+        self.session = requests.Session()
+        self.session.headers['X-Riot-Token'] = api_key
+        self.session.headers['Accept-Encoding'] = 'gzip'
+        # Um pool por host (kr, asia, br1, americas...), partida + timeline em voo por slot.
+        # As threads são do cliente: o executor padrão do asyncio pode ter menos threads
+        # que conexões e viraria o gargalo.
+        pool = concurrency * 2
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool, thread_name_prefix='riot-http')
+        self._app_limiters = {}
+        self._method_limiters = {}
+        self._breakers = {}
+        self.metrics = Metrics()  # Latência por endpoint, retries, 429/5xx (ver metrics.py)
+
+    def _limiters(self, routing, method):
+        app = self._app_limiters.get(routing)
+        if app is None:
+            app = self._app_limiters[routing] = RateLimiter(DEFAULT_APP_LIMITS)
+        key = (routing, method)
+        meth = self._method_limiters.get(key)
+        if meth is None:
+            meth = self._method_limiters[key] = RateLimiter()
+        return app, meth
+
+    def _breaker(self, routing, method):
+        key = (routing, method)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker()
+        return breaker
+
+    async def _send(self, url, params):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self.session.get, url, params=params, timeout=self.timeout))
+
+    async def get(self, routing, method, path, params=None, raw=False):
+        # routing = host (kr, br1, asia, americas...). method identifica o limite do endpoint.
+        # raw=True devolve os bytes do corpo sem decodificar (a timeline é decodificada enxuta)
+        app, meth = self._limiters(routing, method)
+        breaker = self._breaker(routing, method)
+        url = self.base_url.format(routing=routing) + path
+        endpoint = f'{routing} {method}'
+        stats = self.metrics
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt: stats.count('retries')
+            wait = breaker.wait_time(time.monotonic())
+            if wait > 0:
+                stats.count('circuit_open')
+                raise CircuitOpenError(endpoint, wait)
+            # Meio-aberto: esta chamada é o teste. O teste é liberado em qualquer saída
+            # (429 do nosso limite, cancelamento...), senão o circuito fica aberto para sempre
+            probe = breaker.probing
+            try:
+                sent = await acquire(app, meth)
+                start = time.perf_counter()
+                try:
+                    resp = await self._send(url, params)
+                except (requests.ConnectionError, requests.Timeout):
+                    stats.count('network_errors')
+                    breaker.failure(time.monotonic())
+                    if attempt == MAX_RETRIES: raise
+                    await asyncio.sleep(backoff(attempt))
+                    continue
+                finally:
+                    stats.observe(endpoint, time.perf_counter() - start)
+                stats.count('requests')
+                h = resp.headers
+                app.update(h.get('X-App-Rate-Limit'), h.get('X-App-Rate-Limit-Count'), sent)
+                meth.update(h.get('X-Method-Rate-Limit'), h.get('X-Method-Rate-Limit-Count'), sent)
+
+                if resp.status_code in RETRY_STATUS:
+                    retry_after = parse_retry_after(h.get('Retry-After'))
+                    limit_type = h.get('X-Rate-Limit-Type')
+                    if resp.status_code == 429: stats.count(f"http_429_{limit_type or 'service'}")
+                    else: stats.count('http_5xx')
+                    if resp.status_code == 429 and limit_type in ('application', 'method'):
+                        # Estouro do nosso limite: o limitador segura (app = região toda, método = só o endpoint)
+                        (app if limit_type == 'application' else meth).block(retry_after if retry_after is not None else backoff(attempt))
+                        delay = 0
+                    else:
+                        # 5xx ou 429 do serviço: o endpoint está com problema, conta para o breaker
+                        breaker.failure(time.monotonic())
+                        delay = retry_after if retry_after is not None else backoff(attempt)
+                    if attempt < MAX_RETRIES:
+                        if delay: await asyncio.sleep(delay + random.uniform(0, 0.1 * delay))
+                        continue
+                    resp.raise_for_status()
+
+                breaker.success()
+                if resp.status_code == 404: return None
+                resp.raise_for_status()  # Outros 4xx (chave inválida etc.) não adianta repetir
+                return resp.content if raw else resp.json()
+            finally:
+                if probe: breaker.release()
+
+    # --- ENDPOINTS USADOS PELOS SCRIPTS ---
+    async def masters_by_queue(self, platform, queue):
+        return await self.get(platform, 'league.masters', f'/lol/league/v4/masterleagues/by-queue/{queue}')
+
+    async def summoner_by_id(self, platform, summoner_id):
+        return await self.get(platform, 'summoner.by_id', f'/lol/summoner/v4/summoners/{summoner_id}')
+
+    async def account_by_riot_id(self, region, game_name, tag_line):
+        path = f"/riot/account/v1/accounts/by-riot-id/{quote(game_name, safe='')}/{quote(tag_line, safe='')}"
+        return await self.get(region, 'account.by_riot_id', path)
+
+    async def matchlist_by_puuid(self, platform, puuid, **params):
+        region = PLATFORM_TO_REGION.get(platform, platform)
+        return await self.get(region, 'match.ids_by_puuid', f'/lol/match/v5/matches/by-puuid/{puuid}/ids', params)
+
+    async def match_by_id(self, platform, match_id, raw=False):
+        region = PLATFORM_TO_REGION.get(platform, platform)
+        return await self.get(region, 'match.by_id', f'/lol/match/v5/matches/{match_id}', raw=raw)
+
+    async def timeline_by_match(self, platform, match_id, raw=False):
+        region = PLATFORM_TO_REGION.get(platform, platform)
+        return await self.get(region, 'match.timeline', f'/lol/match/v5/matches/{match_id}/timeline', raw=raw)
+
+    async def fetch_match(self, platform, match_id):
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, match_id, True)
+            if cached:
+                self.metrics.count('cache_hits')
+                return cached
+
+        # Partida e timeline em paralelo, como bytes: o cache guarda o corpo original e a
+        # timeline é decodificada já enxuta (timeline_decode.py)
+        match_raw, timeline_raw = await asyncio.gather(
+            self.match_by_id(platform, match_id, raw=True), self.timeline_by_match(platform, match_id, raw=True))
+        if match_raw is None or timeline_raw is None:
+            raise LookupError(f'partida {match_id} não encontrada')
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put_raw, match_id, match_raw, timeline_raw)
+        return await asyncio.to_thread(self.metrics.call, 'decode', decode_match, match_raw, timeline_raw)
+
+    async def iter_matches(self, platform, match_ids, concurrency=None):
+        # Mantém até 'concurrency' partidas em voo e entrega na ordem em que terminam:
+        # (match_id, match, timeline, erro)
+        sem = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def one(m_id):
+            async with sem:
+                try:
+                    match, timeline = await self.fetch_match(platform, m_id)
+                    return m_id, match, timeline, None
+                except Exception as err:
+                    return m_id, None, None, err
+
+        tasks = [asyncio.ensure_future(one(m_id)) for m_id in match_ids]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks: t.cancel()
@@ -0,0 +1,125 @@
+import os
+import sys
+import pandas as pd
+from sqlalchemy import text
+from db_sink import copy_to_staging, qi
+from features import DIFF_MINUTES
+from row_batch import RowBatch, as_float
+
+# --- ROLLUPS DE CONFRONTO (PATCH x ROTA x CAMPEÃO x INIMIGO) ---
+# Os painéis agregam 'partidas' por Patch/Champion/Enemy Champion (win rate, média de
+# Gold Diff 14'...) e cada consulta varria a tabela inteira. Aqui o write_batch atualiza,
+# na mesma transação do lote, uma tabela pequena com contagem, soma e soma dos
+# quadrados de cada métrica por confronto:
+#   matchup_rollup (source, patch, role, champion, enemy_champion, metric, n, total, total_sq)
+# Média e desvio padrão saem da view matchup_stats. Só entram partidas que o lote
+# registrou agora no índice de processadas, então regravar um lote não soma duas vezes.
+# Para popular a partir do histórico (uma vez): python rollups.py rebuild partidas
+
+ROLLUP_TABLE = 'matchup_rollup'
+STATS_VIEW = 'matchup_stats'
+GROUP_COLUMNS = ['Patch', 'Role', 'Champion', 'Enemy Champion']
+BASE_METRICS = ['Win Rate %', 'KDA', 'Kill Participation', 'Farm/Min', 'Damage/Min', 'Gold/Min', 'Vision Score/Min']
+ROLLUP_METRICS = BASE_METRICS + [f"{m} {t}'" for t in DIFF_MINUTES for m in ('Gold Diff', 'CS Diff', 'XP Diff')]
+ROLLUP_COLUMNS = ['source', 'patch', 'role', 'champion', 'enemy_champion', 'metric', 'n', 'total', 'total_sq']
+
+
+def aggregate(batch, source, metrics=ROLLUP_METRICS):
+    # Linhas do lote -> uma linha por (confronto, métrica) com n / soma / soma dos quadrados
+    present = [(m, batch.index[m]) for m in metrics if m in batch.index]
+    if batch.empty or not present: return RowBatch(ROLLUP_COLUMNS)
+    # Histórico antigo não tem Role: vira '' (a chave não aceita nulo)
+    group_idx = [batch.index.get(c) for c in GROUP_COLUMNS]
+
+    acc = {}
+    for r in batch.rows:
+        group = tuple('' if i is None or r[i] is None else str(r[i]) for i in group_idx)
+        for metric, i in present:
+            v = as_float(r[i])
+            if v is None: continue
+            cell = acc.get(group + (metric,))
+            if cell is None: acc[group + (metric,)] = [1, v, v * v]
+            else:
+                cell[0] += 1; cell[1] += v; cell[2] += v * v
+    return RowBatch(ROLLUP_COLUMNS, [(source,) + key + tuple(cell) for key, cell in acc.items()])
+
+
+class MatchupRollup:
+    def __init__(self, table=ROLLUP_TABLE, metrics=ROLLUP_METRICS):
+        self.table = table
+        self.metrics = metrics
+
+    def ensure(self, conn):
+        # Uma vez por execução (DbSink.prepare, rebuild): update() só faz o upsert, sem DDL
+        # nem lock da view dentro da transação de cada lote
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                source TEXT NOT NULL,
+                patch TEXT NOT NULL,
+                role TEXT NOT NULL,
+                champion TEXT NOT NULL,
+                enemy_champion TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                n BIGINT NOT NULL,
+                total DOUBLE PRECISION NOT NULL,
+                total_sq DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (source, patch, role, champion, enemy_champion, metric)
+            )'''))
+        # SQLite local: só a tabela (a view usa SQRT/GREATEST do Postgres)
+        if conn.dialect.name != 'postgresql': return
+        # Variância amostral pela fórmula das somas (n, Σx, Σx²)
+        conn.execute(text(f'''
+            CREATE OR REPLACE VIEW {STATS_VIEW} AS
+            SELECT source, patch, role, champion, enemy_champion, metric, n,
+                   total / n AS avg,
+                   CASE WHEN n > 1 THEN SQRT(GREATEST((total_sq - total * total / n) / (n - 1), 0)) END AS stddev
+            FROM {self.table}'''))
+
+    def update(self, conn, batch, source):
+        agg = aggregate(batch, source, self.metrics)
+        if agg.empty: return 0
+        cols = agg.columns
+        merge = (f'ON CONFLICT (source, patch, role, champion, enemy_champion, metric) DO UPDATE SET '
+                 f'n = {self.table}.n + EXCLUDED.n, total = {self.table}.total + EXCLUDED.total, '
+                 f'total_sq = {self.table}.total_sq + EXCLUDED.total_sq')
+        if conn.dialect.name == 'postgresql':
+            # Duas regiões no mesmo processo atualizam a mesma tabela: uma de cada vez
+            conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:t))'), {'t': self.table})
+            staging = f'_stage_{self.table}'
+            copy_to_staging(conn, agg, staging)
+            conn.execute(text(
+                f'INSERT INTO {self.table} ({", ".join(cols)}) '
+                f'SELECT source, patch, role, champion, enemy_champion, metric, CAST(n AS BIGINT), '
+                f'CAST(total AS DOUBLE PRECISION), CAST(total_sq AS DOUBLE PRECISION) FROM {qi(staging)} {merge}'))
+            conn.execute(text(f'DROP TABLE IF EXISTS {qi(staging)}'))
+        else:
+            conn.execute(text(f'INSERT INTO {self.table} ({", ".join(cols)}) VALUES ({", ".join(":" + c for c in cols)}) {merge}'),
+                         [dict(zip(cols, r)) for r in agg.rows])
+        return len(agg)
+
+    def rebuild(self, engine, source, chunksize=20000):
+        # Recalcula os rollups de uma tabela inteira (uma vez, para o histórico, com a
+        # coleta parada: o que for gravado durante o rebuild seria contado duas vezes)
+        with engine.begin() as conn:
+            self.ensure(conn)
+            conn.execute(text(f'DELETE FROM {self.table} WHERE source = :s'), {'s': source})
+        with engine.connect() as conn:
+            cols = pd.read_sql(text(f'SELECT * FROM {qi(source)} LIMIT 0'), conn).columns
+        wanted = [c for c in GROUP_COLUMNS + self.metrics if c in cols]
+        total = 0
+        query = f'SELECT {", ".join(qi(c) for c in wanted)} FROM {qi(source)}'
+        for chunk in pd.read_sql(text(query), engine, chunksize=chunksize):
+            with engine.begin() as conn:
+                self.update(conn, RowBatch.from_frame(chunk), source)
+            total += len(chunk)
+            print(f" > {total} linhas agregadas.")
+        return total
+
+
+if __name__ == "__main__":
+    # python rollups.py rebuild partidas
+    if len(sys.argv) < 3 or sys.argv[1] != 'rebuild':
+        print("Uso: python rollups.py rebuild <tabela>")
+        sys.exit(1)
+    from sqlalchemy import create_engine
+    MatchupRollup().rebuild(create_engine(os.environ["DB_URL"]), sys.argv[2])
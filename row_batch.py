@@ -0,0 +1,79 @@
+import csv
+
+# --- LOTE DE LINHAS COM SCHEMA FIXO ---
+# process_match_* devolvia um dict com ~120 chaves por jogador (as chaves "Gold Diff 14'"
+# remontadas a cada linha) e o lote só virava DataFrame na hora de gravar. Agora a
+# ordem das colunas é definida uma vez (features.KR_COLUMNS / BR_COLUMNS) e cada
+# linha é uma tupla nessa ordem. RowBatch junta as duas coisas e é o que os sinks
+# recebem: COPY, SQLite, Parquet e os agregados leem as tuplas direto, sem DataFrame
+# intermediário.
+
+# Tipo de cada coluna pelo nome, o mesmo no banco (db_sink.py) e no Parquet (archive.py):
+# colunas vindas de divisões/médias (safe_div, estimativas) são float; o resto dos
+# números é contagem/ouro/xp -> inteiro. Pelo nome, e não pelos valores de um lote, o
+# tipo não muda conforme o primeiro lote (ex: "KDA" só com valores inteiros).
+FLOAT_MARKERS = ('KDA', '/Min', '%', 'Participation', 'GPM', 'DPM', 'Gold Share', 'Gold Eff', 'DMG Diff', 'VPM', 'Duration')
+STRING_COLUMNS = {'Match ID', 'Patch', 'Champion', 'Enemy Champion', 'Role', 'Player Name', 'PUUID', 'Region', 'Date'}
+
+
+def column_kind(name):
+    # 'str', 'float' ou 'int'
+    if name in STRING_COLUMNS: return 'str'
+    if any(m in name for m in FLOAT_MARKERS): return 'float'
+    return 'int'
+
+
+class RowBatch:
+    def __init__(self, columns, rows=()):
+        self.columns = list(columns)
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def column(self, name):
+        i = self.index[name]
+        return [r[i] for r in self.rows]
+
+    def where(self, column, values):
+        # Só as linhas em que 'column' está em 'values'
+        i = self.index[column]
+        return RowBatch(self.columns, [r for r in self.rows if str(r[i]) in values])
+
+    def write_csv(self, buf):
+        # None vira campo vazio (NULL no COPY ... FORMAT csv)
+        csv.writer(buf, lineterminator='\n').writerows(self.rows)
+
+    def to_frame(self):
+        # Só para consulta/depuração; a gravação não passa por aqui
+        import pandas as pd
+        return pd.DataFrame.from_records(self.rows, columns=self.columns)
+
+    @classmethod
+    def from_frame(cls, df):
+        # DataFrame (CSV antigo, leitura do banco) -> lote, com NaN virando None
+        df = df.astype(object).where(df.notna(), None)
+        return cls(df.columns, list(df.itertuples(index=False, name=None)))
+
+
+def as_float(value):
+    # Valor numérico da célula ou None (vazio, NaN, texto)
+    if value is None: return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+
+def as_int(value):
+    # Valor de coluna inteira ou None: 12.0 -> 12. Valor com fração é erro, não arredonda.
+    number = as_float(value)
+    if number is None: return None
+    if not number.is_integer(): raise ValueError(f'{value!r} não é inteiro')
+    return int(number)
@@ -0,0 +1,245 @@
+import math
+import os
+import struct
+import sys
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from db_sink import copy_to_staging, qi
+from features import DIFF_MINUTES
+from row_batch import RowBatch, as_float
+
+# --- SKETCHES DE QUANTIL (PERCENTIS POR CAMPEÃO / ROTA / MINUTO) ---
+# "O CS aos 12 deste jogador é p80 para Karthus jungle no 16.1" exigia puxar todas as
+# linhas do Postgres. Aqui cada (source, patch, role, champion, metric) tem um t-digest:
+# um resumo de tamanho fixo (~delta centróides) que aceita valores novos, junta com
+# outro digest (merge) e responde quantil / percentil com erro pequeno, ainda menor
+# nas pontas. Os digests são atualizados pelo write_batch na mesma transação do lote
+# (como os rollups) e ficam na tabela quantile_sketches em binário compacto.
+# Histórico já gravado (ou digest corrompido): rebuild relê a tabela de dados inteira.
+#
+#   python sketches.py rank partidas 16.1 JUNGLE Karthus "CS 12'" 95
+#   python sketches.py rebuild partidas
+
+SKETCH_TABLE = 'quantile_sketches'
+DELTA = 100
+# Os campos soltos "CS/Gold/XP aos 12 min" repetem "CS 12'" etc. quando 12 está na grade
+SKETCH_METRICS = [f"{m} {t}'" for t in DIFF_MINUTES for m in ('CS', 'Gold Earned', 'XP', 'CS Diff', 'Gold Diff', 'XP Diff')]
+KEY_COLUMNS = ['Patch', 'Role', 'Champion']
+
+
+class TDigest:
+    # t-digest com fusão (merging digest) e função de escala k1 (arcsin)
+    HEADER = struct.Struct('<HIdd')  # delta, nº de centróides, min, max
+
+    def __init__(self, delta=DELTA, means=(), weights=(), vmin=math.inf, vmax=-math.inf):
+        self.delta = delta
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.min = vmin
+        self.max = vmax
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values): return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self._absorb(values, np.ones(len(values)))
+
+    def merge(self, other):
+        if not len(other.means): return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self._absorb(other.means, other.weights)
+
+    def _absorb(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='mergesort')
+        self.means, self.weights = means[order], weights[order]
+        if len(self.means) > self.delta: self._compress()
+        return self
+
+    def _compress(self):
+        # Junta centróides vizinhos enquanto cabem no mesmo intervalo de k(q)
+        total = self.weights.sum()
+        k = lambda q: self.delta / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+        out_m, out_w = [self.means[0]], [self.weights[0]]
+        done = 0.0  # peso dos centróides já fechados
+        k_low = k(0.0)
+        for m, w in zip(self.means[1:], self.weights[1:]):
+            if k((done + out_w[-1] + w) / total) - k_low <= 1:
+                nw = out_w[-1] + w
+                out_m[-1] += (m - out_m[-1]) * w / nw
+                out_w[-1] = nw
+            else:
+                done += out_w[-1]
+                k_low = k(done / total)
+                out_m.append(m); out_w.append(w)
+        self.means, self.weights = np.array(out_m), np.array(out_w)
+
+    def _centers(self):
+        # Posição acumulada (em peso) do centro de cada centróide, com min/max nas pontas
+        cum = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[self.min], self.means, [self.max]])
+        ws = np.concatenate([[0.0], cum, [self.count]])
+        return xs, ws
+
+    def quantile(self, q):
+        if not len(self.means): return math.nan
+        xs, ws = self._centers()
+        return float(np.interp(q * self.count, ws, xs))
+
+    def cdf(self, x):
+        # Fração dos valores <= x (0..1): o "percentil" de um valor
+        if not len(self.means): return math.nan
+        if x < self.min: return 0.0
+        if x >= self.max: return 1.0
+        xs, ws = self._centers()
+        return float(np.interp(x, xs, ws) / self.count)
+
+    def to_bytes(self):
+        return (self.HEADER.pack(self.delta, len(self.means), self.min, self.max)
+                + self.means.astype('<f8').tobytes() + self.weights.astype('<f4').tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        delta, n, vmin, vmax = cls.HEADER.unpack_from(data)
+        off = cls.HEADER.size
+        means = np.frombuffer(data, dtype='<f8', count=n, offset=off)
+        weights = np.frombuffer(data, dtype='<f4', count=n, offset=off + 8 * n).astype(np.float64)
+        return cls(delta, means.copy(), weights, vmin, vmax)
+
+
+class QuantileSketches:
+    # Agregado do write_batch (mesma interface do MatchupRollup: update(conn, batch, source))
+    def __init__(self, table=SKETCH_TABLE, metrics=SKETCH_METRICS, delta=DELTA):
+        self.table = table
+        self.metrics = metrics
+        self.delta = delta
+
+    def ensure(self, conn):
+        # Uma vez por execução (DbSink.prepare), como o MatchupRollup.ensure
+        blob = 'BYTEA' if conn.dialect.name == 'postgresql' else 'BLOB'
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                source TEXT NOT NULL,
+                patch TEXT NOT NULL,
+                role TEXT NOT NULL,
+                champion TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                n BIGINT NOT NULL,
+                sketch {blob} NOT NULL,
+                PRIMARY KEY (source, patch, role, champion, metric)
+            )'''))
+
+    def _load(self, conn, source, patches, champions):
+        # Digests existentes que podem ser afetados pelo lote (superconjunto por patch/campeão)
+        query = text(f'SELECT patch, role, champion, metric, sketch FROM {self.table} '
+                     'WHERE source = :s AND patch IN :p AND champion IN :c').bindparams(
+            bindparam('p', expanding=True), bindparam('c', expanding=True))
+        rows = conn.execute(query, {'s': source, 'p': list(patches), 'c': list(champions)})
+        return {(p, r, c, m): TDigest.from_bytes(b) for p, r, c, m, b in rows}
+
+    def update(self, conn, batch, source):
+        present = [(m, batch.index[m]) for m in self.metrics if m in batch.index]
+        if batch.empty or not present: return 0
+        # Valores de cada métrica por (patch, rota, campeão); sem a coluna = ''
+        key_idx = [batch.index.get(c) for c in KEY_COLUMNS]
+        groups = {}
+        for r in batch.rows:
+            key = tuple('' if i is None or r[i] is None else str(r[i]) for i in key_idx)
+            values = groups.get(key)
+            if values is None: values = groups[key] = {m: [] for m, _ in present}
+            for m, i in present:
+                v = as_float(r[i])
+                if v is not None: values[m].append(v)
+
+        if conn.dialect.name == 'postgresql':
+            # Leitura + regravação dos digests: uma transação de cada vez
+            conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:t))'), {'t': self.table})
+        current = self._load(conn, source, {k[0] for k in groups}, {k[2] for k in groups})
+
+        out = []
+        for (patch, role, champ), values in groups.items():
+            for metric, vals in values.items():
+                if not vals: continue
+                key = (patch, role, champ, metric)
+                digest = current.get(key) or TDigest(self.delta)
+                digest.update(vals)
+                out.append((source, patch, role, champ, metric, int(round(digest.count)), digest.to_bytes()))
+        if not out: return 0
+
+        merge = 'ON CONFLICT (source, patch, role, champion, metric) DO UPDATE SET n = EXCLUDED.n, sketch = EXCLUDED.sketch'
+        cols = ['source', 'patch', 'role', 'champion', 'metric', 'n', 'sketch']
+        if conn.dialect.name == 'postgresql':
+            staging = f'_stage_{self.table}'
+            copy_to_staging(conn, RowBatch(cols, [r[:-1] + (r[-1].hex(),) for r in out]), staging)
+            conn.execute(text(
+                f'INSERT INTO {self.table} ({", ".join(cols)}) '
+                f"SELECT source, patch, role, champion, metric, CAST(n AS BIGINT), decode(sketch, 'hex') FROM {qi(staging)} {merge}"))
+            conn.execute(text(f'DROP TABLE IF EXISTS {qi(staging)}'))
+        else:
+            conn.execute(text(f'INSERT INTO {self.table} ({", ".join(cols)}) VALUES ({", ".join(":" + c for c in cols)}) {merge}'),
+                         [dict(zip(cols, r)) for r in out])
+        return len(out)
+
+    def rebuild(self, engine, source, chunksize=20000):
+        # Refaz os digests de uma tabela inteira a partir das linhas gravadas (como o
+        # MatchupRollup.rebuild: com a coleta parada, senão o lote gravado durante o
+        # rebuild entra duas vezes)
+        with engine.begin() as conn:
+            self.ensure(conn)
+            conn.execute(text(f'DELETE FROM {self.table} WHERE source = :s'), {'s': source})
+        with engine.connect() as conn:
+            cols = pd.read_sql(text(f'SELECT * FROM {qi(source)} LIMIT 0'), conn).columns
+        wanted = [c for c in KEY_COLUMNS + self.metrics if c in cols]
+        if not any(m in cols for m in self.metrics): return 0
+        total = 0
+        query = f'SELECT {", ".join(qi(c) for c in wanted)} FROM {qi(source)}'
+        for chunk in pd.read_sql(text(query), engine, chunksize=chunksize):
+            with engine.begin() as conn:
+                self.update(conn, RowBatch.from_frame(chunk), source)
+            total += len(chunk)
+            print(f" > {total} linhas resumidas.")
+        return total
+
+
+def load_sketch(engine, source, patch, role, champion, metric, table=SKETCH_TABLE):
+    with engine.connect() as conn:
+        row = conn.execute(text(f'SELECT sketch FROM {table} WHERE source = :s AND patch = :p AND role = :r '
+                                'AND champion = :c AND metric = :m'),
+                           {'s': source, 'p': patch, 'r': role, 'c': champion, 'm': metric}).first()
+    return TDigest.from_bytes(row[0]) if row else None
+
+
+def percentile_rank(engine, source, patch, role, champion, metric, value):
+    # 0..100 ou None se não houver digest para a chave
+    digest = load_sketch(engine, source, patch, role, champion, metric)
+    return None if digest is None else round(100 * digest.cdf(value), 1)
+
+
+if __name__ == "__main__":
+    # python sketches.py rank <tabela> <patch> <rota> <campeão> <métrica> <valor>
+    # python sketches.py rebuild <tabela>
+    from sqlalchemy import create_engine
+    if len(sys.argv) == 3 and sys.argv[1] == 'rebuild':
+        QuantileSketches().rebuild(create_engine(os.environ["DB_URL"]), sys.argv[2])
+        sys.exit(0)
+    if len(sys.argv) < 8 or sys.argv[1] != 'rank':
+        print("Uso: python sketches.py rank partidas 16.1 JUNGLE Karthus \"CS 12'\" 95")
+        print("     python sketches.py rebuild partidas")
+        sys.exit(1)
+    _, _, source, patch, role, champion, metric, value = sys.argv[:8]
+    digest = load_sketch(create_engine(os.environ["DB_URL"]), source, patch, role, champion, metric)
+    if digest is None:
+        print("Sem dados para essa combinação.")
+        sys.exit(1)
+    print(f"{metric} = {value}: p{100 * digest.cdf(float(value)):.0f} "
+          f"(n={digest.count:.0f}, p25={digest.quantile(0.25):.1f}, p50={digest.quantile(0.5):.1f}, p75={digest.quantile(0.75):.1f})")
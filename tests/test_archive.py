@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from archive import compact_archive, read_archive, to_arrow, write_archive
+from row_batch import RowBatch
+
+DAY = 1767225600000  # 2026-01-01 00:00 UTC
+COLUMNS = ['Match ID', 'Patch', 'Champion', 'Game Start Time', 'Kills', 'KDA']
+
+
+def batch(ids, columns=COLUMNS, extra=()):
+    return RowBatch(columns, [(f'KR_{i}', '16.1', 'Ahri', DAY + i, i, i / 2) + tuple(extra) for i in ids])
+
+
+def parquet_files(root):
+    return sorted(os.path.join(d, f) for d, _, files in os.walk(root) for f in files if f.endswith('.parquet'))
+
+
+def test_compaction_leaves_one_file_per_partition(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_archive(batch([1, 2]), 'kr', root)
+    write_archive(batch([3]), 'kr', root)
+    write_archive(batch([4], COLUMNS + ["Gold Diff 20'"], extra=(150,)), 'kr', root)  # coluna nova
+    assert len(parquet_files(root)) == 3
+
+    assert compact_archive('kr', {'2026-01-01'}, root) == 1
+    assert len(parquet_files(root)) == 1
+    df = read_archive(root=root).sort_values('Match ID')
+    assert list(df['Match ID']) == ['KR_1', 'KR_2', 'KR_3', 'KR_4']
+    assert df["Gold Diff 20'"].isna().sum() == 3
+    # Partição com um arquivo só não é reescrita
+    assert compact_archive(root=root) == 0
+
+
+def test_compaction_interrupted_does_not_duplicate(tmp_path):
+    root = str(tmp_path / 'archive')
+    write_archive(batch([1]), 'kr', root)
+    write_archive(batch([2]), 'kr', root)
+    old = parquet_files(root)
+    saved = [f + '.bak' for f in old]
+    for f, s in zip(old, saved): shutil.copy(f, s)
+    compact_archive(root=root)
+    # Queda entre gravar o compactado e apagar os antigos: antigos voltam ao lado dele
+    for f, s in zip(old, saved): os.replace(s, f)
+    assert len(parquet_files(root)) == 3
+
+    compact_archive(root=root)
+    assert sorted(read_archive(root=root)['Match ID']) == ['KR_1', 'KR_2']
+
+
+def test_fraction_in_integer_column_raises():
+    to_arrow(RowBatch(['Kills'], [(3.0,), (None,)]))
+    with pytest.raises(ValueError, match='Kills'):
+        to_arrow(RowBatch(['Kills'], [(2.5,)]))
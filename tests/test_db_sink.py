@@ -0,0 +1,100 @@
+import contextlib
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db_sink
+from db_sink import copy_upsert
+from row_batch import RowBatch
+
+COLUMNS = ['Match ID', 'Champion', 'Kills', 'KDA', "Gold Share 14'", 'Game Start Time']
+# Primeiro lote com KDA e Gold Share só com valores inteiros
+BATCH = RowBatch(COLUMNS, [('KR_1', 'Ahri', 3, 4, 0, 1700000000000), ('KR_1', 'Azir', 1, 2, 1, 1700000000000)])
+
+
+class FakeResult:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConn:
+    # Só registra o SQL; information_schema e pg_indexes respondem com o estado dado
+    def __init__(self, columns=None, has_index=True):
+        self.columns = dict(columns or {})
+        self.has_index = has_index
+        self.sql = []
+        self.engine = SimpleNamespace(url='postgresql://teste')
+        cursor = SimpleNamespace(copy_expert=lambda sql, buf: self.sql.append(sql), close=lambda: None)
+        self.connection = SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=lambda: cursor))
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.sql.append(sql)
+        if 'information_schema.columns' in sql: return FakeResult(self.columns.items())
+        if 'pg_indexes' in sql: return FakeResult([(1,)] if self.has_index else [])
+        return FakeResult()
+
+    def begin_nested(self):
+        return contextlib.nullcontext()
+
+    def find(self, prefix):
+        return [s for s in self.sql if s.startswith(prefix)]
+
+
+def test_new_table_types_come_from_column_names():
+    conn = FakeConn()
+    copy_upsert(conn, BATCH, 'partidas')
+    create, = conn.find('CREATE TABLE "partidas"')
+    assert '"Match ID" TEXT' in create and '"Champion" TEXT' in create
+    assert '"Kills" BIGINT' in create and '"Game Start Time" BIGINT' in create
+    assert '"KDA" DOUBLE PRECISION' in create and '"Gold Share 14\'" DOUBLE PRECISION' in create
+
+
+def test_float_column_created_as_integer_is_widened():
+    columns = {c: 'text' if c in ('Match ID', 'Champion') else 'bigint' for c in COLUMNS}
+    conn = FakeConn(columns)
+    copy_upsert(conn, BATCH, 'partidas')
+    altered = conn.find('ALTER TABLE')
+    assert altered == ['ALTER TABLE "partidas" ALTER COLUMN "KDA" TYPE DOUBLE PRECISION',
+                       'ALTER TABLE "partidas" ALTER COLUMN "Gold Share 14\'" TYPE DOUBLE PRECISION']
+
+
+def test_upsert_sql_casts_and_conflict_key():
+    columns = {'Match ID': 'text', 'Champion': 'text', 'Kills': 'bigint', 'KDA': 'double precision',
+               "Gold Share 14'": 'double precision', 'Game Start Time': 'bigint'}
+    conn = FakeConn(columns)
+    copy_upsert(conn, BATCH, 'partidas')
+    insert, = conn.find('INSERT INTO "partidas"')
+    assert 'CAST(CAST(s."Kills" AS NUMERIC) AS BIGINT)' in insert
+    assert 'CAST(s."KDA" AS DOUBLE PRECISION)' in insert
+    assert 'SELECT DISTINCT ON (s."Match ID", s."Champion")' in insert
+    assert insert.endswith('ON CONFLICT ("Match ID", "Champion") DO UPDATE SET "Kills" = EXCLUDED."Kills", '
+                           '"KDA" = EXCLUDED."KDA", "Gold Share 14\'" = EXCLUDED."Gold Share 14\'", '
+                           '"Game Start Time" = EXCLUDED."Game Start Time"')
+    assert conn.find('COPY "_stage_partidas"')
+
+
+def test_upsert_without_unique_index_uses_not_exists(monkeypatch):
+    monkeypatch.setattr(db_sink, '_NO_UNIQUE_INDEX', {('postgresql://teste', 'partidas')})
+    conn = FakeConn({c: 'text' for c in COLUMNS}, has_index=False)
+    copy_upsert(conn, BATCH, 'partidas')
+    insert, = conn.find('INSERT INTO "partidas"')
+    assert 'ON CONFLICT' not in insert
+    assert 'WHERE NOT EXISTS (SELECT 1 FROM "partidas" t WHERE t."Match ID" = CAST(s."Match ID" AS TEXT) ' \
+           'AND t."Champion" = CAST(s."Champion" AS TEXT))' in insert
+
+
+def test_fraction_in_integer_column_is_an_error():
+    conn = FakeConn({'Match ID': 'text', 'Champion': 'text', 'Kills': 'bigint'})
+    with pytest.raises(ValueError):
+        copy_upsert(conn, RowBatch(['Match ID', 'Champion', 'Kills'], [('KR_1', 'Ahri', 2.5)]), 'partidas')
+    assert not conn.find('INSERT INTO')
@@ -0,0 +1,66 @@
+import os
+import sys
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dedupe import INDEX_TABLE, BloomFilter, ProcessedIndex
+
+
+def make_index(tmp_path, use_bloom=True):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE partidas ("Match ID" TEXT, "Participant ID" INTEGER)'))
+        conn.execute(text('INSERT INTO partidas VALUES (:m, :p)'),
+                     [{'m': f'KR_{i}', 'p': p} for i in range(3) for p in range(1, 11)])
+    index = ProcessedIndex(engine, 'partidas', use_bloom=use_bloom, bloom_path=str(tmp_path / 'p.bloom'))
+    return engine, index.ensure()
+
+
+def test_ensure_populates_from_data_table(tmp_path):
+    engine, index = make_index(tmp_path)
+    with engine.connect() as conn:
+        ids = sorted(r[0] for r in conn.execute(text(f'SELECT match_id FROM {INDEX_TABLE}')))
+    assert ids == ['KR_0', 'KR_1', 'KR_2']
+    assert index.bloom.count == 3
+    # Segunda execução não duplica
+    index.ensure()
+    with engine.connect() as conn:
+        assert conn.execute(text(f'SELECT COUNT(*) FROM {INDEX_TABLE}')).scalar() == 3
+
+
+def test_filter_new_and_mark(tmp_path):
+    _, index = make_index(tmp_path)
+    assert index.filter_new(['KR_9', 'KR_1', 'KR_9', 'KR_5']) == ['KR_9', 'KR_5']
+    assert index.mark(['KR_9', 'KR_1']) == {'KR_9'}
+    assert index.filter_new(['KR_9', 'KR_5']) == ['KR_5']
+    assert 'KR_9' in index.bloom
+    assert index.mark([]) == set()
+
+
+def test_filter_new_without_bloom(tmp_path):
+    _, index = make_index(tmp_path, use_bloom=False)
+    assert index.bloom is None
+    assert index.filter_new(['KR_0', 'KR_7']) == ['KR_7']
+
+
+def test_incremental_sync_sees_late_commit_without_double_count(tmp_path):
+    engine, index = make_index(tmp_path)
+    index.mark(['KR_3'])
+    with engine.begin() as conn:
+        last = conn.execute(text(f'SELECT MAX(processed_at) FROM {INDEX_TABLE}')).scalar()
+        # Outra transação inseriu antes da marca d'água mas só confirmou depois da sincronização
+        conn.execute(text(f"INSERT INTO {INDEX_TABLE} (source, match_id, processed_at) "
+                          f"VALUES ('partidas', 'KR_late', datetime(:t, '-2 minutes'))"), {'t': last})
+    again = ProcessedIndex(engine, 'partidas', bloom_path=index.bloom_path).ensure()
+    assert 'KR_late' in again.bloom
+    # Releitura da sobreposição não infla a contagem
+    assert again.bloom.count == 5
+    assert ProcessedIndex(engine, 'partidas', bloom_path=index.bloom_path).ensure().bloom.count == 5
+
+
+def test_bloom_add_counts_only_new_keys():
+    bloom = BloomFilter(100)
+    assert bloom.add('KR_1') and not bloom.add('KR_1')
+    assert bloom.count == 1
+    assert 'KR_1' in bloom and 'KR_2' not in bloom
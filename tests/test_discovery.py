@@ -0,0 +1,159 @@
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from discovery import MAX_PAGES, OVERLAP, PAGE_SIZE, PLAYER_TTL, PLAYERS_TABLE, Discovery, PlayerQueue
+from mock_riot import MockRiot, World
+
+PUUID = 'mock-kr-000001'
+
+
+class MockClient:
+    # Só os endpoints da descoberta, respondidos direto pelo simulador (sem HTTP)
+    def __init__(self, mock):
+        self.mock = mock
+        self.requests = []
+
+    async def matchlist_by_puuid(self, platform, puuid, **params):
+        self.requests.append(params)
+        return self.mock.match_ids(puuid, params)
+
+    async def summoner_by_id(self, platform, summoner_id):
+        return self.mock.summoner(platform, summoner_id)
+
+
+def make_discovery(n_matches, since, engine=None, first_count=20):
+    # n_matches partidas de PUUID, uma por minuto a partir de 'since' (epoch em s)
+    world = World('kr')
+    world.players = [PUUID]
+    for i in range(n_matches):
+        world.add_match(f'KR_{i}', (since + 60 * i) * 1000, [PUUID])
+    world.finish()
+    mock = MockRiot()
+    mock.worlds['kr'] = world
+    client = MockClient(mock)
+    return Discovery(engine, client, 'partidas', 'kr', first_count=first_count), client
+
+
+def test_match_ids_new_player_gets_last_first_count():
+    discovery, client = make_discovery(50, int(time.time()) - 86400)
+    ids = asyncio.run(discovery.match_ids(PUUID))
+    assert ids == [f'KR_{i}' for i in range(49, 29, -1)]
+    assert client.requests == [{'count': 20}]
+    assert discovery.calls == 1
+
+
+def test_match_ids_pages_until_short_page():
+    last = int(time.time()) - 86400
+    # Partidas antes da marca (com a sobreposição) não voltam
+    discovery, client = make_discovery(250 + 10, last - OVERLAP - 600)
+    discovery._row(PUUID)['last_checked'] = last
+    ids = asyncio.run(discovery.match_ids(PUUID))
+    assert len(ids) == 250 and ids[0] == 'KR_259' and len(set(ids)) == 250
+    assert [r['start'] for r in client.requests] == [0, PAGE_SIZE, 2 * PAGE_SIZE]
+    assert {r['startTime'] for r in client.requests} == {last - OVERLAP}
+    assert discovery.pending[PUUID][1] == ids
+
+
+def test_match_ids_full_last_page_and_page_cap():
+    last = int(time.time()) - 86400
+    discovery, client = make_discovery(2 * PAGE_SIZE, last)
+    discovery._row(PUUID)['last_checked'] = last
+    assert len(asyncio.run(discovery.match_ids(PUUID))) == 2 * PAGE_SIZE
+    # Página cheia: precisa de mais uma (vazia) para saber que acabou
+    assert len(client.requests) == 3
+
+    discovery, client = make_discovery(MAX_PAGES * PAGE_SIZE + 50, last)
+    discovery._row(PUUID)['last_checked'] = last
+    assert len(asyncio.run(discovery.match_ids(PUUID))) == MAX_PAGES * PAGE_SIZE
+    assert len(client.requests) == MAX_PAGES
+
+
+def queue_discovery():
+    now = int(time.time())
+    discovery = Discovery(None, None, 'partidas', 'kr')
+    for puuid, activity, overlap in (('a', 10.0, 0.0), ('b', 2.0, 0.0), ('c', 10.0, 0.9)):
+        row = discovery._row(puuid)
+        row.update(last_checked=now - 86400, activity=activity, overlap=overlap)
+    discovery._row('s')['summoner_id'] = 'sid-s'
+    return discovery
+
+
+def test_player_queue_orders_by_expected_yield():
+    discovery = queue_discovery()
+    players = PlayerQueue(discovery)
+    # 'new' nunca consultado vale as first_count; só com summonerId desconhecido vale metade
+    for entry in ({'puuid': 'b'}, {'puuid': 'c'}, {'summonerId': 'sid-x'}, {'puuid': 'a'}, {'puuid': 'new'}):
+        players.push(entry)
+    players.push({'puuid': 'a'})
+    assert len(players) == 5
+    assert players.pop(10) == [{'puuid': 'new'}, {'puuid': 'a'}, {'summonerId': 'sid-x'}, {'puuid': 'b'}, {'puuid': 'c'}]
+
+
+def test_player_queue_rescores_after_harvest():
+    discovery = queue_discovery()
+    players = PlayerQueue(discovery)
+    for entry in ({'puuid': 'new'}, {'puuid': 'a'}, {'puuid': 'b'}):
+        players.push(entry)
+    # 'new' apareceu em 15 partidas já baixadas: sobra pouco de novo para ele
+    for _ in range(15):
+        discovery.harvest({'metadata': {'participants': ['new']}})
+    assert players.pop(3) == [{'puuid': 'a'}, {'puuid': 'new'}, {'puuid': 'b'}]
+
+
+def test_player_queue_knows_summoner_ids_of_loaded_players():
+    discovery = queue_discovery()
+    discovery._row('s').update(last_checked=int(time.time()) - 86400, activity=0.0, overlap=1.0)
+    players = PlayerQueue(discovery)
+    players.push({'summonerId': 'sid-s'})
+    players.push({'summonerId': 'sid-x'})
+    # 'sid-s' é o jogador 's' (parado, tudo conhecido), não um desconhecido
+    assert players.pop(2) == [{'summonerId': 'sid-x'}, {'summonerId': 'sid-s'}]
+
+
+def test_ensure_prunes_and_load_reads_only_requested(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    discovery = Discovery(engine, None, 'partidas', 'kr').ensure()
+    for puuid in ('p1', 'p2', 'old'):
+        discovery._row(puuid).update(last_checked=int(time.time()), activity=1.0)
+        discovery.dirty.add(puuid)
+    discovery._row('p2')['summoner_id'] = 'sid-p2'
+    assert discovery.commit() == 3
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {PLAYERS_TABLE} SET updated_at = :t WHERE puuid = 'old'"),
+                     {'t': int(time.time()) - PLAYER_TTL - 1})
+
+    discovery = Discovery(engine, None, 'partidas', 'kr').ensure()
+    assert discovery.players == {}
+    with engine.connect() as conn:
+        assert sorted(r[0] for r in conn.execute(text(f'SELECT puuid FROM {PLAYERS_TABLE}'))) == ['p1', 'p2']
+    assert discovery.load(puuids=['p1', 'old', 'missing']) == 1
+    assert set(discovery.players) == {'p1'}
+    # Linha já carregada não é relida (pode ter mudança não gravada)
+    discovery.players['p1']['activity'] = 5.0
+    assert discovery.load(puuids=['p1'], summoner_ids=['sid-p2']) == 1
+    assert discovery.players['p1']['activity'] == 5.0
+    assert discovery.players['p2']['summoner_id'] == 'sid-p2'
+
+
+def test_summoner_lookup_loads_existing_row(tmp_path):
+    # Jogador gravado antes só pelo PUUID (colhido): a marca d'água dele não se perde
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    last = int(time.time()) - 3600
+    discovery, _ = make_discovery(5, last, engine)
+    discovery.ensure()
+    discovery._row(PUUID)['last_checked'] = last
+    discovery.dirty.add(PUUID)
+    discovery.commit()
+
+    discovery, client = make_discovery(5, last, engine)
+    discovery.ensure()
+    assert asyncio.run(discovery.puuid_by_summoner(f'sid-{PUUID}')) == PUUID
+    assert discovery.players[PUUID]['last_checked'] == last
+    asyncio.run(discovery.match_ids(PUUID))
+    assert client.requests[0]['startTime'] == last - OVERLAP
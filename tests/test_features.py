@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import synthetic_match
+from features import Skipped, parse_minutes, process_match_br, process_match_kr
+
+
+def test_parse_minutes():
+    assert parse_minutes(None, [5, 12]) == [5, 12]
+    assert parse_minutes('14, 5,5,', []) == [5, 14]
+
+
+@pytest.mark.parametrize('value', ['', ' , ', '5,x', '0,10', '-5'])
+def test_parse_minutes_rejects_empty_or_invalid_grid(value):
+    with pytest.raises(ValueError):
+        parse_minutes(value, [5])
+
+
+@pytest.mark.parametrize('minutes, reason_kr, reason_br', [(2, 'remakes', 'remakes'), (10, 'short', None)])
+def test_skip_reason_by_duration(minutes, reason_kr, reason_br):
+    match, timeline = synthetic_match(1, minutes=minutes)
+    for process, reason in ((process_match_kr, reason_kr), (process_match_br, reason_br)):
+        rows = process('KR_1', match, timeline)
+        if reason is None:
+            assert len(rows) == 10 and not isinstance(rows, Skipped)
+        else:
+            assert rows == [] and rows.reason == reason
+
+
+def test_skip_reason_no_role():
+    match, timeline = synthetic_match(1, minutes=25)
+    for p in match['info']['participants']:
+        p['teamPosition'] = ''
+    for process in (process_match_kr, process_match_br):
+        rows = process('KR_1', match, timeline)
+        assert rows == [] and rows.reason == 'no_role'
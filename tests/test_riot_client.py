@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import riot_client
+from riot_client import CircuitBreaker, RiotClient
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None, body=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400: raise RuntimeError(f'HTTP {self.status_code}')
+
+
+def client_with(responses, monkeypatch):
+    # Cliente cujo _send devolve as respostas em sequência; breaker abre na 1ª falha, sem resfriamento
+    monkeypatch.setattr(riot_client, 'backoff', lambda attempt: 0)
+    client = RiotClient('chave')
+    client._breakers[('kr', 'teste')] = CircuitBreaker(threshold=1, cooldown=0)
+    pending = list(responses)
+
+    async def send(url, params):
+        item = pending.pop(0)
+        if callable(item): return await item()
+        return item
+
+    client._send = send
+    return client
+
+
+def test_probe_with_app_429_does_not_leave_circuit_stuck(monkeypatch):
+    app_429 = FakeResponse(429, {'X-Rate-Limit-Type': 'application', 'Retry-After': '0'})
+    client = client_with([FakeResponse(500), app_429, FakeResponse(200, body={'ok': 1})], monkeypatch)
+    # 500 abre o circuito, o teste leva 429 do nosso limite (sem veredito), o seguinte testa e fecha
+    assert asyncio.run(client.get('kr', 'teste', '/x')) == {'ok': 1}
+    breaker = client._breakers[('kr', 'teste')]
+    assert breaker.opened_at is None and not breaker.probing
+
+
+def test_cancelled_probe_releases_circuit(monkeypatch):
+    async def hang():
+        await asyncio.sleep(60)
+
+    client = client_with([FakeResponse(500), hang, FakeResponse(200, body={'ok': 2})], monkeypatch)
+    breaker = client._breakers[('kr', 'teste')]
+
+    async def scenario():
+        task = asyncio.create_task(client.get('kr', 'teste', '/x'))
+        while not breaker.probing: await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError): await task
+        assert not breaker.probing
+        return await client.get('kr', 'teste', '/x')
+
+    assert asyncio.run(scenario()) == {'ok': 2}
+
+
+def test_open_circuit_refuses_while_probe_in_flight():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.failure(0.0)
+    assert breaker.wait_time(1.0) == 0.0  # este é o teste
+    assert breaker.wait_time(1.0) > 0     # outro não passa enquanto o teste está em voo
+    breaker.release()
+    assert breaker.wait_time(1.0) == 0.0
+
+
+class FakeClock:
+    # Relógio do riot_client + asyncio.sleep que só avança o relógio
+    def __init__(self, monkeypatch):
+        self.now = 100.0
+        real_sleep = asyncio.sleep
+
+        async def sleep(seconds):
+            self.now += seconds
+            await real_sleep(0)
+
+        monkeypatch.setattr(riot_client, 'time', self)
+        monkeypatch.setattr(riot_client.asyncio, 'sleep', sleep)
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+def test_full_window_waits_for_reset(monkeypatch):
+    # Servidor com janela fixa de 3 requisições a cada 10s (aberta na primeira que chega)
+    clock = FakeClock(monkeypatch)
+    client = RiotClient('chave')
+    sent = []
+    window = {'start': None, 'count': 0}
+
+    async def send(url, params):
+        clock.now += 0.2  # Latência até o servidor
+        if window['start'] is None or clock.now >= window['start'] + 10:
+            window['start'], window['count'] = clock.now, 0
+        window['count'] += 1
+        sent.append(clock.now)
+        clock.now += 0.2
+        status = 200 if window['count'] <= 3 else 429
+        return FakeResponse(status, {'X-App-Rate-Limit': '3:10', 'X-App-Rate-Limit-Count': f"{window['count']}:10",
+                                     'X-Rate-Limit-Type': 'application', 'Retry-After': '10'}, body={'ok': 1})
+
+    client._send = send
+
+    async def scenario():
+        for _ in range(7): await client.get('kr', 'teste', '/x')
+
+    asyncio.run(scenario())
+    # Três por janela; a quarta só sai depois do reset (um token bucket liberaria em ~3.3s)
+    assert len(sent) == 7
+    assert sent[3] >= sent[0] + 10 and sent[6] >= sent[3] + 10
+    assert sent[1] - sent[0] < 1 and sent[2] - sent[0] < 1
+
+
+def test_count_header_fills_window(monkeypatch):
+    # Outro processo com a mesma chave já gastou a janela: o header manda esperar o reset
+    clock = FakeClock(monkeypatch)
+    client = RiotClient('chave')
+    sent = []
+
+    async def send(url, params):
+        sent.append(clock.now)
+        count = 3 if len(sent) == 1 else 1
+        return FakeResponse(200, {'X-App-Rate-Limit': '3:10', 'X-App-Rate-Limit-Count': f'{count}:10'}, body={})
+
+    client._send = send
+
+    async def scenario():
+        for _ in range(2): await client.get('kr', 'teste', '/x')
+
+    asyncio.run(scenario())
+    assert sent[1] >= sent[0] + 10
@@ -0,0 +1,97 @@
+import os
+import sys
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketches import QuantileSketches, TDigest, load_sketch
+
+QS = [0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999]
+
+
+def sample(n=20000, seed=0):
+    # Cauda longa, como ouro/dano: o caso difícil para quantis
+    return np.random.default_rng(seed).lognormal(7, 0.6, n)
+
+
+def rank_error(values, digest):
+    # Maior erro em posição (0..1) dos quantis e da CDF do digest contra os valores exatos
+    values = np.sort(values)
+    n = len(values)
+    err = 0.0
+    for q in QS:
+        est = digest.quantile(q)
+        err = max(err, abs(np.searchsorted(values, est, side='right') / n - q))
+        x = np.quantile(values, q)
+        err = max(err, abs(digest.cdf(x) - np.searchsorted(values, x, side='right') / n))
+    return err
+
+
+def test_quantile_and_cdf_error_bounds():
+    values = sample()
+    digest = TDigest().update(values)
+    assert digest.count == len(values)
+    assert len(digest.means) <= digest.delta
+    assert rank_error(values, digest) < 0.005
+    # Pontas: erro bem menor que no meio (função de escala k1)
+    for q in (0.001, 0.999):
+        est = digest.quantile(q)
+        assert abs(np.searchsorted(np.sort(values), est, side='right') / len(values) - q) < 0.001
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+    assert digest.cdf(values.min() - 1) == 0.0 and digest.cdf(values.max()) == 1.0
+
+
+def test_merge_is_order_independent():
+    values = sample()
+    parts = np.array_split(values, 20)
+    digests = [TDigest().update(p) for p in parts]
+    forward, backward, tree = TDigest(), TDigest(), TDigest()
+    for d in digests: forward.merge(d)
+    for d in reversed(digests): backward.merge(d)
+    # Em pares (como lotes de regiões diferentes juntados depois)
+    level = digests
+    while len(level) > 1:
+        level = [TDigest().merge(a).merge(b) for a, b in zip(level[::2], level[1::2])] + level[len(level) // 2 * 2:]
+    tree.merge(level[0])
+    for merged in (forward, backward, tree):
+        assert merged.count == len(values)
+        assert (merged.min, merged.max) == (values.min(), values.max())
+        assert rank_error(values, merged) < 0.005
+    # Mesma resposta (em posição) qualquer que seja a ordem da fusão
+    ordered = np.sort(values)
+    for q in QS:
+        ranks = [np.searchsorted(ordered, d.quantile(q), side='right') / len(values) for d in (forward, backward, tree)]
+        assert max(ranks) - min(ranks) < 0.005
+
+
+def test_bytes_roundtrip():
+    digest = TDigest().update(sample(5000))
+    back = TDigest.from_bytes(digest.to_bytes())
+    assert (back.delta, back.count, back.min, back.max) == (digest.delta, digest.count, digest.min, digest.max)
+    assert all(abs(back.quantile(q) - digest.quantile(q)) < 1e-6 * digest.max for q in QS)
+    assert np.isnan(TDigest().quantile(0.5)) and np.isnan(TDigest().cdf(1.0))
+
+
+def test_rebuild_from_stored_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    values = sample(300)
+    with engine.begin() as conn:
+        # O rebuild lê em pedaços enquanto grava (como no Postgres): leitor e escritor juntos
+        conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+        conn.execute(text('''CREATE TABLE partidas ("Patch" TEXT, "Role" TEXT, "Champion" TEXT,
+                             "XP 12'" REAL, "CS 12'" REAL, "Kills" INTEGER)'''))
+        conn.execute(text('''INSERT INTO partidas VALUES (:p, 'JUNGLE', :c, :xp, :cs, 1)'''),
+                     [{'p': '16.1', 'c': 'Karthus' if i % 3 else 'Lee Sin', 'xp': v, 'cs': None if i % 10 == 0 else i}
+                      for i, v in enumerate(values)])
+    sketches = QuantileSketches()
+    for _ in range(2):
+        # Rodar de novo refaz do zero (não soma duas vezes)
+        assert sketches.rebuild(engine, 'partidas', chunksize=70) == len(values)
+        xp = load_sketch(engine, 'partidas', '16.1', 'JUNGLE', 'Karthus', "XP 12'")
+        assert xp.count == sum(1 for i in range(len(values)) if i % 3)
+        cs = load_sketch(engine, 'partidas', '16.1', 'JUNGLE', 'Lee Sin', "CS 12'")
+        assert cs.count == sum(1 for i in range(len(values)) if i % 3 == 0 and i % 10)
+    karthus = values[[i % 3 != 0 for i in range(len(values))]]
+    assert abs(xp.quantile(0.5) - np.median(karthus)) < 1e-9 + 0.02 * np.median(karthus)
+    assert load_sketch(engine, 'partidas', '16.1', 'JUNGLE', 'Karthus', "Gold Earned 12'") is None
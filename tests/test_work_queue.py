@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from work_queue import (FAILED_RETRIES, FAILED_RETRY_AFTER, KEEP_FAILED_DAYS, KEEP_WRITTEN_DAYS, MAX_ATTEMPTS,
+                        WorkQueue, load_payload)
+
+
+def make_queue(tmp_path):
+    return WorkQueue(str(tmp_path / 'q.sqlite'))
+
+
+def states(queue):
+    return dict(queue._execute('SELECT match_id, state FROM work_items'))
+
+
+def test_add_returns_only_new_ids(tmp_path):
+    q = make_queue(tmp_path)
+    assert q.add('partidas', ['KR_1', 'KR_2', 'KR_1']) == ['KR_1', 'KR_2']
+    assert q.add('partidas', ['KR_2', 'KR_3']) == ['KR_3']
+    # Fonte é parte da chave
+    assert q.add('partidas_br', ['KR_1']) == ['KR_1']
+    assert q.counts('partidas') == {'discovered': 3}
+
+
+def test_state_transitions_and_payload(tmp_path):
+    q = make_queue(tmp_path)
+    q.add('partidas', ['KR_1', 'KR_2'])
+    q.mark('partidas', ['KR_1', 'KR_2'], 'fetched')
+    q.extracted('partidas', 'KR_1', [('KR_1', 1, 2.5), ('KR_1', 2, None)])
+    assert states(q) == {'KR_1': 'extracted', 'KR_2': 'fetched'}
+    payload = q._execute("SELECT payload FROM work_items WHERE match_id = 'KR_1'")[0][0]
+    assert load_payload(payload) == [('KR_1', 1, 2.5), ('KR_1', 2, None)]
+    q.mark('partidas', ['KR_1'], 'written')
+    # Payload some ao sair de 'extracted'
+    assert q._execute("SELECT state, payload FROM work_items WHERE match_id = 'KR_1'") == [('written', None)]
+
+
+def test_load_payload_old_layouts():
+    # Linhas como dict (antes do layout fixo) e o campo 'minutes' da tabela longa removida
+    payload = '{"rows": [{"b": 2, "a": 1}], "minutes": [[1, 2]]}'
+    assert load_payload(payload, columns=['a', 'b', 'c']) == [(1, 2, None)]
+
+
+def test_fail_counts_attempts_until_failed(tmp_path):
+    q = make_queue(tmp_path)
+    q.add('partidas', ['KR_1'])
+    for attempt in range(1, MAX_ATTEMPTS):
+        q.fail('partidas', 'KR_1')
+        assert q._execute('SELECT state, attempts FROM work_items') == [('discovered', attempt)]
+    q.fail('partidas', 'KR_1')
+    assert q._execute('SELECT state, attempts FROM work_items') == [('failed', MAX_ATTEMPTS)]
+    assert q.pending('partidas') == []
+    assert q.counts('partidas') == {'failed': 1}
+
+
+def test_pending_resumes_unfinished_in_order(tmp_path):
+    path = str(tmp_path / 'q.sqlite')
+    q = WorkQueue(path)
+    q.add('partidas', ['KR_1'])
+    q.add('partidas', ['KR_2', 'KR_3', 'KR_4'])
+    q.mark('partidas', ['KR_2'], 'written')
+    q.extracted('partidas', 'KR_3', [('KR_3', 1)])
+    q.close()
+
+    # Nova execução: mesmo arquivo
+    q = WorkQueue(path)
+    pending = q.pending('partidas')
+    assert [(m, s) for m, s, _ in pending] == [('KR_1', 'discovered'), ('KR_4', 'discovered'), ('KR_3', 'extracted')]
+    assert load_payload(pending[-1][2]) == [('KR_3', 1)]
+    assert q.pending('partidas_br') == []
+
+
+def test_recycle_failed_requeues_then_gives_up(tmp_path):
+    q = make_queue(tmp_path)
+    q.add('partidas', ['KR_1'])
+    for _ in range(MAX_ATTEMPTS):
+        q.fail('partidas', 'KR_1')
+    now = time.time()
+    # Falha recente fica como está
+    assert q.recycle_failed('partidas', now=now) == (0, 0)
+    for extra in range(FAILED_RETRIES):
+        now += FAILED_RETRY_AFTER + 1
+        assert q.recycle_failed('partidas', now=now) == (1, 0)
+        assert [m for m, _, _ in q.pending('partidas')] == ['KR_1']
+        # Cada rodada extra é uma tentativa só
+        q.fail('partidas', 'KR_1')
+        assert q.counts('partidas') == {'failed': 1}
+    assert q._execute('SELECT attempts FROM work_items')[0][0] == MAX_ATTEMPTS + FAILED_RETRIES
+    # Esgotado: não volta mais e sai da fila depois de KEEP_FAILED_DAYS
+    updated_at = q._execute('SELECT updated_at FROM work_items')[0][0]
+    assert q.recycle_failed('partidas', now=updated_at + FAILED_RETRY_AFTER + 1) == (0, 0)
+    assert q.recycle_failed('partidas', now=updated_at + KEEP_FAILED_DAYS * 86400 + 1) == (0, 1)
+    assert q.counts('partidas') == {}
+
+
+def test_recycle_failed_is_per_source(tmp_path):
+    q = make_queue(tmp_path)
+    for source in ('partidas', 'partidas_br'):
+        q.add(source, ['X_1'])
+        for _ in range(MAX_ATTEMPTS):
+            q.fail(source, 'X_1')
+    assert q.recycle_failed('partidas', now=time.time() + FAILED_RETRY_AFTER + 1) == (1, 0)
+    assert q.counts('partidas_br') == {'failed': 1}
+
+
+def test_old_written_pruned_on_open(tmp_path):
+    path = str(tmp_path / 'q.sqlite')
+    q = WorkQueue(path)
+    q.add('partidas', ['KR_1', 'KR_2'])
+    q.mark('partidas', ['KR_1', 'KR_2'], 'written')
+    q._execute("UPDATE work_items SET updated_at = ? WHERE match_id = 'KR_1'",
+               (time.time() - KEEP_WRITTEN_DAYS * 86400 - 1,))
+    q.close()
+    assert WorkQueue(path).counts('partidas') == {'written': 1}
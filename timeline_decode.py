@@ -0,0 +1,56 @@
+import json
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson é opcional: sem ele usa o json da stdlib
+    loads = json.loads
+
+# --- DECODIFICAÇÃO ENXUTA DA TIMELINE ---
+# A timeline completa (~1 MB de JSON) vira dezenas de milhares de objetos Python:
+# posição, championStats e damageStats inteiros de cada participante em cada minuto,
+# além de todos os eventos de item, skill, ward etc. A extração só lê:
+#   participantFrames: minionsKilled, jungleMinionsKilled, totalGold, xp, level e
+#                      damageStats.totalDamageDoneToChampions
+#   events: CHAMPION_KILL e TURRET_PLATE_DESTROYED (tipo, timestamp, killer, vítima, assistências)
+# slim_timeline mantém a mesma forma (as funções de features.py não mudam) só com esses
+# campos, e o objeto completo é descartado logo após o parse. O cache bruto continua
+# guardando o JSON original inteiro.
+#
+# O parse continua sendo do JSON inteiro: o pico de memória de cada decodificação é o
+# da timeline completa (um pouco acima, as duas formas convivem durante slim_timeline)
+# e o parse não fica mais rápido. O ganho é só o que fica retido enquanto a timeline
+# espera a extração (no benchmark, ~220 KB contra ~1,4 MB por timeline), o que soma
+# com várias partidas em voo e na fila (benchmarks/bench_timeline_decode.py).
+
+FRAME_FIELDS = ('minionsKilled', 'jungleMinionsKilled', 'totalGold', 'xp', 'level')
+EVENT_TYPES = frozenset(('CHAMPION_KILL', 'TURRET_PLATE_DESTROYED'))
+EVENT_FIELDS = ('type', 'timestamp', 'killerId', 'victimId', 'assistingParticipantIds')
+
+
+def slim_participant_frame(p):
+    slim = {k: p[k] for k in FRAME_FIELDS if k in p}
+    dmg = p.get('damageStats')
+    if dmg is not None:
+        slim['damageStats'] = {'totalDamageDoneToChampions': dmg.get('totalDamageDoneToChampions', 0)}
+    return slim
+
+
+def slim_timeline(timeline):
+    frames = []
+    for frame in timeline['info']['frames']:
+        frames.append({
+            'timestamp': frame['timestamp'],
+            'participantFrames': {pid: slim_participant_frame(p) for pid, p in frame['participantFrames'].items()},
+            'events': [{k: e[k] for k in EVENT_FIELDS if k in e} for e in frame['events'] if e['type'] in EVENT_TYPES],
+        })
+    return {'metadata': timeline.get('metadata', {}), 'info': {'frames': frames}}
+
+
+def decode_timeline(raw):
+    # bytes/str da API ou do cache -> timeline enxuta (parse completo, depois reduz)
+    return slim_timeline(loads(raw))
+
+
+def decode_match(match_raw, timeline_raw):
+    return loads(match_raw), decode_timeline(timeline_raw)
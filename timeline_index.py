@@ -0,0 +1,94 @@
+# --- ÍNDICE DA TIMELINE (PASSADA ÚNICA) ---
+# Antes, cada jogador x cada minuto alvo varria todos os frames/eventos de novo
+# (~70 varreduras por partida). Aqui a timeline é percorrida UMA vez e vira:
+#   - contadores cumulativos por participante e minuto (kills, deaths, assists, plates)
+#   - ouro total de cada time por minuto
+# Depois disso, qualquer consulta de minuto é O(1).
+
+MINUTE_MS = 60 * 1000
+
+KILLS, DEATHS, ASSISTS, PLATES = 0, 1, 2, 3
+
+
+def _first_minute(ts_ms):
+    # Menor minuto inteiro t tal que ts_ms <= t * 60000
+    return -(-ts_ms // MINUTE_MS)
+
+
+def build_timeline_index(frames, participants_info):
+    team_pids = {100: [], 200: []}
+    for p in participants_info:
+        team_pids.setdefault(p['teamId'], []).append(str(p['participantId']))
+
+    # Ouro do time em cada frame (mesmo critério de antes: soma só quem aparece no frame)
+    team_gold = {tid: [] for tid in team_pids}
+    for frame in frames:
+        p_frames = frame['participantFrames']
+        for tid, pids in team_pids.items():
+            team_gold[tid].append(sum(p_frames[pid]['totalGold'] for pid in pids if pid in p_frames))
+
+    # Eventos: um evento entra na contagem do minuto t quando o timestamp dele E o de
+    # todos os frames até o dele são <= t min (a varredura antiga dava 'break' no
+    # primeiro frame além do limite). Guardamos o delta no primeiro minuto válido.
+    deltas = {}
+    frame_gate = 0
+    last_minute = 0
+    for frame in frames:
+        frame_gate = max(frame_gate, frame['timestamp'])
+        for event in frame['events']:
+            etype = event['type']
+            if etype != 'CHAMPION_KILL' and etype != 'TURRET_PLATE_DESTROYED': continue
+
+            minute = _first_minute(max(frame_gate, event['timestamp']))
+            if minute > last_minute: last_minute = minute
+            assisting = set(event.get('assistingParticipantIds', []))
+            killer = event.get('killerId')
+
+            if etype == 'CHAMPION_KILL':
+                if killer is not None: _bump(deltas, killer, minute, KILLS)
+                victim = event.get('victimId')
+                if victim is not None: _bump(deltas, victim, minute, DEATHS)
+                for a_pid in assisting: _bump(deltas, a_pid, minute, ASSISTS)
+            else:
+                involved = (assisting | {killer}) if killer is not None else assisting
+                for i_pid in involved: _bump(deltas, i_pid, minute, PLATES)
+
+    # Soma cumulativa: counters[pid][t] = (k, d, a, plates) até o minuto t
+    counters = {}
+    for pid, by_minute in deltas.items():
+        acc = [0, 0, 0, 0]
+        series = []
+        for t in range(last_minute + 1):
+            d = by_minute.get(t)
+            if d:
+                acc[0] += d[0]; acc[1] += d[1]; acc[2] += d[2]; acc[3] += d[3]
+            series.append(tuple(acc))
+        counters[pid] = series
+
+    return {
+        'n_frames': len(frames),
+        'team_pids': team_pids,
+        'team_gold': team_gold,
+        'counters': counters,
+    }
+
+
+def _bump(deltas, pid, minute, field):
+    by_minute = deltas.setdefault(pid, {})
+    d = by_minute.get(minute)
+    if d is None:
+        d = by_minute[minute] = [0, 0, 0, 0]
+    d[field] += 1
+
+
+def events_at(index, minute, pid):
+    # (kills, deaths, assists, plates) acumulados até o minuto
+    series = index['counters'].get(pid)
+    if not series or minute < 0: return 0, 0, 0, 0
+    return series[minute] if minute < len(series) else series[-1]
+
+
+def team_gold_at(index, minute, team_id):
+    # Ouro total do time no frame do minuto (0 se o frame não existe)
+    if minute >= index['n_frames'] or minute < 0: return 0
+    return index['team_gold'].get(team_id, [0] * index['n_frames'])[minute]
@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from raw_cache import CACHE_DIR
+
+# --- FILA DE TRABALHO DURÁVEL (SQLITE LOCAL) ---
+# A coleta KR roda com limite de 90 min. Se o processo morre no meio, o que estava no
+# buffer se perdia e a lista de partidas tinha que ser descoberta de novo. Aqui cada
+# Match ID tem uma linha com o estado:
+#   discovered -> fetched -> extracted -> written   (ou failed após MAX_ATTEMPTS erros)
+# - fetched: o JSON está no cache bruto (raw_cache.py), retomar não chama a API
+# - extracted: as linhas ficam guardadas aqui até o banco confirmar, retomar não
+#   refaz a extração
+# Na próxima execução o que não chegou em 'written' é retomado antes da descoberta.
+# 'failed' não fica para sempre: a falha costuma ser passageira (5xx, circuito aberto
+# a execução inteira), então depois de FAILED_RETRY_AFTER o item ganha mais uma
+# tentativa, até FAILED_RETRIES vezes; quem esgotou sai da fila após KEEP_FAILED_DAYS.
+# O arquivo fica junto do cache bruto (cache_raw/work_queue.sqlite), que o workflow
+# salva mesmo quando o job estoura o tempo.
+
+QUEUE_PATH = os.path.join(CACHE_DIR, 'work_queue.sqlite')
+MAX_ATTEMPTS = 3
+KEEP_WRITTEN_DAYS = 7  # 'written' fica um tempo só para consulta/diagnóstico
+FAILED_RETRY_AFTER = 86400
+FAILED_RETRIES = 2
+KEEP_FAILED_DAYS = 7
+
+
+class WorkQueue:
+    def __init__(self, path=QUEUE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # Uma conexão usada pelo event loop e pelas threads do to_thread, com lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS work_items (
+                source TEXT NOT NULL,
+                match_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                payload TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, match_id)
+            )''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS ix_work_items_state ON work_items (source, state)')
+        self.conn.execute("DELETE FROM work_items WHERE state = 'written' AND updated_at < ?",
+                          (time.time() - KEEP_WRITTEN_DAYS * 86400,))
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _executemany(self, sql, rows):
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.executemany(sql, rows)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def add(self, source, match_ids):
+        # Enfileira como 'discovered'. Devolve só os IDs que ainda não estavam na fila.
+        ids = list(dict.fromkeys(str(m) for m in match_ids))
+        if not ids: return []
+        known = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            known.update(r[0] for r in self._execute(
+                f'SELECT match_id FROM work_items WHERE source = ? AND match_id IN ({marks})', [source] + chunk))
+        new = [m for m in ids if m not in known]
+        now = time.time()
+        self._executemany("INSERT OR IGNORE INTO work_items (source, match_id, state, updated_at) VALUES (?, ?, 'discovered', ?)",
+                          [(source, m, now) for m in new])
+        return new
+
+    def recycle_failed(self, source, now=None):
+        # Devolve (voltaram para a fila, removidos). A tentativa extra não zera 'attempts':
+        # uma falha a mais e o item volta para 'failed' (ver fail)
+        now = now or time.time()
+        with self.lock:
+            requeued = self.conn.execute(
+                "UPDATE work_items SET state = 'discovered', updated_at = ? "
+                "WHERE source = ? AND state = 'failed' AND attempts < ? AND updated_at < ?",
+                (now, source, MAX_ATTEMPTS + FAILED_RETRIES, now - FAILED_RETRY_AFTER)).rowcount
+            dropped = self.conn.execute(
+                "DELETE FROM work_items WHERE source = ? AND state = 'failed' AND updated_at < ?",
+                (source, now - KEEP_FAILED_DAYS * 86400)).rowcount
+        return requeued, dropped
+
+    def pending(self, source):
+        # Trabalho não terminado de execuções anteriores: [(match_id, state, payload)]
+        return self._execute(
+            "SELECT match_id, state, payload FROM work_items WHERE source = ? AND state IN ('discovered', 'fetched', 'extracted') "
+            "ORDER BY updated_at", (source,))
+
+    def mark(self, source, match_ids, state):
+        # Limpa o payload ao sair de 'extracted'
+        self._executemany('UPDATE work_items SET state = ?, payload = NULL, updated_at = ? WHERE source = ? AND match_id = ?',
+                          [(state, time.time(), source, m) for m in match_ids])
+
+    def extracted(self, source, match_id, rows):
+        payload = json.dumps({'rows': rows}, ensure_ascii=False)
+        self._execute("UPDATE work_items SET state = 'extracted', payload = ?, updated_at = ? WHERE source = ? AND match_id = ?",
+                      (payload, time.time(), source, match_id))
+
+    def fail(self, source, match_id):
+        # Erro de download/extração: volta para 'discovered' até MAX_ATTEMPTS, depois 'failed'
+        self._execute(
+            "UPDATE work_items SET attempts = attempts + 1, updated_at = ?, "
+            "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'discovered' END WHERE source = ? AND match_id = ?",
+            (time.time(), MAX_ATTEMPTS, source, match_id))
+
+    def counts(self, source):
+        return dict(self._execute('SELECT state, COUNT(*) FROM work_items WHERE source = ? GROUP BY state', (source,)))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def load_payload(payload, columns=None):
+    # Linhas de um item 'extracted'. Itens gravados antes do layout fixo guardavam cada
+    # linha como dict: viram tupla na ordem de 'columns'.
+    data = json.loads(payload)
+    return [tuple(r.get(c) for c in columns) if isinstance(r, dict) else tuple(r) for r in data['rows']]